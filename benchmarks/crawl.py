@@ -0,0 +1,341 @@
+"""取得処理（一覧 → 詳細ページの解析 → 画像 → CSV/JSON出力）のベンチマーク
+
+    python benchmarks/crawl.py                               # 生成した300件（遅延20ms）
+    python benchmarks/crawl.py --items 1000 --workers 8 --rate 200
+    python benchmarks/crawl.py --throttle-every 20 --bandwidth-kbps 512
+    python benchmarks/crawl.py --processes 4                 # 複数プロセス（--processes と同じ処理）
+    python benchmarks/crawl.py --fixtures fixtures/shiraoka  # fixture_server.py record で保存したページ
+    python benchmarks/crawl.py --output bench.json
+    python benchmarks/crawl.py --profile sample --tracemalloc  # 取得部分をプロファイル（profiles/ に保存）
+
+実サイトの代わりに fixture_server.py のサーバーを別プロセスで起動し、一時フォルダで
+コマンドライン版と同じ Crawler を最後まで実行する。計測するのは
+  crawl:  取得全体の時間と pages/sec（一覧・詳細ページ）・images/sec、429 の回数・再試行回数、
+          段階ごとの所要時間（取得時に保存される計測値の stages）
+  parse:  保存済みの詳細ページの解析（parse_page + extract_detail + extract_images）の1ページあたりの時間
+          （インストールされている解析エンジンごと）
+  export: 物件データベースからのCSV/JSON出力の時間
+  peak_rss_mb: 取得の間の最大メモリ（crawler: 取得したプロセス、workers: --processes のワーカーのうち
+          最大のもの。取得直後、サーバーのプロセスを終了する前に測るためサーバーは含まない）
+結果はJSONで標準出力へ出す（--output でファイルにも保存）。バージョン間の比較用に
+コミット・Pythonのバージョン・条件も含める。生成したページでは取得結果が期待どおりかも確認する（parity）。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixture_server import INDEX_FILE, STATS_PATH, GeneratedFixtures, add_server_arguments, create_server  # noqa: E402
+from realestate_scraper.config import HISTORY_DB, METRICS_FILE, PROFILE_DIR, STORE_FILE  # noqa: E402
+from realestate_scraper.profiling import PROFILE_MODES, RunProfiler  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SITE_NAME = 'benchmark'
+DEFAULT_RATE = 100.0  # ベンチマークではサーバーの遅延・429 で頭打ちになるよう高めにする
+DEFAULT_PARSE_PAGES = 50
+PARSE_ROUNDS = 3  # 解析時間は各ページを数回解析した中央値
+
+
+def serve(options, conn):
+    """サーバープロセスの入口（URLを conn で返してから待ち受ける）"""
+    server = create_server(options)
+    conn.send(server.base_url)
+    conn.close()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def start_server(options):
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe()
+    process = context.Process(target=serve, args=(options, child), name='fixture-server', daemon=True)
+    process.start()
+    if not parent.poll(30):
+        process.terminate()
+        raise RuntimeError('ベンチマーク用のサーバーが起動しませんでした')
+    return process, parent.recv()
+
+
+def stop_server(process):
+    process.terminate()
+    process.join()
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=30) as res:
+        return res.read()
+
+
+def server_stats(base_url):
+    return json.loads(fetch(base_url + STATS_PATH))
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def peak_rss_mb(who):
+    """最大メモリ（MB）。who は resource.RUSAGE_SELF / RUSAGE_CHILDREN"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def per_second(count, seconds):
+    return round(count / seconds, 2) if seconds else None
+
+
+def list_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in os.listdir(directory)]
+
+
+def run_crawl(args, site, log):
+    """取得を最後まで実行し、(結果, 秒数, プロファイルのファイル) を返す（CSV/JSONの出力は含めない）"""
+    options = dict(
+        max_items=args.items, workers=args.workers, rate=args.rate, use_cache=not args.no_cache,
+        parser=args.parser, download_images=not args.no_images, export_on_finish=False, adaptive=not args.no_adaptive
+    )
+    profile = None
+    if args.profile or args.tracemalloc:
+        profile = {'mode': args.profile, 'directory': args.profile_dir, 'tracemalloc': args.tracemalloc}
+    started = time.perf_counter()
+    if args.processes:
+        from realestate_scraper.queue_crawler import QueueCrawler
+
+        # 複数プロセスではワーカーごとにプロファイルする（ファイルは実行後に増えた分）
+        before = set(list_files(args.profile_dir))
+        crawler = QueueCrawler(log=log, quiet=not args.verbose, profile=profile)
+        result = crawler.run(sites=[site], processes=args.processes, **options)
+        files = sorted(set(list_files(args.profile_dir)) - before)
+    else:
+        from realestate_scraper.crawler import Crawler
+        from realestate_scraper.history import HistoryStore
+
+        profiler = RunProfiler(label='benchmark', log=log, **profile) if profile else None
+        history = HistoryStore(HISTORY_DB)
+        try:
+            if profiler:
+                with profiler:
+                    result = Crawler(history, log=log, site=site).run(**options)
+            else:
+                result = Crawler(history, log=log, site=site).run(**options)
+        finally:
+            history.close()
+        files = profiler.files if profiler else []
+    return result, time.perf_counter() - started, files
+
+
+def run_export(log):
+    """CSV/JSONの出力にかかった (件数, 秒数)"""
+    from realestate_scraper.crawler import Crawler
+    from realestate_scraper.history import HistoryStore
+
+    history = HistoryStore(HISTORY_DB)
+    try:
+        started = time.perf_counter()
+        count = Crawler(history, log=log).export()
+        return count, time.perf_counter() - started
+    finally:
+        history.close()
+
+
+def detail_urls(records, limit):
+    return [record['詳細ページ'] for record in records if record.get('詳細ページ')][:limit]
+
+
+def bench_parse(site, pages):
+    """解析エンジンごとの1ページあたりの解析時間（ミリ秒）と抽出結果"""
+    from realestate_scraper.crawler import Crawler
+    from realestate_scraper.parsers import available_backends, parse_page
+
+    crawler = Crawler(None, log=lambda message: None, site=site)
+    timings = {}
+    extracted = {}
+    for backend in available_backends():
+        samples = []
+        results = []
+        for url, html in pages:
+            rounds = []
+            for _ in range(PARSE_ROUNDS):
+                started = time.perf_counter()
+                page = parse_page(html, backend, site.selectors)
+                record = crawler.extract_detail(page, url)
+                images = crawler.extract_images(page, record['物件番号'])
+                rounds.append(time.perf_counter() - started)
+            samples.append(statistics.median(rounds))
+            results.append((record, images))
+        timings[backend] = {
+            'ms_per_page': round(statistics.mean(samples) * 1000, 3),
+            'median_ms': round(statistics.median(samples) * 1000, 3),
+            'max_ms': round(max(samples) * 1000, 3),
+        }
+        extracted[backend] = results
+    return timings, extracted
+
+
+def check_parity(args, records, extracted):
+    """取得結果の確認（解析エンジン間の一致・生成したページの内容との一致）"""
+    problems = []
+    backends = list(extracted)
+    for backend in backends[1:]:
+        if extracted[backend] != extracted[backends[0]]:
+            problems.append(f"{backend} の抽出結果が {backends[0]} と異なります")
+
+    if not args.fixtures:
+        fixtures = GeneratedFixtures(args.items)
+        if len(records) != args.items:
+            problems.append(f"取得件数 {len(records)}件（期待値 {args.items}件）")
+        for record in records:
+            expected = fixtures.expected_record(int(record['物件番号']))
+            different = sorted(column for column, value in expected.items() if record.get(column) != value)
+            if different:
+                problems.append(f"{record['物件番号']}: {', '.join(different)} が期待値と異なります")
+                break
+    return {'ok': not problems, 'problems': problems}
+
+
+def bench(args, base_url, log):
+    from realestate_scraper.sites import Site
+    from realestate_scraper.store import PropertyStore
+
+    list_url = base_url + '/list/'
+    if args.fixtures:
+        with open(os.path.join(args.fixtures, INDEX_FILE), 'r', encoding='utf-8') as f:
+            list_url = base_url + urllib.parse.urlsplit(json.load(f)['list_url']).path
+    site = Site(SITE_NAME, base_url, list_url)
+
+    result, seconds, profile_files = run_crawl(args, site, log)
+    # RUSAGE_CHILDREN は終了して回収済みの子プロセスだけを数えるため、ここではワーカーだけ（サーバーは動作中）
+    peak_rss = {
+        'crawler': peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'workers': peak_rss_mb(resource.RUSAGE_CHILDREN) if resource and args.processes else None,
+    }
+    stats = server_stats(base_url)
+    with open(site.file(METRICS_FILE), 'r', encoding='utf-8') as f:
+        stages = json.load(f)['stages']
+
+    count, export_seconds = run_export(log)
+    store = PropertyStore(STORE_FILE)
+    try:
+        records = list(store.records())
+    finally:
+        store.close()
+
+    pages = [(url, fetch(url).decode('utf-8')) for url in detail_urls(records, args.parse_pages)]
+    parse, extracted = bench_parse(site, pages)
+
+    return {
+        'benchmark': 'crawl',
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'config': {
+            'fixtures': args.fixtures or 'generated',
+            'items': args.items,
+            'images_per_item': 0 if args.no_images else args.images_per_item,
+            'workers': args.workers,
+            'processes': args.processes,
+            'rate': args.rate,
+            'adaptive': not args.no_adaptive,
+            'parser': args.parser,
+            'cache': not args.no_cache,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'bandwidth_kbps': args.bandwidth_kbps,
+            'throttle_every': args.throttle_every,
+        },
+        'crawl': {
+            'status': result['status'],
+            'seconds': round(seconds, 3),
+            'records': len(records),
+            'pages': stats['list'] + stats['detail'],
+            'images': stats['image'],
+            'pages_per_sec': per_second(stats['list'] + stats['detail'], seconds),
+            'images_per_sec': per_second(stats['image'], seconds),
+            'mb_per_sec': per_second(stats['bytes'] / (1024 * 1024), seconds),
+            'throttled': stats['throttled'],
+            'retries': result.get('retries', 0),
+            'errors': result.get('errors', 0),
+            'stages': stages,
+        },
+        'parse': {'pages': len(pages), 'backends': parse},
+        'export': {'records': count, 'seconds': round(export_seconds, 3)},
+        'parity': check_parity(args, records, extracted),
+        'peak_rss_mb': peak_rss,
+        'profile': profile_files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='取得処理のベンチマーク（ローカルのサーバーを使用）')
+    add_server_arguments(parser)
+    parser.add_argument('--workers', type=int, default=4, help='詳細ページの並列数（既定: 4）')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help=f'アクセス上限 回/秒（既定: {DEFAULT_RATE}）')
+    parser.add_argument('--no-adaptive', action='store_true', help='アクセスレートを自動調整しない')
+    parser.add_argument('--processes', type=int, default=0, help='ワーカープロセス数（既定: 0 = 1プロセス）')
+    parser.add_argument('--parser', default='auto', help='HTML解析エンジン（既定: auto）')
+    parser.add_argument('--no-images', action='store_true', help='画像を取得しない')
+    parser.add_argument('--no-cache', action='store_true', help='HTTPキャッシュを使わない')
+    parser.add_argument('--parse-pages', type=int, default=DEFAULT_PARSE_PAGES,
+                        help=f'解析時間を計る詳細ページ数（既定: {DEFAULT_PARSE_PAGES}）')
+    parser.add_argument('--output', help='結果のJSONを保存するファイル')
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=PROFILE_MODES,
+                        help='取得部分をプロファイルする（既定: cprofile。プロファイル中の時間は比較に使わない）')
+    parser.add_argument('--tracemalloc', action='store_true', help='取得部分のメモリ割り当てを記録する')
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help=f'プロファイルの保存先（既定: {PROFILE_DIR}）')
+    parser.add_argument('--verbose', action='store_true', help='実行ログを標準エラー出力に表示')
+    args = parser.parse_args()
+    # 一時フォルダに移動する前に絶対パスにする
+    output = os.path.abspath(args.output) if args.output else None
+    if args.fixtures:
+        args.fixtures = os.path.abspath(args.fixtures)
+    args.profile_dir = os.path.abspath(args.profile_dir)
+
+    log = (lambda message: print(message, file=sys.stderr)) if args.verbose else (lambda message: None)
+    server, base_url = start_server(args)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # 物件データベース・履歴・画像などは一時フォルダに作らせる
+            os.chdir(workdir)
+            try:
+                report = bench(args, base_url, log)
+            finally:
+                os.chdir(cwd)
+    finally:
+        stop_server(server)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0 if report['parity']['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""ベンチマーク用のローカルHTTPサーバー（実サイトの代わりに一覧・詳細ページと画像を返す）
+
+    python benchmarks/fixture_server.py serve --items 300 --latency-ms 20 --port 8765
+    python benchmarks/fixture_server.py serve --fixtures fixtures/shiraoka --throttle-every 20
+    python benchmarks/fixture_server.py record fixtures/shiraoka --pages 2
+
+既定では実サイトと同じ構造（一覧のJSON-LD・物件概要の表・ギャラリー）のページを生成して返す。
+record で実サイトから保存したページと画像も返せる（--fixtures）。保存したHTML中の
+実サイトのURLはこのサーバーのURLに置き換える。
+応答の遅延・帯域・429（Retry-After 付き）の混入を指定でき、/__stats で応答の件数をJSONで返す。
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from realestate_scraper.fields import SPEC_COLUMNS  # noqa: E402
+
+# 生成するページ
+FIRST_ESTATE_ID = 4446900
+PER_PAGE = 10
+IMAGES_PER_ITEM = 5
+IMAGE_KB = 50
+PAGE_KB = 60  # 詳細ページの大きさ（ヘッダ・メニューなど物件概要以外の部分で調整）
+
+BASE_PLACEHOLDER = '{{BASE}}'  # 生成したページ中のサーバーのURL（応答時に置き換える）
+STATS_PATH = '/__stats'
+INDEX_FILE = 'index.json'  # record で保存したページの一覧
+CHUNK_SIZE = 16 * 1024  # 帯域を制限するときの送信単位
+HTML_TYPE = 'text/html; charset=utf-8'
+
+# 物件概要の値（物件番号ごとに決まった値を作る項目、それ以外は項目名＋番号）
+SAMPLE_VALUES = {
+    '価格': lambda n: f"{980 + n % 3000:,}万円",
+    '間取り': lambda n: f"{n % 5 + 1}LDK",
+    '物件種別': lambda n: '中古一戸建て',
+    '所在地': lambda n: f"埼玉県白岡市白岡{n % 900 + 1}番地",
+    '建物面積': lambda n: f"{80 + n % 60}.{n % 100:02d}㎡（{(80 + n % 60) * 0.3025:.2f}坪）",
+    '土地面積': lambda n: f"{120 + n % 150}.{n % 100:02d}㎡",
+    '築年月': lambda n: f"{1985 + n % 38}年{n % 12 + 1}月",
+    '建ぺい/容積率': lambda n: '60%/200%',
+    '備考': lambda n: f"南向き・角地（{n}）",
+}
+
+
+def spec_value(column, estate_id):
+    make = SAMPLE_VALUES.get(column)
+    return make(estate_id) if make else f"{column}{estate_id % 97}"
+
+
+def filler(size):
+    """ヘッダ・メニュー相当のマークアップ（物件の抽出には使われない）"""
+    item = '<li class="gnav_item"><a href="/column/{0}/">お役立ち情報 {0}</a><span>住まい探しのポイント</span></li>'
+    parts = []
+    total = 0
+    index = 0
+    while total < size:
+        part = item.format(index)
+        parts.append(part)
+        total += len(part.encode('utf-8'))
+        index += 1
+    return f'<nav class="gnav"><ul>{"".join(parts)}</ul></nav>'
+
+
+class GeneratedFixtures:
+    """実サイトと同じ構造のページを生成する（items 件の物件、1ページ per_page 件）"""
+
+    list_path = '/list/'
+
+    def __init__(self, items, per_page=PER_PAGE, images=IMAGES_PER_ITEM, image_kb=IMAGE_KB, page_kb=PAGE_KB):
+        self.items = items
+        self.per_page = per_page
+        self.images = images
+        self.image_size = image_kb * 1024
+        self.padding = filler(page_kb * 1024)
+
+    def get(self, target):
+        """リクエストのパス（クエリ付き）→ (本文, Content-Type, 種類) / なければ None"""
+        url = urllib.parse.urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        if url.path == self.list_path:
+            page = int(urllib.parse.parse_qs(url.query).get('pageNum', ['1'])[0])
+            return self.list_page(page).encode('utf-8'), HTML_TYPE, 'list'
+        if len(parts) == 2 and parts[0] == 'detail' and parts[1].isdigit():
+            estate_id = int(parts[1])
+            if self.exists(estate_id):
+                return self.detail_page(estate_id).encode('utf-8'), HTML_TYPE, 'detail'
+        if len(parts) == 3 and parts[0] == 'img' and parts[1].isdigit():
+            estate_id = int(parts[1])
+            index = parts[2].split('.')[0]
+            if self.exists(estate_id) and index.isdigit() and 1 <= int(index) <= self.images:
+                return self.image(estate_id, int(index)), 'image/jpeg', 'image'
+        return None
+
+    def exists(self, estate_id):
+        return FIRST_ESTATE_ID <= estate_id < FIRST_ESTATE_ID + self.items
+
+    def list_page(self, page):
+        start = (page - 1) * self.per_page
+        ids = [FIRST_ESTATE_ID + i for i in range(start, min(start + self.per_page, self.items))]
+        items = [
+            {'@type': 'ListItem', 'position': position, 'item': f"{BASE_PLACEHOLDER}/detail/{estate_id}/"}
+            for position, estate_id in enumerate(ids, start + 1)
+        ]
+        ld = {'@context': 'https://schema.org', '@type': 'ItemList', 'itemListElement': items}
+        cards = ''.join(f'<div class="card"><a href="/detail/{estate_id}/">物件 {estate_id}</a></div>' for estate_id in ids)
+        return (f'<html><head><script type="application/ld+json">{json.dumps(ld)}</script></head>'
+                f'<body>{self.padding[:len(self.padding) // 4]}{cards}</body></html>')
+
+    def detail_page(self, estate_id):
+        # 実サイトと同様、物件概要は2つの表に分かれ、物件番号は estateID のセル
+        half = len(SPEC_COLUMNS) // 2
+        rows = [''.join(f'<tr><th>{column}</th><td>{spec_value(column, estate_id)}</td></tr>' for column in columns)
+                for columns in (SPEC_COLUMNS[:half], SPEC_COLUMNS[half:])]
+        gallery = ''.join(
+            f'<a class="mainContents_gallery-colorbox" href="/img/{estate_id}/{index}.jpg"><img src="/img/{estate_id}/{index}.jpg"></a>'
+            for index in range(1, self.images + 1)
+        )
+        return (f'<html><head><link rel="preload" as="image" href="/img/{estate_id}/1.jpg"></head><body>{self.padding}'
+                f'<table><tr><th>物件番号</th><td class="estateID"> {estate_id} </td></tr>{rows[0]}</table>'
+                f'<table>{rows[1]}</table><div class="gallery">{gallery}</div></body></html>')
+
+    def image(self, estate_id, index):
+        # 物件・連番ごとに決まった内容（同じURLは同じ内容）
+        data = random.Random(estate_id * 100 + index).randbytes(self.image_size)
+        return b'\xff\xd8\xff\xe0' + data[4:]
+
+    def expected_record(self, estate_id):
+        """生成したページから取り出されるべき物件概要（取得結果の確認用）"""
+        return {column: spec_value(column, estate_id) for column in SPEC_COLUMNS}
+
+
+class RecordedFixtures:
+    """record で保存したページ・画像を返す（保存していない一覧ページは空の一覧）"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.directory = directory
+        self.origins = index['origins']  # 実サイトと画像のホスト（返すときにこのサーバーのURLに置き換える）
+        self.list_path = urllib.parse.urlsplit(index['list_url']).path
+        self.entries = index['entries']
+
+    def get(self, target):
+        entry = self.entries.get(target)
+        if entry is None:
+            if urllib.parse.urlsplit(target).path == self.list_path:
+                return b'<html><body></body></html>', HTML_TYPE, 'list'
+            return None
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            body = f.read()
+        if entry['type'].startswith('text/html'):
+            for origin in self.origins:
+                body = body.replace(origin.encode('utf-8'), BASE_PLACEHOLDER.encode('utf-8'))
+        return body, entry['type'], entry['kind']
+
+
+class FixtureServer(http.server.ThreadingHTTPServer):
+    """フィクスチャを返すHTTPサーバー
+
+    latency: 応答までの遅延（秒、0〜jitter 秒を加算）
+    bandwidth: 1接続あたりの送信速度（バイト/秒、0 は無制限）
+    throttle_every: この回数に1回 429 を返す（0 は返さない、Retry-After は retry_after 秒）
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, latency=0.0, jitter=0.0, bandwidth=0, throttle_every=0, retry_after=1):
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.stats = {'requests': 0, 'list': 0, 'detail': 0, 'image': 0, 'throttled': 0, 'not_modified': 0,
+                      'not_found': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+            return self.stats[key]
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if self.path == STATS_PATH:
+            with server.lock:
+                body = json.dumps(server.stats).encode('utf-8')
+            return self.respond(200, body, 'application/json')
+
+        number = server.count('requests')
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        if server.throttle_every and number % server.throttle_every == 0:
+            server.count('throttled')
+            return self.respond(429, b'', headers={'Retry-After': str(server.retry_after)})
+
+        found = server.fixtures.get(self.path)
+        if found is None:
+            server.count('not_found')
+            return self.respond(404, b'')
+        body, content_type, kind = found
+        if content_type.startswith('text/html'):
+            body = body.replace(BASE_PLACEHOLDER.encode('utf-8'), server.base_url.encode('utf-8'))
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            server.count('not_modified')
+            return self.respond(304, b'', headers={'ETag': etag})
+        server.count(kind)
+        server.count('bytes', len(body))
+        self.respond(200, body, content_type, {'ETag': etag})
+
+    def respond(self, status, body, content_type=None, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not self.server.bandwidth:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / self.server.bandwidth)
+
+
+def create_server(options, port=0):
+    """コマンドライン引数（add_server_arguments）からサーバーを作成"""
+    if options.fixtures:
+        fixtures = RecordedFixtures(options.fixtures)
+    else:
+        fixtures = GeneratedFixtures(options.items, images=options.images_per_item, image_kb=options.image_kb,
+                                     page_kb=options.page_kb)
+    return FixtureServer(
+        fixtures,
+        port=port,
+        latency=options.latency_ms / 1000,
+        jitter=options.jitter_ms / 1000,
+        bandwidth=options.bandwidth_kbps * 1024,
+        throttle_every=options.throttle_every,
+        retry_after=options.retry_after
+    )
+
+
+def add_server_arguments(parser, items=300):
+    parser.add_argument('--fixtures', metavar='DIR', help='record で保存したページを返す（省略時は生成したページ）')
+    parser.add_argument('--items', type=int, default=items, help=f'生成する物件数（既定: {items}）')
+    parser.add_argument('--images-per-item', type=int, default=IMAGES_PER_ITEM,
+                        help=f'1物件あたりの画像数（既定: {IMAGES_PER_ITEM}）')
+    parser.add_argument('--image-kb', type=int, default=IMAGE_KB, help=f'画像1枚の大きさ KB（既定: {IMAGE_KB}）')
+    parser.add_argument('--page-kb', type=int, default=PAGE_KB, help=f'詳細ページの大きさ KB（既定: {PAGE_KB}）')
+    parser.add_argument('--latency-ms', type=float, default=20, help='応答までの遅延 ミリ秒（既定: 20）')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='遅延に加えるばらつきの最大 ミリ秒（既定: 0）')
+    parser.add_argument('--bandwidth-kbps', type=int, default=0, help='1接続あたりの送信速度 KB/秒（既定: 0 = 無制限）')
+    parser.add_argument('--throttle-every', type=int, default=0, metavar='N',
+                        help='N回に1回 429 を返す（既定: 0 = 返さない）')
+    parser.add_argument('--retry-after', type=int, default=1, help='429 の Retry-After 秒（既定: 1）')
+
+
+def record(directory, pages, images_per_item, rate):
+    """実サイトの一覧ページ・詳細ページ・画像を保存（--fixtures で返せる形式）
+
+    画像が別のホストにある場合もパスで保存し、返すときはどのホストもこのサーバーに置き換える。
+    """
+    from realestate_scraper.config import BASE_URL, HEADERS, LIST_URL
+    from realestate_scraper.crawler import Crawler
+    from realestate_scraper.http_client import HttpClient
+    from realestate_scraper.parsers import parse_page
+    from realestate_scraper.sites import default_site
+
+    os.makedirs(directory, exist_ok=True)
+    site = default_site()
+    http = HttpClient(HEADERS, rate=rate)
+    crawler = Crawler(None, log=lambda message: None)
+    entries = {}
+    origins = {BASE_URL}
+
+    def save(url, kind):
+        res = http.get(url)
+        res.raise_for_status()
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else '')
+        name = f"{len(entries):05d}{os.path.splitext(parts.path)[1] or '.html'}"
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(res.content)
+        entries[target] = {'file': name, 'type': res.headers.get('Content-Type', HTML_TYPE), 'kind': kind}
+        print(f"{kind}: {url}", file=sys.stderr)
+        return res
+
+    try:
+        for page_num in range(1, pages + 1):
+            res = save(site.list_page_url(page_num), 'list')
+            for url, _ in crawler.list_page_items(parse_page(res.text)):
+                if not url.startswith(BASE_URL):
+                    continue
+                page = parse_page(save(url, 'detail').text)
+                for href in page.gallery_hrefs()[:images_per_item]:
+                    parts = urllib.parse.urlsplit(urllib.parse.urljoin(BASE_URL + '/', href))
+                    origins.add(f"{parts.scheme}://{parts.netloc}")
+                    save(parts.geturl(), 'image')
+    finally:
+        http.close()
+        with open(os.path.join(directory, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'list_url': LIST_URL, 'origins': sorted(origins), 'entries': entries}, f,
+                      ensure_ascii=False, indent=2)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ベンチマーク用のローカルHTTPサーバー')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='フィクスチャを返すサーバーを起動')
+    serve.add_argument('--port', type=int, default=8765, help='待ち受けるポート（既定: 8765）')
+    add_server_arguments(serve)
+    recorder = commands.add_parser('record', help='実サイトのページ・画像を保存')
+    recorder.add_argument('directory', help='保存先フォルダ')
+    recorder.add_argument('--pages', type=int, default=1, help='保存する一覧ページ数（既定: 1）')
+    recorder.add_argument('--images-per-item', type=int, default=IMAGES_PER_ITEM,
+                          help=f'1物件あたりに保存する画像数（既定: {IMAGES_PER_ITEM}）')
+    recorder.add_argument('--rate', type=float, default=1.0, help='アクセス上限 回/秒（既定: 1.0）')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        count = record(args.directory, args.pages, args.images_per_item, args.rate)
+        print(json.dumps({'directory': args.directory, 'files': count}, ensure_ascii=False))
+        return
+
+    server = create_server(args, args.port)
+    print(f"{server.base_url}{server.fixtures.list_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""解析エンジンの一致確認（lxml / selectolax / BeautifulSoup の抽出結果を従来の処理と比べる）
+
+    python benchmarks/parser_parity.py
+
+実サイトと同じ構造（物件概要が2つの表に分かれ、物件番号は estateID のセル、
+画像はギャラリーのリンクか preload）の詳細ページと、崩れたマークアップ・空のページを
+インストールされているすべての解析エンジンで Crawler.extract_detail / extract_images にかけ、
+従来版（scraper_gui_v2.py の extract_detail / extract_images）の BeautifulSoup による抽出と
+同じ辞書・画像URLになるか確認する。
+  - 従来版は最初の表だけを読むため、最初の表だけのページは従来版の処理そのものと比べる
+  - 複数の表のページは、従来版の処理を表ごとに行って最初の空でない値を採ったもの（物件概要を
+    すべての表から読む現在の仕様）と比べる
+  - 解析器ごとに木の組み立て方が違い従来版と一致しないことが分かっているページ（DIVERGENT_PAGES）は、
+    記録してある差異（解析エンジンごとの従来版と異なる列の値）と比べる
+結果はJSONで標準出力へ出し、一致しないもの（記録にない差異を含む）があれば終了コード 1。
+記録してある差異がなくなった場合は resolved に出す（DIVERGENT_PAGES から外す）。
+"""
+import json
+import os
+import sys
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from realestate_scraper.config import BASE_URL, LIST_URL  # noqa: E402
+from realestate_scraper.fields import SPEC_COLUMNS  # noqa: E402
+
+ESTATE_ID = '4446901'
+
+
+def spec_rows(columns):
+    return ''.join(f'<tr><th>{column}</th><td>{column}の値</td></tr>' for column in columns)
+
+
+HALF = len(SPEC_COLUMNS) // 2
+GALLERY = ''.join(
+    f'<a class="mainContents_gallery-colorbox cboxElement" href="/img/{ESTATE_ID}/{index}.jpg"><img></a>'
+    for index in range(1, 4)
+)
+PRELOAD = (
+    f'<link rel="preload" as="image" href="https://cdn.example.com/{ESTATE_ID}/exterior_1.jpg">'
+    f'<link rel="preload" as="image" href="https://cdn.example.com/{ESTATE_ID}/interior_1.jpg">'
+    '<link rel="preload" as="image" href="https://cdn.example.com/9999999/EXTERIOR_1.jpg">'
+    f'<link rel="preload" as="image" href="/img/{ESTATE_ID}/Exterior_2.png">'
+)
+
+# (名前, HTML, 最初の表だけか)
+PAGES = [
+    ('two_tables', (
+        f'<html><head>{PRELOAD}</head><body><h1>物件詳細</h1>'
+        f'<table class="spec"><tr><th>物件番号</th><td class="estateID">\n {ESTATE_ID} \n</td></tr>'
+        f'{spec_rows(SPEC_COLUMNS[:HALF])}</table>'
+        f'<p>周辺環境</p><table class="spec">{spec_rows(SPEC_COLUMNS[HALF:])}</table>'
+        f'<div class="gallery">{GALLERY}</div></body></html>'
+    ), False),
+    ('single_table_preload', (
+        f'<html><head>{PRELOAD}</head><body>'
+        f'<table><tbody><tr><th>物件番号</th><td class="estateID">{ESTATE_ID}</td></tr>'
+        '<tr><th>価格</th><td> 1,980万円 </td><th>間取り</th><td>4LDK</td></tr>'
+        '<tr><th>所在地</th><td>埼玉県白岡市<span>白岡1-2-3</span></td></tr>'
+        '<tr><th>アクセス</th><th>駐車場</th><td>2台</td></tr>'
+        '<tr><th>備考</th><td></td></tr></tbody></table></body></html>'
+    ), True),
+    # 閉じタグの欠落・引用符のない属性・余分な閉じタグ・コメント・文字参照・改行タグ
+    # （セルの閉じ忘れや表の中の余分な閉じタグは DIVERGENT_PAGES）
+    ('malformed', (
+        '<html><body><div><p>物件概要</span></div><table class=spec><tr><th>価格</th><td>2,480万円</td></tr>'
+        '<!-- <tr><th>間取り</th><td>コメント</td></tr> -->'
+        '<tr><th>間取り</th><td>3LDK&nbsp;+&nbsp;S</td></tr>'
+        f'<tr><th>物件番号</th><td class=estateID>{ESTATE_ID}</td></tr>'
+        '<tr><th>建物面積</th><td>98.54㎡<br>（29.80坪）</td></tr>'
+        '<tr><th>その他費用</th><td>管理費&amp;修繕積立金</td></tr></table>'
+        '<a class=mainContents_gallery-colorbox>画像なし</a>'
+        f'<a class="mainContents_gallery-colorbox" href="img/{ESTATE_ID}/1.jpg?w=800">1</a>'
+    ), True),
+    ('no_table', '<html><body><p>ページが見つかりません</p></body></html>', True),
+    ('empty', '', True),
+]
+
+# 解析器ごとに木の組み立て方が違い、従来版（html.parser）と一致しないページ
+# (名前, HTML, {解析エンジン: {従来版と異なる列: 現在の値}})（記載のない解析エンジンは従来版と一致する）
+DIVERGENT_PAGES = [
+    # th / td の閉じ忘れ: html.parser はセルを入れ子にするため、従来版は物件番号のセルに後ろの行まで含める
+    ('unclosed_cells', (
+        f'<table><tr><th>物件番号<td class=estateID>{ESTATE_ID}<tr><th>価格<td>1,980万円<tr><th>間取り<td>4LDK</table>'
+    ), {
+        'lxml': {'物件番号': ESTATE_ID, '価格': '1,980万円', '間取り': '4LDK'},
+        'selectolax': {'物件番号': ESTATE_ID, '価格': '1,980万円', '間取り': '4LDK'},
+    }),
+    # th だけの閉じ忘れ: html.parser は td を th の中に入れるため、従来版は項目名を読めない
+    ('unclosed_th', (
+        f'<table><tr><th>価格<td>1,980万円</td></tr><tr><th>物件番号<td class=estateID>{ESTATE_ID}</td></tr></table>'
+    ), {
+        'lxml': {'価格': '1,980万円'},
+        'selectolax': {'価格': '1,980万円'},
+    }),
+    # 表の中の余分な閉じタグ（表の外の div を閉じる）: html.parser ではそこで表が終わる
+    ('close_outer_div_in_table', (
+        '<div><table><tr><th>価格</th><td>2,480万円</td></tr></div><tr><th>間取り</th><td>3LDK</td></tr>'
+        f'<tr><th>物件番号</th><td class=estateID>{ESTATE_ID}</td></tr></table></div>'
+    ), {
+        'lxml': {'間取り': '3LDK'},
+        'selectolax': {'間取り': '3LDK'},
+        'bs4': {'間取り': '3LDK'},
+    }),
+]
+
+
+def baseline_cells_data(cells):
+    """従来版の extract_detail の表の読み取り（th の次の td を値とし、後の同じ項目で上書き）"""
+    data = {}
+    i = 0
+    while i < len(cells):
+        cell = cells[i]
+        if cell.name == 'th':
+            key = cell.text.strip()
+            j = i + 1
+            while j < len(cells):
+                next_cell = cells[j]
+                if next_cell.name == 'td':
+                    data[key] = next_cell.text.strip()
+                    i = j
+                    break
+                elif next_cell.name == 'th':
+                    break
+                j += 1
+        i += 1
+    return data
+
+
+def baseline_detail(soup, url, first_table_only):
+    """従来版の extract_detail（first_table_only=False では表ごとに読み、最初の空でない値を使う）"""
+    estate_elem = soup.find('td', class_='estateID')
+    estate_id = estate_elem.text.strip() if estate_elem else ''
+
+    tables = soup.find_all('table')
+    data = {}
+    for table in tables[:1] if first_table_only else tables:
+        for key, value in baseline_cells_data(table.find_all(['th', 'td'])).items():
+            if not data.get(key):
+                data[key] = value
+
+    summary = {'物件番号': estate_id}
+    for column in SPEC_COLUMNS:
+        summary[column] = data.get(column, '')
+    summary['詳細ページ'] = url
+    return summary
+
+
+def baseline_images(soup, estate_id):
+    """従来版の extract_images の画像URL（ダウンロードは行わない）"""
+    img_urls = []
+    img_tags = soup.select('a.mainContents_gallery-colorbox')
+    preload_tags = soup.select('link[rel="preload"][as="image"]')
+    if img_tags:
+        for tag in img_tags:
+            href = tag.get('href')
+            if href:
+                img_urls.append(href)
+    elif estate_id and preload_tags:
+        for tag in preload_tags:
+            href = tag.get('href', '')
+            if estate_id in href and 'exterior' in href.lower():
+                img_urls.append(href)
+    return [urllib.parse.urljoin(BASE_URL, url) for url in img_urls]
+
+
+def main():
+    from bs4 import BeautifulSoup
+
+    from realestate_scraper.crawler import Crawler
+    from realestate_scraper.parsers import available_backends, parse_page
+    from realestate_scraper.sites import Site
+
+    site = Site('parity', BASE_URL, LIST_URL)
+    crawler = Crawler(None, log=lambda message: None, site=site)
+    url = f"{BASE_URL}/detail/{ESTATE_ID}/"
+    backends = available_backends()
+    pages = [(name, html, first_table_only, {}) for name, html, first_table_only in PAGES]
+    pages += [(name, html, True, known) for name, html, known in DIVERGENT_PAGES]
+    problems = []
+    resolved = []
+    for name, html, first_table_only, known in pages:
+        soup = BeautifulSoup(html, 'html.parser')
+        expected = baseline_detail(soup, url, first_table_only)
+        expected_images = baseline_images(soup, expected['物件番号'])
+        for backend in backends:
+            page = parse_page(html, backend)
+            detail = crawler.extract_detail(page, url)
+            detail.pop('サイト')
+            images = crawler.extract_images(page, detail['物件番号'])
+            different = {column: detail.get(column) for column in expected if detail.get(column) != expected[column]}
+            recorded = known.get(backend, {})
+            if recorded and not different:
+                resolved.append(f"{name} / {backend}: 記録してある差異がなくなりました（従来版と一致）")
+            elif different != recorded:
+                problems.append(f"{name} / {backend}: {', '.join(sorted(different))} が従来版と異なります"
+                                f"{f'（記録してある差異: {recorded}、現在: {different}）' if recorded else ''}")
+            if images != expected_images:
+                problems.append(f"{name} / {backend}: 画像URL {images} が従来版 {expected_images} と異なります")
+
+    report = {
+        'backends': backends,
+        'pages': [name for name, _, _, _ in pages],
+        'known_differences': [name for name, _, _ in DIVERGENT_PAGES],
+        'ok': not problems,
+        'problems': problems,
+        'resolved': resolved,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
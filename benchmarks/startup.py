@@ -0,0 +1,102 @@
+"""GUIの起動時間（ウィンドウが表示され操作できるまで）の計測
+
+    python benchmarks/startup.py                       # スクリプト版
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --exe "dist/不動産スクレイパーv2"   # PyInstaller版
+
+アプリを環境変数 SCRAPER_STARTUP_PROBE=1 付きで起動し、"window-ready" が
+出力されるまでの時間を計る。
+  cold: スクリプト版はバイトコードキャッシュなし（空の pycache_prefix）での起動、
+        実行ファイル版は1回目の起動
+  warm: 2回目以降の起動
+画面のない環境（DISPLAY なし）では、代わりにモジュールの読み込み時間だけを計る。
+結果はJSONで標準出力へ出す。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_SCRIPT = os.path.join(ROOT, 'scraper_gui_v2.py')
+PROBE_ENV = 'SCRAPER_STARTUP_PROBE'
+READY_LINE = 'window-ready'
+TIMEOUT = 60
+
+
+def has_display():
+    return sys.platform in ('win32', 'darwin') or bool(os.environ.get('DISPLAY'))
+
+
+def time_to_ready(command, env, cwd):
+    """起動から "window-ready" が出力されるまでの秒数"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        for line in proc.stdout:
+            if line.strip() == READY_LINE:
+                return time.perf_counter() - started
+        raise RuntimeError(f"ウィンドウが表示されませんでした: {proc.stderr.read().strip()}")
+    finally:
+        try:
+            proc.wait(timeout=TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def time_to_import(env, cwd):
+    """画面なしでGUIモジュールを読み込むまでの秒数（インタプリタ起動を含む）"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import scraper_gui_v2'], env=env, cwd=cwd, check=True)
+    return time.perf_counter() - started
+
+
+def summarize(samples):
+    samples = [round(sample * 1000, 1) for sample in samples]
+    return {'min': min(samples), 'median': statistics.median(samples), 'max': max(samples), 'samples': samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GUIの起動時間の計測')
+    parser.add_argument('--runs', type=int, default=5, help='warm の計測回数（既定: 5）')
+    parser.add_argument('--exe', help='PyInstaller でビルドした実行ファイル（省略時はスクリプト版）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 履歴などのファイルは一時フォルダに作らせる
+        env = dict(os.environ, **{PROBE_ENV: '1'})
+        env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+        if args.exe:
+            mode = 'window'
+            measure = lambda env: time_to_ready([os.path.abspath(args.exe)], env, workdir)
+        elif has_display():
+            mode = 'window'
+            measure = lambda env: time_to_ready([sys.executable, GUI_SCRIPT], env, workdir)
+        else:
+            mode = 'import'
+            measure = lambda env: time_to_import(env, workdir)
+
+        # cold: 空のバイトコードキャッシュ（スクリプト版）/ 1回目の起動（実行ファイル版）
+        cold_env = dict(env, PYTHONPYCACHEPREFIX=os.path.join(workdir, 'pycache'))
+        cold = measure(cold_env)
+        warm = [measure(cold_env) for _ in range(args.runs)]
+
+    report = {
+        'target': args.exe or GUI_SCRIPT,
+        'mode': mode,
+        'python': sys.version.split()[0],
+        'cold_ms': round(cold * 1000, 1),
+        'warm_ms': summarize(warm),
+    }
+    if mode == 'import':
+        report['note'] = '画面がないためGUIモジュールの読み込み時間のみ計測'
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""不動産スクレイピングツールの共通モジュール"""
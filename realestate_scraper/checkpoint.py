@@ -0,0 +1,79 @@
+"""中断した実行を再開するためのチェックポイント"""
+import json
+import os
+import time
+from datetime import datetime
+
+# チェックポイントを書き出す間隔（秒）
+CHECKPOINT_INTERVAL = 10
+
+
+def load_checkpoint(path):
+    """保存済みのチェックポイントを読み込む（なければ None）"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_checkpoint(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Checkpoint:
+    """取得予定のURL・完了済みURL・未完了の画像ジョブを定期的に保存
+
+    書き込みは一時ファイル経由で置き換えるため、途中で落ちても壊れない。
+    """
+
+    def __init__(self, path, frontier, completed=(), interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.frontier = [list(item) for item in frontier]
+        self.completed = set(completed)
+        self.interval = interval
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.last_saved = 0.0
+
+    @classmethod
+    def resume(cls, path, data, interval=CHECKPOINT_INTERVAL):
+        checkpoint = cls(path, data.get('frontier', []), data.get('completed', []), interval)
+        checkpoint.started_at = data.get('started_at', checkpoint.started_at)
+        return checkpoint
+
+    def remaining(self):
+        """まだ完了していない (URL, 物件番号) の組"""
+        return [(url, estate_id) for url, estate_id in self.frontier if url not in self.completed]
+
+    def extend(self, pairs):
+        """一覧の取得が進むたびに取得予定の (URL, 物件番号) を追加"""
+        self.frontier.extend(list(item) for item in pairs)
+
+    def mark_completed(self, url):
+        self.completed.add(url)
+
+    def save_if_due(self, pending_images):
+        if time.monotonic() - self.last_saved >= self.interval:
+            self.save(pending_images)
+
+    def save(self, pending_images):
+        data = {
+            'started_at': self.started_at,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'frontier': self.frontier,
+            'completed': sorted(self.completed),
+            'pending_images': pending_images,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+
+    def clear(self):
+        clear_checkpoint(self.path)
@@ -0,0 +1,441 @@
+"""コマンドライン版（tkinterを使わずにサーバーやcronから実行する）
+
+    python -m realestate_scraper crawl --max-items 100 --workers 8 --no-images
+    python -m realestate_scraper crawl --resume
+    python -m realestate_scraper crawl --sites sites.json --site-concurrency 4
+    python -m realestate_scraper crawl --sites --processes 8
+    python -m realestate_scraper crawl --metrics-port 9108
+    python -m realestate_scraper crawl --profile sample --tracemalloc
+    python -m realestate_scraper status
+    python -m realestate_scraper export
+    python -m realestate_scraper normalize --output export_normalized.json
+
+標準出力には1行1件のJSON（start / progress / item / done）で進捗を出し、
+実行ログは標準エラー出力へ出す。終了コードは EXIT_* を参照。
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+from datetime import datetime
+
+from .checkpoint import load_checkpoint
+from .config import (
+    CHECKPOINT_FILE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_FULL_SWEEP_DAYS, DEFAULT_KNOWN_PAGE_LIMIT, DEFAULT_MAX_ITEMS,
+    DEFAULT_RATE, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES, DEFAULT_SITE_CONCURRENCY, DEFAULT_WORKERS, HISTORY_DB,
+    HISTORY_FILE, NORMALIZED_FILE, PROFILE_DIR, QUEUE_DB, SITES_FILE,
+)
+from .history import HistoryStore, migrate_history
+from .parsers import PARSER_BACKENDS
+from .profiling import DEFAULT_TOP, PROFILE_MODES
+
+EXIT_OK = 0
+EXIT_ERROR = 1  # 実行中のエラー・再開できるチェックポイント（ジョブ）がない
+EXIT_USAGE = 2  # 引数の誤り（argparse と同じ）
+EXIT_NO_URLS = 3  # 一覧ページから物件URLが取得できなかった
+EXIT_PARTIAL = 4  # 完了したが一部の物件でエラー
+EXIT_INTERRUPTED = 130  # シグナルで停止（中断位置は保存済み）
+
+
+def emit(event, **data):
+    """進捗イベントをJSON 1行で標準出力へ"""
+    data = dict(event=event, time=datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), **data)
+    print(json.dumps(data, ensure_ascii=False), flush=True)
+
+
+def make_logger(quiet):
+    def log(message):
+        if quiet:
+            return
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        for line in str(message).split('\n'):
+            print(f"[{timestamp}] {line}", file=sys.stderr, flush=True)
+    return log
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m realestate_scraper', description='不動産スクレイピングツール（コマンドライン版）')
+    parser.add_argument('-q', '--quiet', action='store_true', help='実行ログ（標準エラー出力）を出さない')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help='物件を取得して保存する')
+    crawl.add_argument('--max-items', type=int, default=DEFAULT_MAX_ITEMS, help=f'取得件数（既定: {DEFAULT_MAX_ITEMS}）')
+    crawl.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'詳細ページの並列数（既定: {DEFAULT_WORKERS}）')
+    crawl.add_argument('--rate', type=float, default=DEFAULT_RATE, help=f'アクセス上限 回/秒（既定: {DEFAULT_RATE}）')
+    crawl.add_argument('--no-adaptive', action='store_true', help='混雑に合わせたアクセスレートの自動調整をしない')
+    crawl.add_argument('--connect-timeout', type=float, default=DEFAULT_CONNECT_TIMEOUT,
+                       help=f'接続のタイムアウト 秒（既定: {DEFAULT_CONNECT_TIMEOUT}）')
+    crawl.add_argument('--read-timeout', type=float, default=DEFAULT_READ_TIMEOUT,
+                       help=f'受信のタイムアウト 秒（既定: {DEFAULT_READ_TIMEOUT}）')
+    crawl.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                       help=f'接続エラー・429/5xx の再試行回数（既定: {DEFAULT_RETRIES}）')
+    crawl.add_argument('--no-images', action='store_true', help='画像をダウンロードしない（URLのみ記録）')
+    crawl.add_argument('--no-skip', action='store_true', help='取得済みの物件も取得し直す')
+    crawl.add_argument('--refresh', action='store_true', help='取得済みでも内容が変わった物件は再取得する')
+    crawl.add_argument('--no-incremental', action='store_true', help='差分モードを使わず指定件数まで一覧を確認する')
+    crawl.add_argument('--known-pages', type=int, default=DEFAULT_KNOWN_PAGE_LIMIT,
+                       help=f'差分モードで一覧取得を打ち切る既知ページ数（既定: {DEFAULT_KNOWN_PAGE_LIMIT}）')
+    crawl.add_argument('--full-sweep-days', type=int, default=DEFAULT_FULL_SWEEP_DAYS,
+                       help=f'全ページを確認する間隔（日、0: しない、既定: {DEFAULT_FULL_SWEEP_DAYS}）')
+    crawl.add_argument('--no-cache', action='store_true', help='HTTPキャッシュを使わない')
+    crawl.add_argument('--parser', default='auto', choices=['auto'] + list(PARSER_BACKENDS), help='HTML解析エンジン')
+    crawl.add_argument('--no-export', action='store_true', help='完了時にCSV/JSONを出力しない')
+    crawl.add_argument('--resume', action='store_true', help=f'中断した前回の実行を続きから再開する（{CHECKPOINT_FILE}）')
+    crawl.add_argument('--sites', nargs='?', const=SITES_FILE, metavar='FILE',
+                       help=f'設定ファイルの全サイトを同時に取得する（FILE 省略時: {SITES_FILE}）')
+    crawl.add_argument('--site', action='append', metavar='NAME', help='--sites のうち指定したサイトだけ取得（複数指定可）')
+    crawl.add_argument('--site-concurrency', type=int, default=DEFAULT_SITE_CONCURRENCY,
+                       help=f'同時に取得するサイト数（既定: {DEFAULT_SITE_CONCURRENCY}）')
+    crawl.add_argument('--processes', type=int, default=0, metavar='N',
+                       help='ジョブキューを使い N 個のワーカープロセスで取得する（--workers は1プロセスあたりのスレッド数）')
+    crawl.add_argument('--queue', default=QUEUE_DB, metavar='FILE', help=f'--processes のジョブキュー（既定: {QUEUE_DB}）')
+    crawl.add_argument('--fresh', action='store_true',
+                       help='--processes で前回の未処理のジョブが残っていても破棄して新しく始める（既定: 続きから再開）')
+    crawl.add_argument('--metrics-port', type=int, default=0, metavar='PORT',
+                       help='実行中の計測値を http://HOST:PORT/metrics で Prometheus 形式で返す')
+    crawl.add_argument('--metrics-host', default='127.0.0.1', metavar='HOST',
+                       help='--metrics-port で待ち受けるアドレス（既定: 127.0.0.1）')
+    crawl.add_argument('--profile', nargs='?', const='cprofile', choices=PROFILE_MODES,
+                       help='実行をプロファイルする（cprofile: 関数ごとの時間〈省略時〉 / sample: サンプリング）')
+    crawl.add_argument('--tracemalloc', action='store_true', help='開始時と終了時のメモリ割り当てを比べて増えた箇所を出力する')
+    crawl.add_argument('--profile-dir', default=PROFILE_DIR, metavar='DIR',
+                       help=f'プロファイルの保存先（既定: {PROFILE_DIR}）')
+    crawl.add_argument('--profile-top', type=int, default=DEFAULT_TOP, metavar='N',
+                       help=f'要約に出す関数・行の数（既定: {DEFAULT_TOP}）')
+
+    status = commands.add_parser('status', help='ジョブキューの進捗（全プロセスの合計）を出力する')
+    status.add_argument('--queue', default=QUEUE_DB, metavar='FILE', help=f'ジョブキュー（既定: {QUEUE_DB}）')
+
+    commands.add_parser('export', help='物件データベースからCSV/JSONを出力する')
+
+    normalize = commands.add_parser(
+        'normalize', help='価格・面積・築年月・建ぺい/容積率を数値・日付の列にして出力する（pandas が必要）'
+    )
+    normalize.add_argument('--output', default=NORMALIZED_FILE, metavar='FILE',
+                           help=f'出力先（拡張子 .csv / .json / .parquet、既定: {NORMALIZED_FILE}）')
+    return parser
+
+
+def validate(parser, args):
+    if args.command != 'crawl':
+        return
+    if args.max_items <= 0:
+        parser.error('--max-items は1以上を指定してください')
+    if args.workers <= 0 or args.rate <= 0:
+        parser.error('--workers と --rate は正の数値を指定してください')
+    if args.known_pages <= 0 or args.full_sweep_days < 0:
+        parser.error('--known-pages は1以上、--full-sweep-days は0以上を指定してください')
+    if args.connect_timeout <= 0 or args.read_timeout <= 0 or args.retries < 0:
+        parser.error('--connect-timeout と --read-timeout は正の数値、--retries は0以上を指定してください')
+    if args.site_concurrency <= 0:
+        parser.error('--site-concurrency は1以上を指定してください')
+    if args.site and not args.sites:
+        parser.error('--site は --sites と一緒に指定してください')
+    if args.processes < 0:
+        parser.error('--processes は0以上を指定してください')
+    if args.fresh and (not args.processes or args.resume):
+        parser.error('--fresh は --processes と一緒に、--resume なしで指定してください')
+    if not 0 <= args.metrics_port <= 65535:
+        parser.error('--metrics-port は0〜65535を指定してください')
+    if args.profile_top <= 0:
+        parser.error('--profile-top は1以上を指定してください')
+
+
+def install_stop_handler(crawler, log):
+    """SIGINT/SIGTERM で中断位置を保存して止める（2回目は即座に終了）"""
+    def handler(signum, frame):
+        if not crawler.is_running:
+            raise KeyboardInterrupt
+        log("⚠️ 停止リクエストを受信しました...")
+        crawler.stop()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+
+def run_options(args):
+    """Crawler.run / MultiSiteCrawler.run に共通の引数"""
+    return dict(
+        max_items=args.max_items,
+        workers=args.workers,
+        known_pages=args.known_pages,
+        full_sweep_days=args.full_sweep_days,
+        skip_scraped=not args.no_skip,
+        refresh=args.refresh,
+        incremental=not args.no_incremental,
+        use_cache=not args.no_cache,
+        parser=args.parser,
+        download_images=not args.no_images,
+        export_on_finish=not args.no_export,
+        timeout=(args.connect_timeout, args.read_timeout),
+        retries=args.retries,
+        adaptive=not args.no_adaptive
+    )
+
+
+def start_metrics_server(args, sources, log):
+    """--metrics-port の指定があれば実行中の計測値を返すサーバーを起動（sources は MetricsServer と同じ）"""
+    if not args.metrics_port:
+        return None
+    from .metrics import METRICS_PATH, MetricsServer
+
+    try:
+        server = MetricsServer(sources, args.metrics_port, args.metrics_host).start()
+    except OSError as ex:
+        log(f"⚠️ 計測値のサーバーを起動できませんでした（{args.metrics_host}:{args.metrics_port}）: {ex}")
+        return None
+    log(f"📊 計測値: http://{args.metrics_host}:{args.metrics_port}{METRICS_PATH}")
+    return server
+
+
+def run_with_metrics(args, sources, log, run):
+    """計測値のサーバーを起動して run() を実行し、終わったら止める"""
+    server = start_metrics_server(args, sources, log)
+    try:
+        return run()
+    finally:
+        if server:
+            server.close()
+
+
+def profile_options(args):
+    """--profile / --tracemalloc の指定（profiling.RunProfiler の引数、指定がなければ None）"""
+    if not args.profile and not args.tracemalloc:
+        return None
+    return dict(mode=args.profile, directory=args.profile_dir, top=args.profile_top, tracemalloc=args.tracemalloc)
+
+
+def profiled(args, log):
+    """--profile / --tracemalloc の指定があれば実行をプロファイルする with 文"""
+    options = profile_options(args)
+    if options is None:
+        return contextlib.nullcontext()
+    from .profiling import RunProfiler
+
+    return RunProfiler(log=log, **options)
+
+
+def exit_code_for(result):
+    if result['status'] == 'completed':
+        return EXIT_PARTIAL if result['errors'] else EXIT_OK
+    if result['status'] == 'stopped':
+        return EXIT_INTERRUPTED
+    if result['status'] == 'no_urls':
+        return EXIT_NO_URLS
+    return EXIT_ERROR
+
+
+def fail(log, message, error):
+    log(f"❌ {message}")
+    emit('done', status='error', error=error, exit_code=EXIT_ERROR)
+    return EXIT_ERROR
+
+
+def crawl(args, history, log):
+    if args.processes:
+        return crawl_queue(args, log)
+    if args.sites:
+        return crawl_sites(args, log)
+
+    from .crawler import Crawler
+
+    resume = None
+    if args.resume:
+        resume = load_checkpoint(CHECKPOINT_FILE)
+        if resume is None:
+            return fail(log, f"再開できる実行がありません（{CHECKPOINT_FILE} がありません）", 'no checkpoint')
+
+    crawler = Crawler(
+        history,
+        log=log,
+        progress=lambda current, total: emit('progress', current=current, total=total),
+        item=lambda status, url, record: emit(
+            'item', status=status, url=url, site=(record or {}).get('サイト', ''),
+            estate_id=(record or {}).get('物件番号', '')
+        )
+    )
+    install_stop_handler(crawler, log)
+    emit('start', command='crawl', max_items=args.max_items, workers=args.workers, rate=args.rate,
+         images=not args.no_images, resume=bool(resume))
+
+    with profiled(args, log):
+        result = run_with_metrics(
+            args, lambda: [({'site': crawler.site.name}, crawler.metrics)], log,
+            lambda: crawler.run(rate=args.rate, resume=resume, **run_options(args))
+        )
+    exit_code = exit_code_for(result)
+    emit('done', exit_code=exit_code, **result)
+    return exit_code
+
+
+def select_sites(args):
+    """--sites / --site で指定したサイト（読み込めない場合や不明なサイトは ValueError）"""
+    from .sites import load_sites
+
+    try:
+        sites = load_sites(args.sites)
+    except (OSError, ValueError) as ex:
+        raise ValueError(f"サイトの設定を読み込めません: {ex}") from ex
+    if args.site:
+        unknown = sorted(set(args.site) - {site.name for site in sites})
+        if unknown:
+            raise ValueError(f"{args.sites} にないサイトです: {', '.join(unknown)}")
+        sites = [site for site in sites if site.name in args.site]
+    return sites
+
+
+def crawl_sites(args, log):
+    """設定ファイルの複数サイトを同時に取得"""
+    from .multisite import MultiSiteCrawler
+
+    try:
+        sites = select_sites(args)
+    except ValueError as ex:
+        return fail(log, str(ex), str(ex))
+    if args.resume and not any(load_checkpoint(site.file(CHECKPOINT_FILE)) for site in sites):
+        return fail(log, "再開できる実行がありません（どのサイトにもチェックポイントがありません）", 'no checkpoint')
+
+    crawler = MultiSiteCrawler(
+        sites,
+        log=log,
+        progress=lambda site, current, total: emit('progress', site=site, current=current, total=total),
+        item=lambda site, status, url, record: emit(
+            'item', status=status, url=url, site=site, estate_id=(record or {}).get('物件番号', '')
+        )
+    )
+    install_stop_handler(crawler, log)
+    emit('start', command='crawl', sites=[site.name for site in sites], max_items=args.max_items,
+         workers=args.workers, rate=args.rate, images=not args.no_images, resume=args.resume)
+
+    with profiled(args, log):
+        result = run_with_metrics(
+            args, lambda: [({'site': site.site.name}, site.metrics) for site in crawler.crawlers], log,
+            lambda: crawler.run(rate=args.rate, concurrency=args.site_concurrency, resume=args.resume,
+                                **run_options(args))
+        )
+    exit_code = exit_code_for(result)
+    emit('done', exit_code=exit_code, **result)
+    return exit_code
+
+
+def crawl_queue(args, log):
+    """ジョブキューに登録して複数のワーカープロセスで取得（--resume ではキューに残ったジョブを処理）"""
+    from .queue_crawler import QueueCrawler
+    from .sites import default_site
+    from .workqueue import WorkQueue
+
+    sites = None
+    if args.resume:
+        queue = WorkQueue(args.queue) if os.path.exists(args.queue) else None
+        remaining = queue.unfinished() if queue else 0
+        if queue:
+            queue.close()
+        if not remaining:
+            return fail(log, f"再開できる実行がありません（{args.queue} に未処理のジョブがありません）", 'no checkpoint')
+    elif args.sites:
+        try:
+            sites = select_sites(args)
+        except ValueError as ex:
+            return fail(log, str(ex), str(ex))
+    else:
+        sites = [default_site()]
+
+    crawler = QueueCrawler(
+        args.queue,
+        log=log,
+        progress=lambda site, current, total: emit('progress', site=site, current=current, total=total),
+        quiet=args.quiet,
+        profile=profile_options(args)
+    )
+    install_stop_handler(crawler, log)
+    emit('start', command='crawl', sites=[site.name for site in sites] if sites else None,
+         max_items=args.max_items, processes=args.processes, workers=args.workers, rate=args.rate,
+         images=not args.no_images, resume=args.resume)
+
+    result = run_with_metrics(
+        args, crawler.live_metrics, log,
+        lambda: crawler.run(sites, rate=args.rate, processes=args.processes, resume=args.resume, fresh=args.fresh,
+                            **run_options(args))
+    )
+    exit_code = exit_code_for(result)
+    emit('done', exit_code=exit_code, **result)
+    return exit_code
+
+
+def status(args, log):
+    """ジョブキューの集計（全ワーカープロセスの進捗）を出力"""
+    from .workqueue import WorkQueue
+
+    if not os.path.exists(args.queue):
+        return fail(log, f"{args.queue} がありません", 'no queue')
+    queue = WorkQueue(args.queue)
+    try:
+        summary = queue.summary()
+        unfinished = queue.unfinished()
+    finally:
+        queue.close()
+    for site, kinds in summary.items():
+        for kind, counts in kinds.items():
+            log(f"[{site}] {kind}: 待ち {counts['pending']} / 処理中 {counts['leased']} / "
+                f"完了 {counts['done']} / 失敗 {counts['failed']}")
+    emit('status', unfinished=unfinished, sites=summary, exit_code=EXIT_OK)
+    return EXIT_OK
+
+
+def export(args, history, log):
+    from .crawler import Crawler
+
+    try:
+        count = Crawler(history, log=log).export()
+    except Exception as ex:
+        return fail(log, f"出力エラー: {ex}", str(ex))
+    emit('done', status='completed', count=count, exit_code=EXIT_OK)
+    return EXIT_OK
+
+
+def normalize(args, history, log):
+    """物件データベースの全件に型付きの列を加えて出力し、読み取れなかった値を報告する"""
+    from .crawler import Crawler
+    from .normalize import export_normalized, load_frame, normalize_frame
+    from .store import EXPORT_COLUMNS
+
+    log("🔢 物件データを正規化中...")
+    try:
+        store = Crawler(history, log=log).open_store()
+        try:
+            frame = load_frame(store.records())
+        finally:
+            store.close()
+        frame, unparsed = normalize_frame(frame)
+        count = export_normalized(frame, args.output, EXPORT_COLUMNS)
+    except Exception as ex:
+        return fail(log, f"正規化エラー: {ex}", str(ex))
+    for column, values in unparsed.items():
+        log(f"⚠️ {column}: 読み取れない値 {values['count']}件（例: {' / '.join(values['examples'])}）")
+    log(f"  ✓ 出力完了: {args.output}（{count}件）")
+    emit('done', status='completed', count=count, output=args.output, unparsed=unparsed, exit_code=EXIT_OK)
+    return EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    validate(parser, args)
+    log = make_logger(args.quiet)
+
+    history = HistoryStore(HISTORY_DB)
+    try:
+        migrated = migrate_history(history, HISTORY_FILE, log)
+        if migrated is not None:
+            log(f"📥 {HISTORY_FILE} から {migrated}件 の取得履歴を {HISTORY_DB} に移行しました")
+        if args.command == 'crawl':
+            return crawl(args, history, log)
+        if args.command == 'status':
+            return status(args, log)
+        if args.command == 'normalize':
+            return normalize(args, history, log)
+        return export(args, history, log)
+    finally:
+        history.close()
@@ -0,0 +1,48 @@
+"""対象サイト・出力ファイル・既定値の設定（GUI・コマンドライン共通）
+
+起動を速くするため、ここでは重いライブラリを読み込まない。
+"""
+
+# 既定の対象サイト（sites.json を使わない場合）
+DEFAULT_SITE = 'shiraoka-housedo'
+LIST_URL = 'https://shiraoka-housedo.com/list/'
+BASE_URL = 'https://shiraoka-housedo.com'
+SITES_FILE = 'sites.json'  # 複数サイトの設定（コマンドライン版の --sites）
+IMG_FOLDER = 'images'
+CSV_FILE = 'export.csv'
+JSON_FILE = 'export.json'
+NORMALIZED_FILE = 'export_normalized.csv'  # 型付きの列（価格_円など）を加えた出力（normalize）
+STORE_FILE = 'properties.db'  # 物件データベース（CSV/JSONはここから出力）
+RECORDS_FILE = 'records.jsonl'  # 取得した物件を1件ずつ追記する記録ファイル
+HISTORY_DB = 'scraping_history.db'  # 取得履歴データベース
+HISTORY_FILE = 'scraping_history.json'  # 旧形式の取得履歴（初回起動時に取り込む）
+IMAGE_STATUS_FILE = 'image_status.json'  # 画像ごとのダウンロード結果
+CHECKPOINT_FILE = 'crawl_checkpoint.json'  # 中断した実行の再開用
+QUEUE_DB = 'work_queue.db'  # 複数プロセスで取得する場合のジョブキュー（コマンドライン版の --processes）
+METRICS_FILE = 'run_metrics.json'  # 実行ごとの計測値（段階ごとの所要時間・通信量・回数）
+PROFILE_DIR = 'profiles'  # --profile で保存するプロファイル
+LOG_FILE = 'scraper.log'  # GUIの実行ログ（画面には直近の分だけ表示）
+DEFAULT_MAX_ITEMS = 15
+DEFAULT_WORKERS = 4  # 詳細ページを並列取得するワーカー数
+DEFAULT_SITE_CONCURRENCY = 4  # 複数サイトのとき同時に取得するサイト数
+
+# ホストごとの既定アクセスレート（リクエスト/秒）
+DEFAULT_RATE = 2.0
+
+# 通信のタイムアウト（接続・受信、秒）と、失敗時（接続エラー・429/5xx）の再試行回数
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+
+# 差分モード: 既知の物件だけのページがこの数だけ続いたら一覧取得を打ち切る
+DEFAULT_KNOWN_PAGE_LIMIT = 2
+# 差分モードでも、この日数ごとに全ページを確認する（並び替えられた物件の取りこぼし対策）
+DEFAULT_FULL_SWEEP_DAYS = 7
+
+# ユーザーエージェント付き共通ヘッダ
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/106.0.0.0 Safari/537.36",
+    "Accept-Language": "ja,en-US;q=0.9",
+    "Referer": "https://shiraoka-housedo.com/list/"
+}
@@ -0,0 +1,696 @@
+"""一覧・詳細・画像の取得から保存・出力まで（GUI・コマンドライン共通）"""
+import json
+import os
+import queue
+import re
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .checkpoint import Checkpoint
+from .config import (
+    CHECKPOINT_FILE, CSV_FILE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_FULL_SWEEP_DAYS, DEFAULT_KNOWN_PAGE_LIMIT,
+    DEFAULT_MAX_ITEMS, DEFAULT_RATE, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES, DEFAULT_SITE, DEFAULT_WORKERS,
+    IMAGE_STATUS_FILE, IMG_FOLDER, JSON_FILE, METRICS_FILE, RECORDS_FILE, STORE_FILE,
+)
+from .fields import SPEC_COLUMNS, extract_spec
+from .history import item_fingerprint, record_fingerprint
+from .http_cache import DEFAULT_CACHE_DIR, HttpCache
+from .http_client import DEFAULT_POOL_SIZE, HttpClient
+from .images import DEFAULT_IMAGE_WORKERS, IMAGE_EXTENSIONS, ImageDownloader
+from .metrics import Metrics
+from .parsers import parse_page, resolve_backend
+from .sink import JsonlSink
+from .sites import default_site
+from .store import PropertyStore, export_csv, export_json
+
+# 詳細ページURLに含まれる物件番号（5桁以上の数字）
+ESTATE_ID_PATTERN = re.compile(r'(\d{5,})')
+
+
+class Crawler:
+    """物件を取得して物件データベース・取得履歴へ保存する
+
+    画面には依存せず、経過はコールバックで通知する。
+      log(message)               : 実行ログ
+      progress(current, total)   : 詳細ページの処理件数
+      item(status, url, record)  : 1件ごとの結果（status は scraped / updated / unchanged /
+                                   skipped / no_id / error）
+    site は対象サイト（sites.Site、省略時は既定のサイト）で、history はそのサイトの取得履歴。
+    複数サイトを同時に取得する場合は store / sink / save_lock を共有する（閉じるのは呼び出し側）。
+    段階ごとの所要時間・通信量などは metrics に記録し、実行の終わりに METRICS_FILE へ保存する。
+    """
+
+    def __init__(self, history, log=print, progress=None, item=None, site=None, store=None, sink=None,
+                 save_lock=None):
+        self.history = history
+        self.site = site or default_site()
+        self.log = log
+        self.progress = progress or (lambda current, total: None)
+        self.item = item or (lambda status, url, record: None)
+        self.is_running = False
+        self.http = None  # 一覧・詳細・画像で共有するHTTPクライアント（実行ごとに作成）
+        self.images = None  # 画像ダウンロード用ワーカー（実行ごとに作成、画像なしの場合は None）
+        self.store = None  # 物件データベース（実行中のみ開く）
+        self.sink = None  # 記録ファイル（実行中のみ開く）
+        self.shared_store = store
+        self.shared_sink = sink
+        self.save_lock = save_lock or threading.Lock()  # 記録ファイルへの追記とデータベースへの反映の順序を保つ
+        self.parser = 'auto'  # HTML解析エンジン
+        self.checkpoint = None
+        self.list_fingerprints = {}  # 詳細URL → 一覧ページの項目のハッシュ値（更新確認用）
+        self.unknown_labels = {}  # 未対応の項目名 → 出現件数
+        self.unknown_labels_lock = threading.Lock()
+        self.metrics = Metrics()  # 実行中の計測値（実行ごとに作成）
+
+    def stop(self):
+        """実行中の処理を止める（処理中の物件が終わった時点で中断位置を保存して終了）"""
+        self.is_running = False
+
+    def run(self, max_items=DEFAULT_MAX_ITEMS, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+            known_pages=DEFAULT_KNOWN_PAGE_LIMIT, full_sweep_days=DEFAULT_FULL_SWEEP_DAYS,
+            skip_scraped=True, refresh=False, incremental=True, use_cache=True, parser='auto',
+            download_images=True, export_on_finish=True, resume=None,
+            timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), retries=DEFAULT_RETRIES, adaptive=True):
+        """スクレイピング実行
+
+        resume にチェックポイントを渡すと一覧ページは取得せず、
+        前回の未完了のURLと画像だけを処理する。
+        timeout は (接続, 受信) の秒数、retries は通信失敗時の再試行回数。
+        adaptive=True の場合、サーバーの混雑に合わせて rate を上限にアクセスレートを自動調整する。
+        結果を辞書で返す（status: completed / stopped / no_urls / error、retries: 再試行回数）。
+        """
+        self.is_running = True
+        result = {'status': 'error', 'new': 0, 'updated': 0, 'skipped': 0, 'errors': 0, 'total': 0, 'retries': 0}
+        try:
+            self.crawl(result, max_items, workers, rate, known_pages, full_sweep_days,
+                       skip_scraped, skip_scraped and refresh, skip_scraped and incremental,
+                       use_cache, parser, download_images, export_on_finish, resume, timeout, retries, adaptive)
+        except Exception as ex:
+            self.log(f"\n❌ エラーが発生しました: {ex}")
+            result['status'] = 'error'
+            result['error'] = str(ex)
+            try:
+                self.save_checkpoint()
+            except Exception:
+                pass
+        finally:
+            self.is_running = False
+            if self.http:
+                result['retries'] = self.http.stats['retries']
+            self.close()
+            self.save_metrics(result)
+        return result
+
+    def save_metrics(self, result):
+        """実行の計測値を結果と一緒に保存"""
+        path = self.site.file(METRICS_FILE)
+        try:
+            self.metrics.save(path, site=self.site.name, result=result)
+        except OSError as ex:
+            self.log(f"⚠️ 計測値の保存に失敗しました: {ex}")
+            return
+        self.log(f"📊 計測値を保存しました: {path}")
+
+    def crawl(self, result, max_items, workers, rate, known_pages, full_sweep_days,
+              skip_scraped, refresh, incremental, use_cache, parser, download_images, export_on_finish, resume,
+              timeout, retries, adaptive):
+        self.prepare(workers, rate, use_cache, parser, download_images, timeout, retries, adaptive)
+
+        self.log("=" * 60)
+        self.log(f"🚀 不動産スクレイピング開始（{self.site.name}: {self.site.list_url}）")
+        if skip_scraped:
+            self.log(f"📋 取得済みスキップモード: ON（{self.history.count()}件スキップ）")
+            if refresh:
+                self.log("🔍 更新確認: ON（取得済みでも内容が変わった物件は再取得）")
+        else:
+            self.log("📋 取得済みスキップモード: OFF（すべて取得）")
+        self.log(f"⚙️ 並列数: {workers} / アクセス上限: {rate}回/秒{'（自動調整）' if adaptive else ''} / "
+                 f"HTTPキャッシュ: {'ON' if use_cache else 'OFF'} / "
+                 f"解析エンジン: {self.parser} / 画像: {'取得する' if download_images else '取得しない'}")
+        self.log(f"⚙️ タイムアウト: 接続{timeout[0]}秒・受信{timeout[1]}秒 / 再試行: {retries}回")
+
+        if resume:
+            # 前回の取得予定URLのうち未完了のものと、未完了だった画像から再開
+            self.checkpoint = Checkpoint.resume(self.site.file(CHECKPOINT_FILE), resume)
+            batches = [self.checkpoint.remaining()]
+            pending_images = resume.get('pending_images', []) if self.images else []
+            for job in pending_images:
+                self.images.submit(job['estate_id'], job['index'], job['url'], job.get('revalidate', False))
+            self.log(f"♻️ 前回（{resume.get('started_at', '')} 開始）の続きから再開: "
+                     f"物件 残り{len(batches[0])}件 / 画像 残り{len(pending_images)}枚")
+            self.log("=" * 60)
+        else:
+            # 差分モードでは既知ページが続いた時点で一覧取得を打ち切る（定期的に全ページ確認）
+            known_page_limit = 0
+            if incremental:
+                if self.full_sweep_due(full_sweep_days):
+                    self.log("🔄 差分モード: 定期確認のため今回は全ページを取得します")
+                else:
+                    known_page_limit = known_pages
+                    self.log(f"📋 差分モード: ON（取得済みのみのページが{known_pages}ページ続いたら終了）")
+            self.log("=" * 60)
+
+            # 一覧ページから物件URLを取得（複数ページ対応、ページごとに詳細ページの取得へ回す）
+            self.checkpoint = Checkpoint(self.site.file(CHECKPOINT_FILE), [])
+            batches = self.iter_detail_urls(max_items, known_page_limit, refresh)
+
+        skipped_count = 0
+        new_count = 0
+        updated_count = 0
+        error_count = 0
+
+        # 一覧ページの取得（別スレッド）と詳細ページの取得を並行して進める
+        events = queue.Queue()  # ('urls', ページ分の組) / ('result', future) / ('end', 一覧取得の例外)
+        discovery = threading.Thread(target=self.discover, args=(batches, events), daemon=True)
+        discovery.start()
+
+        found_count = 0  # 一覧から見つかった物件URLの数
+        known_count = 0  # うち詳細ページを取得せずスキップした数
+        total = 0  # 詳細ページを取得する件数（一覧の取得が進むにつれて増える）
+        idx = 0
+        discovering = True
+        discovery_error = None
+        futures = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while discovering or idx < total:
+                    kind, payload = events.get()
+                    if not self.is_running:
+                        for pending in futures:
+                            pending.cancel()
+                        self.log("⚠️ ユーザーによって停止されました")
+                        break
+
+                    if kind == 'end':
+                        discovering = False
+                        discovery_error = payload
+                        if found_count and not resume:
+                            self.log(f"✓ {found_count}件の物件URLを取得しました")
+                        if known_count:
+                            self.log(f"⏭️ 取得済み {known_count}件 は詳細ページを取得せずスキップしました")
+                        continue
+
+                    if kind == 'urls':
+                        detail_urls = payload
+                        found_count += len(detail_urls)
+                        if not resume:
+                            self.checkpoint.extend(detail_urls)
+                        # 一覧ページの時点で物件番号が分かる取得済み物件は詳細ページを取得しない
+                        if skip_scraped:
+                            scraped = self.known_ids(detail_urls, refresh)
+                            for url, estate_id in detail_urls:
+                                if estate_id in scraped:
+                                    self.checkpoint.mark_completed(url)
+                                    known_count += 1
+                                    skipped_count += 1
+                            detail_urls = [(url, estate_id) for url, estate_id in detail_urls if estate_id not in scraped]
+                        for url, _ in detail_urls:
+                            future = executor.submit(self.scrape_property, url, skip_scraped, refresh)
+                            futures[future] = url
+                            future.add_done_callback(lambda done: events.put(('result', done)))
+                        total += len(detail_urls)
+                        self.checkpoint.save_if_due(self.pending_images())
+                        continue
+
+                    future = payload
+                    url = futures.pop(future)
+                    idx += 1
+                    self.progress(idx, total)
+
+                    try:
+                        status, d = future.result()
+                    except Exception as ex:
+                        self.log(f"[{idx}/{total}] ❌ エラー: {url} ({ex})")
+                        error_count += 1
+                        self.metrics.count('items', status='error')
+                        self.item('error', url, None)
+                        continue
+                    if status != 'cancelled':
+                        self.metrics.count('items', status=status)
+
+                    if status != 'cancelled':
+                        self.checkpoint.mark_completed(url)
+                    if status == 'no_id':
+                        self.log(f"[{idx}/{total}] ⚠️ 物件番号が取得できませんでした: {url}")
+                    elif status == 'skipped':
+                        self.record(status, url, d)
+                        self.log(f"[{idx}/{total}] ⏭️ スキップ: 物件番号 {d['物件番号']}（取得済み）")
+                        skipped_count += 1
+                    elif status == 'unchanged':
+                        self.record(status, url, d, self.list_fingerprints.get(url))
+                        self.log(f"[{idx}/{total}] ⏭️ 変更なし: 物件番号 {d['物件番号']}")
+                        skipped_count += 1
+                    elif status in ('scraped', 'updated'):
+                        previous = self.store.get(d['物件番号'], self.site.name) if status == 'updated' else None
+                        if status == 'updated':
+                            updated_count += 1
+                        else:
+                            new_count += 1
+                        self.record(status, url, d, self.list_fingerprints.get(url))
+                        if status == 'updated':
+                            change = ''
+                            if previous and previous.get('価格') != d.get('価格'):
+                                change = f"（価格: {previous.get('価格', '')} → {d.get('価格', '')}）"
+                            self.log(f"[{idx}/{total}] 🔄 更新: 物件番号 {d['物件番号']}{change}")
+                        else:
+                            self.log(f"[{idx}/{total}] ✓ 物件番号 {d['物件番号']} - 画像{d['画像枚数']}枚取得")
+                    if status != 'cancelled':
+                        self.item(status, url, d)
+
+                    self.checkpoint.save_if_due(self.pending_images())
+        except BaseException:
+            self.stop()  # 一覧の取得も止める
+            raise
+        finally:
+            discovery.join()
+
+        result.update(new=new_count, updated=updated_count, skipped=skipped_count, errors=error_count)
+        if not found_count and not resume:
+            self.checkpoint = None  # 再開するものがない
+        if discovery_error is not None:
+            # 一覧の取得に失敗した場合、取得できた分を処理した上でエラーとする（中断位置は保存される）
+            raise discovery_error
+        if not found_count and not resume:
+            self.log("❌ エラー: 物件URLが取得できませんでした")
+            result['status'] = 'no_urls'
+            return
+
+        stopped = not self.is_running
+        self.progress(total, total)
+        if not stopped:
+            self.finish_images()
+            self.checkpoint.clear()
+        else:
+            # 未着手の画像を破棄する前に、再開用の位置を保存
+            self.save_checkpoint()
+            self.finish_images()
+            self.log("💾 中断位置を保存しました（再開すると続きから取得できます）")
+        self.checkpoint = None
+
+        self.report_http_stats()
+        self.report_unknown_label_counts()
+
+        result['status'] = 'stopped' if stopped else 'completed'
+        result['total'] = self.store.count()
+
+        if not new_count and not updated_count:
+            self.log("\n⚠️ 新規・更新データがありませんでした")
+            self.log(f"  スキップ: {skipped_count}件")
+            return
+
+        # CSV/JSON出力
+        if export_on_finish:
+            self.export_data()
+
+        # 画像フォルダの確認
+        img_folder = self.site.folder(IMG_FOLDER)
+        if download_images and os.path.exists(img_folder):
+            img_files = [name for name in os.listdir(img_folder) if name.rsplit('.', 1)[-1] in IMAGE_EXTENSIONS]
+            self.log(f"  ✓ 画像保存完了: {img_folder}/ ({len(img_files)}ファイル)")
+
+        self.log("\n" + "=" * 60)
+        self.log(f"🎉 完了:")
+        self.log(f"  新規取得: {new_count}件")
+        if refresh:
+            self.log(f"  更新: {updated_count}件")
+        self.log(f"  スキップ: {skipped_count}件")
+        self.log(f"  合計: {result['total']}件（{STORE_FILE}）")
+        self.log("=" * 60)
+
+    def prepare(self, workers, rate, use_cache, parser, download_images, timeout, retries, adaptive):
+        """実行ごとのHTTPクライアント・画像ワーカー・保存先を開く"""
+        self.parser = resolve_backend(parser)
+        self.unknown_labels = {}
+        self.metrics = Metrics()
+        self.http = HttpClient(
+            self.site.headers,
+            rate=rate,
+            pool_size=max(DEFAULT_POOL_SIZE, workers + DEFAULT_IMAGE_WORKERS),
+            cache=HttpCache(self.site.folder(DEFAULT_CACHE_DIR)) if use_cache else None,
+            timeout=timeout,
+            retries=retries,
+            adaptive=adaptive,
+            log=self.log,
+            metrics=self.metrics
+        )
+        if download_images:
+            self.images = ImageDownloader(self.http, self.site.folder(IMG_FOLDER))
+            self.images.start()
+        self.store = self.shared_store or self.open_store()
+        self.sink = self.shared_sink or JsonlSink(RECORDS_FILE)
+
+    def close(self):
+        """実行ごとに開いたHTTPクライアント・画像ワーカー・保存先を閉じる"""
+        self.checkpoint = None
+        if self.images:
+            self.images.cancel_pending()
+            self.images.close()
+            self.images = None
+        if self.http:
+            self.http.close()
+            self.http = None
+        if self.sink and self.sink is not self.shared_sink:
+            self.sink.close()
+        self.sink = None
+        if self.store and self.store is not self.shared_store:
+            self.store.close()
+        self.store = None
+
+    def report_http_stats(self):
+        """通信の再試行・混雑の回数と、自動調整後のアクセスレートを記録"""
+        stats = self.http.stats
+        if not stats['retries'] and not stats['overloaded'] and not stats['timeouts']:
+            return
+        rates = ', '.join(f"{host} {rate:.2f}回/秒" for host, rate in self.http.rates().items())
+        self.log(f"🌐 通信: リクエスト {stats['requests']}回 / 再試行 {stats['retries']}回 / "
+                 f"混雑応答(429/503) {stats['overloaded']}回 / タイムアウト {stats['timeouts']}回 / "
+                 f"失敗 {stats['failed']}回（終了時のアクセスレート: {rates}）")
+
+    def report_unknown_label_counts(self):
+        """出力列に対応していない項目名と件数を記録"""
+        if self.unknown_labels:
+            labels = ', '.join(f"{label}({count}件)" for label, count in
+                               sorted(self.unknown_labels.items(), key=lambda item: -item[1]))
+            self.log(f"⚠️ 出力列に対応していない項目がありました: {labels}")
+
+    def pending_images(self):
+        return self.images.pending_jobs() if self.images else []
+
+    def save_checkpoint(self):
+        """現在の進捗をチェックポイントとして保存"""
+        if self.checkpoint:
+            self.checkpoint.save(self.pending_images())
+
+    def open_store(self, exited=()):
+        """物件データベースを開く（初回は既存の export.csv を取り込む、exited は PropertyStore.replay_logs を参照）"""
+        store = PropertyStore(STORE_FILE)
+        if store.count() == 0 and os.path.exists(CSV_FILE):
+            imported = store.import_csv(CSV_FILE)
+            self.log(f"📥 既存の {CSV_FILE} から {imported}件 を {STORE_FILE} に取り込みました")
+
+        # 前回中断した実行で記録ファイルにだけ書かれた物件を復元
+        replayed = store.replay_logs(RECORDS_FILE, exited)
+        if replayed:
+            for record in replayed:
+                self.history.mark_scraped(record['物件番号'], record.get('詳細ページ'), record_fingerprint(record),
+                                          site=record.get('サイト') or DEFAULT_SITE)
+            self.log(f"♻️ {RECORDS_FILE} から未反映の {len(replayed)}件 を復元しました")
+        return store
+
+    def export_data(self):
+        """物件データベースからCSV/JSONを出力"""
+        self.log("\n💾 データを出力中...")
+
+        with self.metrics.timed('export'):
+            count = export_csv(self.store.records(), CSV_FILE)
+            self.log(f"  ✓ CSV出力完了: {CSV_FILE}（{count}件）")
+
+            export_json(self.store.records(), JSON_FILE)
+        self.log(f"  ✓ JSON出力完了: {JSON_FILE}")
+        return count
+
+    def export(self):
+        """実行とは別にCSV/JSONだけを出力し、件数を返す"""
+        self.store = self.open_store()
+        try:
+            return self.export_data()
+        finally:
+            self.store.close()
+            self.store = None
+
+    def scrape_property(self, url, skip_scraped, refresh=False):
+        """1件分の詳細ページと画像を取得（ワーカースレッドで実行）
+
+        refresh=True の場合、取得済みの物件は物件概要のハッシュ値を前回と比べ、
+        変わっていれば画像も含めて取り直す（変わっていなければ 'unchanged'）。
+        詳細ページはHTTPキャッシュの条件付きリクエストで取得するため、
+        変更のないページは本文を再受信しない。
+        """
+        if not self.is_running:
+            return 'cancelled', None
+
+        # 詳細ページを取得
+        page = self.fetch_detail_page(url)
+
+        # 物件情報を抽出
+        with self.metrics.timed('detail_extract'):
+            d = self.extract_detail(page, url)
+
+        # 物件番号が取得できなかった場合はスキップ
+        if not d['物件番号']:
+            return 'no_id', d
+
+        # スキップチェック（HTMLから物件番号を取得した後）
+        status = 'scraped'
+        if skip_scraped and self.history.is_scraped(d['物件番号']):
+            if not refresh:
+                return 'skipped', d
+            fingerprint, _ = self.history.fingerprints([d['物件番号']]).get(d['物件番号'], (None, None))
+            if fingerprint == record_fingerprint(d):
+                return 'unchanged', d
+            status = 'updated'
+
+        # 画像を取得（内容が変わった物件は同じURLの画像も差し替えられていないか確認する）
+        img_urls = self.extract_images(page, d['物件番号'], revalidate=status == 'updated')
+        d['画像URL'] = ', '.join(img_urls) if img_urls else ''
+        d['画像枚数'] = len(img_urls)
+        return status, d
+
+    def record(self, status, url, d, list_fingerprint=None):
+        """詳細ページの結果を物件データベース・取得履歴へ反映"""
+        if status == 'skipped':
+            self.history.mark_url(url, d['物件番号'])
+        elif status == 'unchanged':
+            self.history.mark_url(url, d['物件番号'])
+            self.history.mark_checked(d['物件番号'], list_fingerprint)
+        elif status in ('scraped', 'updated'):
+            # 記録ファイルへ即座に追記してからデータベース・取得履歴へ反映（サイト・物件番号で上書き）
+            with self.metrics.timed('store'):
+                with self.save_lock:
+                    self.store.upsert(d, log_offset=self.sink.write(d), log_path=self.sink.path)
+                self.history.mark_scraped(d['物件番号'], url, record_fingerprint(d),
+                                          list_fingerprint=list_fingerprint)
+
+    def finish_images(self):
+        """画像ダウンロードの完了を待ち、結果を記録"""
+        if self.images is None:
+            return
+        if not self.is_running:
+            self.images.cancel_pending()
+
+        remaining = self.images.pending_count()
+        if remaining:
+            self.log(f"\n🖼️ 画像ダウンロードの完了を待機中...（残り{remaining}枚）")
+        self.images.close()
+
+        counts = self.images.summary()
+        if counts:
+            unchanged = counts.get('skipped', 0) + counts.get('unchanged', 0)
+            self.log(f"🖼️ 画像: 新規 {counts.get('downloaded', 0)}枚 / "
+                     f"取得済み {unchanged}枚 / 失敗 {counts.get('error', 0)}枚")
+
+        try:
+            results = sorted(self.images.results, key=lambda r: (r['estate_id'], r['index']))
+            with open(self.site.file(IMAGE_STATUS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        except Exception as ex:
+            self.log(f"  ⚠️ 画像結果の保存に失敗しました: {ex}")
+        self.images = None
+
+    def fetch_list_page(self, page_num=1):
+        with self.metrics.timed('list_fetch'):
+            res = self.http.get(self.site.list_page_url(page_num))
+        with self.metrics.timed('list_parse'):
+            return parse_page(res.text, self.parser, self.site.selectors)
+
+    def full_sweep_due(self, full_sweep_days):
+        """差分モードでも全ページを確認すべき時期かどうか"""
+        if full_sweep_days <= 0:
+            return False
+        last_full_sweep = self.history.get_meta('last_full_sweep')
+        if not last_full_sweep:
+            return True
+        try:
+            last = datetime.strptime(last_full_sweep, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return True
+        return datetime.now() - last >= timedelta(days=full_sweep_days)
+
+    def discover(self, batches, events):
+        """一覧から見つけた物件URLをページごとに events へ送る（別スレッドで実行）"""
+        error = None
+        try:
+            for batch in batches:
+                if not self.is_running:
+                    break
+                events.put(('urls', batch))
+        except Exception as ex:
+            self.log(f"❌ 一覧ページの取得に失敗しました: {ex}")
+            error = ex
+        finally:
+            events.put(('end', error))
+
+    def iter_detail_urls(self, max_items, known_page_limit=0, refresh=False):
+        """一覧ページを順に取得し、ページごとに物件URLと物件番号の組のリストを返す
+
+        1ページ取得するたびに返すため、呼び出し側は残りのページの取得を待たずに
+        詳細ページの取得を始められる。
+        known_page_limit > 0 の場合、取得済みの物件だけのページが
+        その数だけ続いた時点で打ち切る（差分モード）。
+        refresh=True の場合は一覧の項目が前回から変わっていない物件だけを取得済みとみなす。
+        """
+        self.list_fingerprints = {}
+        seen_urls = set()
+        found = 0
+        known_streak = 0
+        page_num = 1
+
+        while found < max_items and self.is_running:
+            self.log(f"📝 一覧ページ {page_num} を取得中...")
+            page = self.fetch_list_page(page_num)
+
+            # 現在のページからURLを抽出
+            page_urls = []
+            for url, item in self.list_page_items(page):
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    page_urls.append((url, self.resolve_estate_id(url, item)))
+                    self.list_fingerprints[url] = item_fingerprint(item)
+
+            # ページにURLがなければ終了
+            if not page_urls:
+                self.log(f"  ✓ ページ {page_num} には物件がありませんでした（終了）")
+                # 打ち切らずに最終ページまで確認できた場合は全ページ確認済みとして記録
+                if not known_page_limit:
+                    self.history.set_meta('last_full_sweep', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                break
+
+            # 指定件数を超える分は取得しない
+            page_urls = page_urls[:max_items - found]
+            found += len(page_urls)
+            self.log(f"  ✓ ページ {page_num} から {len(page_urls)} 件取得")
+            self.history.mark_seen(page_urls)
+            yield page_urls
+
+            # 差分モード: 取得済みのみのページが続いたら終了
+            if known_page_limit:
+                scraped = self.known_ids(page_urls, refresh)
+                if all(estate_id in scraped for _, estate_id in page_urls):
+                    known_streak += 1
+                else:
+                    known_streak = 0
+                if known_streak >= known_page_limit:
+                    self.log(f"  ✓ 取得済みのみのページが{known_streak}ページ続いたため一覧取得を終了（差分モード）")
+                    break
+
+            page_num += 1
+
+    def list_page_items(self, page):
+        """一覧ページのJSON-LD（ItemList）から (詳細URL, 項目) の組を掲載順に返す"""
+        items = []
+        for script in page.ld_json_texts():
+            if 'ItemList' in script:
+                try:
+                    data = json.loads(script)
+                    for item in data.get('itemListElement', []):
+                        url = item.get('item')
+                        if isinstance(url, dict):
+                            url = url.get('@id') or url.get('url')
+                        if url:
+                            items.append((url, item))
+                except Exception:
+                    pass
+        return items
+
+    def known_ids(self, pairs, refresh=False):
+        """(URL, 物件番号) のうち詳細ページを取得しなくてよい物件番号の集合
+
+        refresh=True の場合は取得済みかつ一覧の項目が前回と同じ物件だけ
+        （一覧に価格などの情報がないサイトでは詳細ページで確認する）。
+        """
+        estate_ids = [estate_id for _, estate_id in pairs]
+        if not refresh:
+            return self.history.scraped_among(estate_ids)
+        fingerprints = self.history.fingerprints(estate_ids)
+        known = set()
+        for url, estate_id in pairs:
+            list_fingerprint = self.list_fingerprints.get(url)
+            if list_fingerprint and fingerprints.get(estate_id, (None, None))[1] == list_fingerprint:
+                known.add(estate_id)
+        return known
+
+    def resolve_estate_id(self, url, item=None):
+        """詳細ページを取得せずに物件番号を推定（不明な場合は空文字）"""
+        # 過去の取得で確認済みの対応を最優先
+        estate_id = self.history.estate_id_for(url)
+        if estate_id:
+            return estate_id
+
+        # JSON-LDの項目に識別子があれば使用
+        if isinstance(item, dict):
+            for key in ('identifier', 'sku', 'productID'):
+                value = item.get(key)
+                if isinstance(item.get('item'), dict):
+                    value = value or item['item'].get(key)
+                if isinstance(value, (str, int)) and str(value).strip():
+                    return str(value).strip()
+
+        # URL中の数字列（最後に現れるもの）を物件番号とみなす
+        path = urllib.parse.urlsplit(url)
+        matches = ESTATE_ID_PATTERN.findall(path.path + '?' + path.query)
+        return matches[-1] if matches else ''
+
+    def fetch_detail_page(self, url):
+        with self.metrics.timed('detail_fetch'):
+            res = self.http.get(url, headers={"Referer": self.site.list_url})
+            res.raise_for_status()
+        with self.metrics.timed('detail_parse'):
+            return parse_page(res.text, self.parser, self.site.selectors)
+
+    def extract_images(self, page, estate_id, revalidate=False):
+        """画像URLを抽出し、ダウンロードを画像ワーカーに依頼（画像なしの場合はURLのみ）"""
+        img_urls = []
+
+        # ギャラリータグから取得
+        gallery_hrefs = page.gallery_hrefs()
+
+        # preloadタグから取得
+        preload_hrefs = page.preload_image_hrefs()
+
+        if gallery_hrefs:
+            for href in gallery_hrefs:
+                if href:
+                    img_urls.append(href)
+        elif estate_id and preload_hrefs:
+            keyword = self.site.selectors['preload_keyword'].lower()
+            for href in preload_hrefs:
+                if estate_id in href and keyword in href.lower():
+                    img_urls.append(href)
+
+        img_urls = [urllib.parse.urljoin(self.site.base_url + '/', url) for url in img_urls]
+        if self.images:
+            for idx, img_url in enumerate(img_urls, 1):
+                self.images.submit(estate_id, idx, img_url, revalidate)
+
+        return img_urls
+
+    def extract_detail(self, page, url):
+        """詳細ページから物件情報を抽出"""
+        data, unknown_labels = extract_spec(page.spec_cells())
+        if unknown_labels:
+            self.report_unknown_labels(unknown_labels)
+
+        summary = {'サイト': self.site.name, '物件番号': page.estate_id()}
+        for column in SPEC_COLUMNS:
+            summary[column] = data.get(column, '')
+        summary['詳細ページ'] = url
+        return summary
+
+    def report_unknown_labels(self, labels):
+        """出力列に対応していない表の項目名を記録（サイトのレイアウト変更の検知用）"""
+        with self.unknown_labels_lock:
+            for label in labels:
+                self.unknown_labels[label] = self.unknown_labels.get(label, 0) + 1
@@ -0,0 +1,53 @@
+"""詳細ページの物件概要表から出力列への対応付け"""
+
+# 出力する項目（詳細ページの表の項目名と同じ）
+SPEC_COLUMNS = [
+    '価格', '間取り', '物件種別', '所在地', 'アクセス', '建物面積', '駐車場', '築年月',
+    '建物構造', '工法', '主要採光', 'バルコニー', '保証・評価', 'リフォーム', '土地面積',
+    '接道', 'セットバック', '私道', '地目', '地勢', '権利', '都市計画', '用途地域',
+    '建ぺい/容積率', '土地国土法', '許可番号', '建築基準法', '法令制限', '小学区',
+    '中学区', '現況', '引渡', 'その他費用', '備考', '取引態様',
+]
+
+# 出力データの列順
+# サイト: 取得元のサイト名（sites.json の name。物件番号はサイトごとの番号）
+SUMMARY_COLUMNS = ['サイト', '物件番号'] + SPEC_COLUMNS + ['詳細ページ']
+
+# 表の項目名 → (出力列名, 正規化関数 or None)
+# 表記ゆれの別名はここに追加する
+FIELD_MAP = {label: (label, None) for label in SPEC_COLUMNS}
+
+# 表に現れるが別の方法で取得する項目（未対応として報告しない）
+IGNORED_LABELS = frozenset(['物件番号'])
+
+
+def extract_spec(cells):
+    """表の (タグ名, テキスト) の並びを1回走査して項目を取り出す
+
+    th の直後に現れる td をその項目の値とする（間に別の th が来たら値なし）。
+    同じ項目が複数回現れた場合は最初の空でない値を使う。
+    (列名→値の辞書, 未対応の項目名のリスト) を返す。
+    """
+    data = {}
+    unknown = []
+    key = None
+
+    for name, text in cells:
+        if name == 'th':
+            key = text
+            continue
+        if key is None:
+            continue
+
+        field = FIELD_MAP.get(key)
+        if field is None:
+            if key and key not in IGNORED_LABELS and key not in unknown:
+                unknown.append(key)
+        else:
+            column, normalize = field
+            value = normalize(text) if normalize else text
+            if not data.get(column):
+                data[column] = value
+        key = None
+
+    return data, unknown
@@ -0,0 +1,249 @@
+"""物件ごとの取得履歴（SQLite）"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .config import DEFAULT_SITE
+from .fields import SPEC_COLUMNS
+
+# IN句に一度に渡す物件番号の数（SQLiteの変数上限より小さく）
+QUERY_CHUNK = 500
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS listings (
+        site TEXT NOT NULL,
+        estate_id TEXT NOT NULL,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL,
+        last_scraped TEXT,
+        fingerprint TEXT,
+        list_fingerprint TEXT,
+        PRIMARY KEY (site, estate_id)
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, site TEXT NOT NULL, estate_id TEXT NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        site TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (site, key)
+    )
+    """,
+]
+
+
+def now_text():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def record_fingerprint(record):
+    """物件概要の内容から変更検知用のハッシュ値を計算"""
+    spec = {column: str(record.get(column, '')) for column in SPEC_COLUMNS}
+    return hashlib.sha256(json.dumps(spec, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def item_fingerprint(item):
+    """一覧ページのJSON-LD項目から変更検知用のハッシュ値を計算
+
+    並び順（position）とURLを除いた内容が対象。URL以外の情報がなければ None。
+    """
+    if not isinstance(item, dict):
+        return None
+    data = {key: value for key, value in item.items() if key not in ('position', '@type', 'url', '@id')}
+    inner = data.pop('item', None)
+    if isinstance(inner, dict):
+        inner = {key: value for key, value in inner.items() if key not in ('@type', 'url', '@id')}
+        if inner:
+            data['item'] = inner
+    if not data:
+        return None
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def migrate_history(history, path, log=print):
+    """旧形式の取得履歴があれば取り込み、.bak に改名する（取り込んだ件数を返す、失敗は log に出して None）"""
+    if not os.path.exists(path):
+        return None
+    try:
+        count = history.import_json(path)
+        os.replace(path, path + '.bak')
+        return count
+    except Exception as ex:
+        log(f"⚠️ 履歴移行エラー: {ex}")
+        return None
+
+
+class HistoryStore:
+    """物件番号ごとの初回確認・最終確認・最終取得日時と内容のハッシュ値
+
+    起動時に全件を読み込まず、必要な物件番号だけを索引で引く。
+    1件ごとにトランザクションで追記・更新するため、途中で落ちても壊れない。
+    複数サイトで1つのファイルを共有し、(サイト, 物件番号) で区別する。
+    各メソッドは site のサイトを対象にする。
+    """
+
+    def __init__(self, path, site=DEFAULT_SITE):
+        self.path = path
+        self.site = site
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def is_scraped(self, estate_id):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM listings WHERE site = ? AND estate_id = ? AND last_scraped IS NOT NULL",
+                (self.site, str(estate_id))
+            ).fetchone()
+        return row is not None
+
+    def scraped_among(self, estate_ids):
+        """指定した物件番号のうち取得済みのものの集合"""
+        estate_ids = [str(estate_id) for estate_id in estate_ids if estate_id]
+        found = set()
+        with self.lock:
+            for start in range(0, len(estate_ids), QUERY_CHUNK):
+                chunk = estate_ids[start:start + QUERY_CHUNK]
+                rows = self.db.execute(
+                    f"SELECT estate_id FROM listings WHERE site = ? AND last_scraped IS NOT NULL "
+                    f"AND estate_id IN ({','.join('?' * len(chunk))})", [self.site] + chunk
+                ).fetchall()
+                found.update(estate_id for (estate_id,) in rows)
+        return found
+
+    def fingerprints(self, estate_ids):
+        """取得済みの物件番号 → (内容のハッシュ値, 一覧項目のハッシュ値)"""
+        estate_ids = [str(estate_id) for estate_id in estate_ids if estate_id]
+        found = {}
+        with self.lock:
+            for start in range(0, len(estate_ids), QUERY_CHUNK):
+                chunk = estate_ids[start:start + QUERY_CHUNK]
+                rows = self.db.execute(
+                    f"SELECT estate_id, fingerprint, list_fingerprint FROM listings "
+                    f"WHERE site = ? AND last_scraped IS NOT NULL "
+                    f"AND estate_id IN ({','.join('?' * len(chunk))})", [self.site] + chunk
+                ).fetchall()
+                found.update((estate_id, (fingerprint, list_fingerprint)) for estate_id, fingerprint, list_fingerprint in rows)
+        return found
+
+    def estate_id_for(self, url):
+        """過去の取得で確認した詳細URLの物件番号（不明なら None）"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT estate_id FROM urls WHERE url = ? AND site = ?", (url, self.site)
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_seen(self, pairs, seen_at=None):
+        """一覧ページで見つかった (URL, 物件番号) の最終確認日時を更新"""
+        seen_at = seen_at or now_text()
+        rows = [(self.site, str(estate_id), seen_at, seen_at) for _, estate_id in pairs if estate_id]
+        with self.lock:
+            self.db.executemany(
+                """
+                INSERT INTO listings (site, estate_id, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT(site, estate_id) DO UPDATE SET last_seen = excluded.last_seen
+                """,
+                rows
+            )
+            self.db.commit()
+
+    def mark_scraped(self, estate_id, url, fingerprint, scraped_at=None, list_fingerprint=None, site=None):
+        """詳細ページを取得した物件を記録（site を指定すると別のサイトの物件として記録）"""
+        scraped_at = scraped_at or now_text()
+        site = site or self.site
+        with self.lock:
+            self.db.execute(
+                """
+                INSERT INTO listings (site, estate_id, first_seen, last_seen, last_scraped, fingerprint, list_fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(site, estate_id) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    last_scraped = excluded.last_scraped,
+                    fingerprint = excluded.fingerprint,
+                    list_fingerprint = COALESCE(excluded.list_fingerprint, listings.list_fingerprint)
+                """,
+                (site, str(estate_id), scraped_at, scraped_at, scraped_at, fingerprint, list_fingerprint)
+            )
+            if url:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO urls (url, site, estate_id) VALUES (?, ?, ?)", (url, site, str(estate_id))
+                )
+            self.db.commit()
+
+    def mark_checked(self, estate_id, list_fingerprint):
+        """変更がなかった物件の一覧項目のハッシュ値を記録"""
+        if not list_fingerprint:
+            return
+        with self.lock:
+            self.db.execute(
+                "UPDATE listings SET list_fingerprint = ? WHERE site = ? AND estate_id = ?",
+                (list_fingerprint, self.site, str(estate_id))
+            )
+            self.db.commit()
+
+    def mark_url(self, url, estate_id):
+        """詳細URLと物件番号の対応を記録"""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO urls (url, site, estate_id) VALUES (?, ?, ?)", (url, self.site, str(estate_id))
+            )
+            self.db.commit()
+
+    def count(self):
+        """取得済みの物件数"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM listings WHERE site = ? AND last_scraped IS NOT NULL", (self.site,)
+            ).fetchone()[0]
+
+    def get_meta(self, key, default=''):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE site = ? AND key = ?", (self.site, key)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO meta (site, key, value) VALUES (?, ?, ?)", (self.site, key, value))
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            for table in ('listings', 'urls', 'meta'):
+                self.db.execute(f"DELETE FROM {table} WHERE site = ?", (self.site,))
+            self.db.commit()
+
+    def import_json(self, path):
+        """従来の scraping_history.json を取り込む（取り込んだ件数を返す）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # 旧形式には物件ごとの日時がないため、最終更新日時で代用する
+        updated_at = data.get('last_updated') or now_text()
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO listings (site, estate_id, first_seen, last_seen, last_scraped) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.site, str(estate_id), updated_at, updated_at, updated_at)
+                 for estate_id in data.get('scraped_ids', [])]
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO urls (url, site, estate_id) VALUES (?, ?, ?)",
+                [(url, self.site, str(estate_id)) for url, estate_id in data.get('url_ids', {}).items()]
+            )
+            if data.get('last_full_sweep'):
+                self.db.execute(
+                    "INSERT OR REPLACE INTO meta (site, key, value) VALUES (?, 'last_full_sweep', ?)",
+                    (self.site, data['last_full_sweep'])
+                )
+            self.db.commit()
+        return len(data.get('scraped_ids', []))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
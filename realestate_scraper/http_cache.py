@@ -0,0 +1,169 @@
+"""ETag / Last-Modified で再検証するディスクHTTPキャッシュ"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024  # 500MB
+
+
+class HttpCache:
+    """レスポンス本体と検証子を保存し、容量超過時は古いものから削除（LRU）
+
+    複数のプロセスで同じフォルダを共有できる（索引はWALモード、合計容量は書き込みのたびに索引から集計）。
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        # 他のプロセスが書き込み中なら待つ
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                encoding TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.db.commit()
+        self.evict()
+
+    def lookup(self, url):
+        """キャッシュ済みのエントリを返す（本体ファイルがなければ None）"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT filename, etag, last_modified, content_type, encoding, size FROM entries WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        entry = dict(zip(('filename', 'etag', 'last_modified', 'content_type', 'encoding', 'size'), row))
+        entry['url'] = url
+        if not os.path.exists(self.body_path(entry['filename'])):
+            self.delete(url)
+            return None
+        return entry
+
+    def conditional_headers(self, entry):
+        """再検証用の If-None-Match / If-Modified-Since ヘッダ"""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def cached_response(self, entry, not_modified):
+        """304応答とキャッシュ本体から通常の200レスポンスを組み立てる"""
+        with open(self.body_path(entry['filename']), 'rb') as f:
+            body = f.read()
+        self.touch(entry['url'])
+
+        res = requests.Response()
+        res.status_code = 200
+        res._content = body
+        res.url = entry['url']
+        res.headers.update(not_modified.headers)
+        if entry['content_type']:
+            res.headers['Content-Type'] = entry['content_type']
+        res.headers['Content-Length'] = str(len(body))
+        res.encoding = entry['encoding']
+        res.request = not_modified.request
+        res.elapsed = not_modified.elapsed
+        res.from_cache = True
+        return res
+
+    def store(self, url, res):
+        """検証子付きの200レスポンスを保存（検証子がなければ保存しない）"""
+        etag = res.headers.get('ETag')
+        last_modified = res.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        filename = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        path = self.body_path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(res.content)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, filename, etag, last_modified, res.headers.get('Content-Type'),
+                 res.encoding, len(res.content), time.time())
+            )
+            evicted = self.evict_entries()
+            self.db.commit()
+        self.remove_bodies(evicted)
+
+    def touch(self, url):
+        with self.lock:
+            self.db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def delete(self, url):
+        with self.lock:
+            row = self.db.execute("SELECT filename FROM entries WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self.db.commit()
+        self.remove_bodies([row[0]])
+
+    def evict(self):
+        """容量上限を超えた分を最終アクセスの古い順に削除"""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            evicted = self.evict_entries()
+            self.db.commit()
+        self.remove_bodies(evicted)
+
+    def evict_entries(self):
+        """容量上限を超えた分のエントリを最終アクセスの古い順に索引から削除し、本体のファイル名を返す
+
+        書き込みトランザクションの中で呼ぶ（他のプロセスの保存分も含めた合計容量で判定するため）。
+        """
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = []
+        if total <= self.max_bytes:
+            return evicted
+        for url, filename, size in self.db.execute("SELECT url, filename, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((url, filename))
+            total -= size
+        self.db.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url, _ in evicted])
+        return [filename for _, filename in evicted]
+
+    def remove_bodies(self, filenames):
+        for filename in filenames:
+            try:
+                os.remove(self.body_path(filename))
+            except OSError:
+                pass
+
+    def body_path(self, filename):
+        return os.path.join(self.directory, filename[:2], filename)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,192 @@
+"""HTTP通信まわりの共通処理"""
+import random
+import threading
+import time
+import urllib.parse
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import DEFAULT_CONNECT_TIMEOUT, DEFAULT_RATE, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES
+from .metrics import Metrics
+from .ratelimit import HostRateLimiter
+
+# コネクションプールの既定サイズ（同時に保持するホスト別接続数）
+DEFAULT_POOL_SIZE = 10
+
+# ホストごとの瞬間的な同時許容数（既定のアクセスレートは config.DEFAULT_RATE）
+DEFAULT_BURST = 2
+
+# 再試行する応答（429/503 はサーバーの混雑としてアクセスレートも下げる）
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+OVERLOAD_STATUSES = (429, 503)
+
+# 再試行までの待機: 0〜(BACKOFF_BASE × 2^(回数-1)) 秒のランダム（上限 BACKOFF_MAX 秒）
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+
+
+def create_session(headers, pool_size=DEFAULT_POOL_SIZE):
+    """Keep-Alive付きのコネクションプールを持つセッションを作成"""
+    session = requests.Session()
+    session.headers.update(headers)
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def backoff_delay(attempt):
+    """attempt 回目の失敗後に待つ秒数（指数バックオフ＋ジッタ）"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def parse_retry_after(value):
+    """Retry-After ヘッダ（秒数または日時）を秒数に変換（不明な場合は None）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), BACKOFF_MAX)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return min(max(0.0, retry_at.timestamp() - time.time()), BACKOFF_MAX)
+
+
+class HttpClient:
+    """共有セッションとホスト別レート制限をまとめたHTTPクライアント
+
+    タイムアウト（接続, 受信）付きで送信し、接続エラー・タイムアウト・RETRY_STATUSES の応答は
+    バックオフを挟んで retries 回まで再試行する。429/503 の Retry-After には従う。
+    adaptive=True の場合、混雑（429/503・タイムアウト・応答時間の悪化）に合わせて
+    ホストごとのアクセスレートを rate を上限に自動で上げ下げする。
+    回数は stats に、リクエストごとの所要時間・待機・受信量・応答の状態は metrics に記録する。
+    """
+
+    def __init__(self, headers, rate=DEFAULT_RATE, burst=DEFAULT_BURST, pool_size=DEFAULT_POOL_SIZE, cache=None,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), retries=DEFAULT_RETRIES, adaptive=True,
+                 log=None, metrics=None):
+        self.session = create_session(headers, pool_size)
+        self.limiter = HostRateLimiter(rate, burst, adaptive)
+        self.cache = cache  # HttpCache（None の場合はキャッシュしない）
+        self.timeout = timeout
+        self.retries = retries
+        self.log = log or (lambda message: None)
+        self.stats = {'requests': 0, 'retries': 0, 'overloaded': 0, 'timeouts': 0, 'failed': 0}
+        self.stats_lock = threading.Lock()
+        self.metrics = metrics or Metrics()
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+        self.metrics.count(f"http_{key}")
+
+    def get(self, url, headers=None, **kwargs):
+        """レート制限に従ってGETリクエストを送信
+
+        キャッシュ有効時は検証子付きの条件付きリクエストを送り、
+        304が返ればキャッシュ本体から組み立てたレスポンスを返す。
+        """
+        use_cache = self.cache is not None and not kwargs.get('stream')
+        entry = self.cache.lookup(url) if use_cache else None
+        if entry:
+            headers = {**(headers or {}), **self.cache.conditional_headers(entry)}
+
+        res = self.send(url, headers, **kwargs)
+        if not kwargs.get('stream'):
+            self.metrics.count('http_bytes', len(res.content))
+
+        if use_cache:
+            if res.status_code == 304 and entry:
+                self.metrics.count('cache_hits')
+                return self.cache.cached_response(entry, res)
+            self.metrics.count('cache_misses')
+            if res.status_code == 200:
+                self.cache.store(url, res)
+        return res
+
+    def stream(self, url, headers=None, **kwargs):
+        """レート制限に従ってストリーミングGETを開始（HTTPキャッシュは経由しない）"""
+        return self.send(url, headers, stream=True, **kwargs)
+
+    def send(self, url, headers=None, **kwargs):
+        """再試行・自動調整付きで送信（再試行し尽くした場合は例外）"""
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            attempt += 1
+            waited = self.limiter.acquire(url)
+            if waited:
+                self.metrics.observe('rate_limit_wait', waited)
+            self.count('requests')
+            started = time.monotonic()
+            try:
+                res = self.session.get(url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                self.metrics.observe('http_request', time.monotonic() - started)
+                self.metrics.count('http_responses', status='timeout' if isinstance(ex, requests.Timeout) else 'error')
+                if isinstance(ex, requests.Timeout):
+                    self.count('timeouts')
+                    self.slow_down(url, 'タイムアウト')
+                if attempt > self.retries:
+                    self.count('failed')
+                    raise
+                self.count('retries')
+                self.backoff(attempt)
+                continue
+
+            elapsed = time.monotonic() - started
+            self.metrics.observe('http_request', elapsed)
+            self.metrics.count('http_responses', status=res.status_code)
+            if res.status_code not in RETRY_STATUSES:
+                rate = self.limiter.success(url, elapsed)
+                self.update_rate_gauge(url)
+                if rate is not None:
+                    self.log(f"⏳ {urllib.parse.urlsplit(url).netloc} の応答が遅くなっています。"
+                             f"アクセスレートを {rate:.2f}回/秒 に下げます")
+                return res
+
+            retry_after = None
+            if res.status_code in OVERLOAD_STATUSES:
+                self.count('overloaded')
+                retry_after = parse_retry_after(res.headers.get('Retry-After'))
+                self.slow_down(url, res.status_code, retry_after)
+            if attempt > self.retries:
+                self.count('failed')
+                res.close()
+                res.raise_for_status()
+            self.count('retries')
+            res.close()
+            # Retry-After がある場合はホスト全体を止めているため、ここでは待たない
+            if retry_after is None:
+                self.backoff(attempt)
+
+    def backoff(self, attempt):
+        delay = backoff_delay(attempt)
+        self.metrics.observe('retry_backoff', delay)
+        time.sleep(delay)
+
+    def update_rate_gauge(self, url):
+        self.metrics.gauge('rate_limit', self.limiter.bucket_for(url).rate, host=urllib.parse.urlsplit(url).netloc)
+
+    def slow_down(self, url, reason, retry_after=None):
+        rate = self.limiter.overload(url, retry_after)
+        self.update_rate_gauge(url)
+        if rate is not None:
+            wait = f"（{retry_after:.0f}秒待機）" if retry_after else ''
+            self.log(f"⏳ {urllib.parse.urlsplit(url).netloc} が混雑しています（{reason}）。"
+                     f"アクセスレートを {rate:.2f}回/秒 に下げます{wait}")
+
+    def rates(self):
+        return self.limiter.rates()
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,292 @@
+"""物件画像のダウンロードと保存"""
+import hashlib
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+
+import requests
+
+from .http_client import backoff_delay
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+DEFAULT_IMAGE_WORKERS = 4
+DEFAULT_IMAGE_RETRIES = 3
+CHUNK_SIZE = 64 * 1024  # ストリーミング保存時の読み込み単位
+
+MANIFEST_FILE = 'manifest.sqlite'  # 画像フォルダ内の取得記録
+OBJECTS_DIR = 'objects'  # 内容のハッシュ値で保存する実体フォルダ
+
+
+class BodyReadError(Exception):
+    """応答の本体を受信・保存している途中の失敗（HttpClient は応答が始まるまでしか再試行しない）"""
+
+
+def image_filename(estate_id, idx, img_url):
+    """保存ファイル名（{物件番号}_{連番}.{拡張子}）"""
+    return f"{estate_id}_{idx}.{image_extension(img_url)}"
+
+
+def image_extension(img_url):
+    img_ext = img_url.split('.')[-1].split('?')[0]
+    if img_ext not in IMAGE_EXTENSIONS:
+        img_ext = 'jpg'
+    return img_ext
+
+
+def link_or_copy(src, dest):
+    """dest を src へのハードリンクに置き換える（できない環境ではコピー）"""
+    tmp_path = f"{dest}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class ImageManifest:
+    """画像URLごとの保存先・サイズ・ハッシュ値・検証子の記録"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                object TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, url):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT path, object, size, sha256, etag, last_modified FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('path', 'object', 'size', 'sha256', 'etag', 'last_modified'), row))
+
+    def put(self, url, path, object_path, size, sha256, etag, last_modified):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, path, object_path, size, sha256, etag, last_modified, time.time())
+            )
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class ImageDownloader:
+    """キューで受け付けた画像を専用ワーカーで並列にダウンロード
+
+    詳細ページの処理はダウンロードの完了を待たずに進められる。
+    画像の実体は内容のハッシュ値で objects/ に一度だけ保存し、
+    {物件番号}_{連番}.{拡張子} はそこへのリンクとして作成する。
+    取得済みのURLは再ダウンロードしない（revalidate=True の場合、またはジョブの revalidate が True の
+    場合は条件付きリクエストで確認）。
+    1枚ごとの結果は results に記録する。
+    """
+
+    def __init__(self, http, folder, workers=DEFAULT_IMAGE_WORKERS, retries=DEFAULT_IMAGE_RETRIES,
+                 revalidate=False):
+        self.http = http
+        self.folder = folder
+        self.workers = workers
+        self.retries = retries
+        self.revalidate = revalidate
+        self.manifest = None
+        self.queue = queue.Queue()
+        self.results = []
+        self.pending = {}  # (物件番号, 連番) → まだ完了していないジョブ
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        os.makedirs(os.path.join(self.folder, OBJECTS_DIR), exist_ok=True)
+        self.manifest = ImageManifest(os.path.join(self.folder, MANIFEST_FILE))
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.worker)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, estate_id, idx, img_url, revalidate=False):
+        """画像1枚のダウンロードを依頼（revalidate=True は内容が変わった物件の画像で、取得済みでも確認する）"""
+        job = {'estate_id': estate_id, 'index': idx, 'url': img_url, 'revalidate': revalidate}
+        with self.lock:
+            self.pending[(estate_id, idx)] = job
+        self.queue.put(job)
+
+    def pending_jobs(self):
+        """未完了のジョブ（チェックポイント保存用）"""
+        with self.lock:
+            return list(self.pending.values())
+
+    def pending_count(self):
+        return self.queue.unfinished_tasks
+
+    def cancel_pending(self):
+        """未着手のジョブを破棄（実行中のものは完了まで続ける）"""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+
+    def close(self):
+        """残りのジョブが終わるまで待ってワーカーを終了"""
+        self.queue.join()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+    def summary(self):
+        """状態ごとの件数"""
+        counts = {}
+        with self.lock:
+            for result in self.results:
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+        return counts
+
+    def worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                break
+            try:
+                try:
+                    result = self.download(job)
+                except Exception as ex:
+                    # リンクの作成・取得記録の更新などの失敗でもワーカーを止めず、このジョブだけエラーにする
+                    path = os.path.join(self.folder, image_filename(job['estate_id'], job['index'], job['url']))
+                    result = dict(job, path=path, status='error', bytes=0, attempts=0, error=str(ex))
+                    self.http.metrics.count('images', status='error')
+                with self.lock:
+                    self.results.append(result)
+                    self.pending.pop((job['estate_id'], job['index']), None)
+            finally:
+                self.queue.task_done()
+
+    def download(self, job):
+        """画像1枚をリトライ付きで保存し、結果レコードを返す（所要時間・受信量は http.metrics に記録）"""
+        metrics = self.http.metrics
+        with metrics.timed('image_download'):
+            result = self.download_with_retries(job)
+        metrics.count('images', status=result['status'])
+        metrics.count('http_bytes', result['bytes'])
+        return result
+
+    def download_with_retries(self, job):
+        path = os.path.join(self.folder, image_filename(job['estate_id'], job['index'], job['url']))
+        result = dict(job, path=path, status='error', bytes=0, attempts=0, error='')
+
+        # 取得済みで実体が残っていればリンクを張り直すだけで済ませる
+        entry = self.manifest.get(job['url'])
+        if entry and not self.stored(entry):
+            entry = None
+        if entry and not (self.revalidate or job.get('revalidate')):
+            self.ensure_link(entry['object'], path)
+            result['status'] = 'skipped'
+            return result
+
+        for attempt in range(1, self.retries + 1):
+            result['attempts'] = attempt
+            try:
+                result['status'], result['bytes'] = self.fetch(job['url'], path, entry)
+                result['error'] = ''
+                return result
+            except BodyReadError as ex:
+                # 受信途中の切断など
+                result['error'] = str(ex)
+            except (requests.RequestException, OSError) as ex:
+                # 接続エラー・タイムアウト・429/5xx は HttpClient で再試行済み、それ以外は再試行しても変わらない
+                result['error'] = str(ex)
+                return result
+
+            if attempt < self.retries:
+                delay = backoff_delay(attempt)
+                self.http.metrics.observe('retry_backoff', delay)
+                time.sleep(delay)
+        return result
+
+    def fetch(self, url, path, entry):
+        """ストリーミングで取得して実体を保存し、(状態, 受信バイト数) を返す"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with self.http.stream(url, headers=headers) as res:
+            if res.status_code == 304 and entry:
+                self.ensure_link(entry['object'], path)
+                return 'unchanged', 0
+            res.raise_for_status()
+
+            # ハッシュ値を計算しながら一時ファイルへ書き込む
+            digest = hashlib.sha256()
+            size = 0
+            tmp_path = os.path.join(self.folder, OBJECTS_DIR, f"{os.getpid()}-{threading.get_ident()}.part")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in res.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            except (requests.RequestException, OSError) as ex:
+                raise BodyReadError(ex) from ex
+            etag = res.headers.get('ETag')
+            last_modified = res.headers.get('Last-Modified')
+
+        # 同じ内容の画像は実体を共有する
+        sha256 = digest.hexdigest()
+        object_path = os.path.join(self.folder, OBJECTS_DIR, sha256[:2], f"{sha256}.{image_extension(url)}")
+        if os.path.exists(object_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+
+        self.ensure_link(object_path, path)
+        self.manifest.put(url, path, object_path, size, sha256, etag, last_modified)
+        return 'downloaded', size
+
+    def stored(self, entry):
+        try:
+            return os.path.getsize(entry['object']) == entry['size']
+        except OSError:
+            return False
+
+    def ensure_link(self, object_path, path):
+        """保存名のファイルが実体と同一でなければ作り直す"""
+        try:
+            if os.path.samefile(object_path, path):
+                return
+            if os.path.getsize(path) == os.path.getsize(object_path):
+                # リンクできずコピーで保存した環境では内容のハッシュ値で同一か確認
+                with open(path, 'rb') as f:
+                    if hashlib.sha256(f.read()).hexdigest() == os.path.basename(object_path).split('.')[0]:
+                        return
+        except OSError:
+            pass
+        link_or_copy(object_path, path)
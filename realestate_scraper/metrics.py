@@ -0,0 +1,287 @@
+"""実行の計測値（段階ごとの所要時間・通信量・回数）
+
+Crawler・HttpClient・ImageDownloader が実行中に Metrics へ記録し、
+実行の終わりに summary() をJSONで保存する（config.METRICS_FILE）。
+コマンドライン版の --metrics-port では MetricsServer が実行中の値を
+Prometheus のテキスト形式で返す。
+
+記録する段階（stage_seconds の stage）:
+  list_fetch / list_parse     一覧ページの受信 / 解析
+  detail_fetch / detail_parse 詳細ページの受信 / 解析
+  detail_extract              物件概要の表の読み取り
+  image_download              画像1枚の取得と保存（再試行を含む）
+  store                       物件データベース・取得履歴への保存
+  export                      CSV/JSONの出力
+  http_request                HTTPリクエスト1回（再試行は別々に数える）
+  rate_limit_wait / retry_backoff  アクセス間隔・再試行前の待機
+"""
+import bisect
+import http.server
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# 所要時間のヒストグラムの上限（秒、最後の区間は上限なし）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Prometheus の名前の接頭辞
+METRIC_PREFIX = 'scraper_'
+METRICS_PATH = '/metrics'
+
+# summary() の rates を計算する段階・カウンタ
+PAGE_STAGES = ('list_fetch', 'detail_fetch')
+
+
+class Histogram:
+    """区間ごとの件数・合計・最大値（分位点は区間内を線形補間して推定）"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, state):
+        for index, count in enumerate(state['counts']):
+            self.counts[index] += count
+        self.count += sum(state['counts'])
+        self.sum += state['sum']
+        self.max = max(self.max, state['max'])
+
+    def state(self):
+        return {'counts': list(self.counts), 'sum': self.sum, 'max': self.max}
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 3),
+            'mean_ms': round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 2),
+            'p90_ms': round(self.quantile(0.9) * 1000, 2),
+            'p99_ms': round(self.quantile(0.99) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+
+def metric_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metrics:
+    """カウンタ・ゲージ・所要時間のヒストグラム（スレッドセーフ）
+
+    値は (名前, ラベル) ごとに持つ。
+      count('http_requests')                         回数・量（単調増加）
+      gauge('rate_limit', 1.5, host='example.com')   現在の値
+      observe('detail_fetch', 0.12)                  段階の所要時間（秒）
+      with timed('detail_parse'): ...                上と同じ（ブロックの実行時間）
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def count(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[metric_key(name, labels)] = value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def counter(self, name):
+        """名前が name のカウンタの合計（ラベルは区別しない）"""
+        with self.lock:
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def snapshot(self):
+        """JSONにできる形の全データ（merge で別のプロセスの値と合計できる）"""
+        with self.lock:
+            return {
+                'started': self.started,
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, dict(labels), value] for (name, labels), value in self.gauges.items()],
+                'histograms': {stage: histogram.state() for stage, histogram in self.histograms.items()},
+            }
+
+    def merge(self, snapshot):
+        """snapshot の値を加える（ゲージは上書き、開始時刻は早い方）"""
+        with self.lock:
+            self.started = min(self.started, snapshot['started'])
+            for name, labels, value in snapshot['counters']:
+                key = metric_key(name, labels)
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, value in snapshot['gauges']:
+                self.gauges[metric_key(name, labels)] = value
+            for stage, state in snapshot['histograms'].items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram()
+                histogram.merge(state)
+
+    def summary(self):
+        """実行の終わりに保存する集計（段階ごとの所要時間・カウンタ・ゲージ・1秒あたりの件数）"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        with self.lock:
+            stages = {stage: histogram.to_dict() for stage, histogram in sorted(self.histograms.items())}
+            counters = labeled_values(self.counters)
+            gauges = labeled_values(self.gauges)
+        pages = sum(stages.get(stage, {}).get('count', 0) for stage in PAGE_STAGES)
+        return {
+            'started_at': datetime.fromtimestamp(self.started).strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed_seconds': round(elapsed, 3),
+            'rates': {
+                'items_per_sec': round(self.counter('items') / elapsed, 3),
+                'pages_per_sec': round(pages / elapsed, 3),
+                'images_per_sec': round(self.counter('images') / elapsed, 3),
+                'mb_per_sec': round(self.counter('http_bytes') / (1024 * 1024) / elapsed, 3),
+            },
+            'stages': stages,
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def save(self, path, **extra):
+        """summary() に extra（実行結果など）を加えてJSONで保存"""
+        data = dict(extra, finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), **self.summary())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def labeled_values(values):
+    """{(名前, ラベル): 値} → {名前: 値} / ラベル付きは {名前: {ラベルの値: 値}}"""
+    result = {}
+    for (name, labels), value in sorted(values.items()):
+        if not labels:
+            result[name] = value
+        else:
+            label = ','.join(label_value for _, label_value in labels)
+            result.setdefault(name, {})[label] = value
+    return result
+
+
+def prometheus_text(sources):
+    """(共通のラベル, Metrics) の並びを Prometheus のテキスト形式にする（サイトごとの値など）"""
+    families = {}  # 名前 → (種類, 行)
+
+    def add(name, kind, labels, value):
+        lines = families.setdefault(METRIC_PREFIX + name, (kind, []))[1]
+        lines.append(f"{METRIC_PREFIX}{name}{format_labels(labels)} {value}")
+
+    for common, metrics in sources:
+        with metrics.lock:
+            counters = list(metrics.counters.items())
+            gauges = list(metrics.gauges.items())
+            histograms = [(stage, histogram.state()) for stage, histogram in metrics.histograms.items()]
+        for (name, labels), value in counters:
+            add(f"{name}_total", 'counter', {**common, **dict(labels)}, value)
+        for (name, labels), value in gauges:
+            add(name, 'gauge', {**common, **dict(labels)}, value)
+        for stage, state in histograms:
+            labels = {**common, 'stage': stage}
+            cumulative = 0
+            for upper, count in zip(LATENCY_BUCKETS + ('+Inf',), state['counts']):
+                cumulative += count
+                add('stage_seconds_bucket', 'histogram', {**labels, 'le': upper}, cumulative)
+            add('stage_seconds_sum', 'histogram', labels, round(state['sum'], 6))
+            add('stage_seconds_count', 'histogram', labels, cumulative)
+
+    text = []
+    for name, (kind, lines) in families.items():
+        family = name
+        if kind == 'histogram':
+            family = name.rsplit('_', 1)[0]
+        if f"# TYPE {family} {kind}" not in text:
+            text.append(f"# TYPE {family} {kind}")
+        text.extend(lines)
+    return '\n'.join(text) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """実行中の計測値を /metrics で返すHTTPサーバー（別スレッドで待ち受ける）
+
+    sources は (共通のラベル, Metrics) の並びを返す関数（取得のたびに呼ぶ）。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, sources, port, host='127.0.0.1'):
+        super().__init__((host, port), MetricsHandler)
+        self.sources = sources
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        try:
+            body = prometheus_text(self.server.sources()).encode('utf-8')
+        except Exception as ex:
+            self.send_error(500, str(ex))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,140 @@
+"""複数サイトの同時取得（サイトごとの Crawler を並行して実行）"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .checkpoint import load_checkpoint
+from .config import (
+    CHECKPOINT_FILE, CSV_FILE, DEFAULT_RATE, DEFAULT_SITE_CONCURRENCY, HISTORY_DB, JSON_FILE, RECORDS_FILE,
+)
+from .crawler import Crawler
+from .history import HistoryStore
+from .sink import JsonlSink
+from .store import export_csv, export_json
+
+# サイトごとの結果を合計する項目
+RESULT_COUNTS = ('new', 'updated', 'skipped', 'errors', 'retries')
+
+
+class MultiSiteCrawler:
+    """複数サイトを同時に取得し、物件データベース・記録ファイル・取得履歴を共有する
+
+    アクセスレート（ホスト単位）・HTTPキャッシュ・画像フォルダ・チェックポイントはサイトごとに独立。
+    経過は Crawler と同じコールバックにサイト名を付けて通知する。
+      log(message)                     : 実行ログ（先頭に [サイト名]）
+      progress(site, current, total)   : サイトごとの詳細ページの処理件数
+      item(site, status, url, record)  : 1件ごとの結果
+    """
+
+    def __init__(self, sites, log=print, progress=None, item=None):
+        self.sites = sites
+        self.log = log
+        self.progress = progress or (lambda site, current, total: None)
+        self.item = item or (lambda site, status, url, record: None)
+        self.crawlers = []
+        self.is_running = False
+
+    def stop(self):
+        self.is_running = False
+        for crawler in self.crawlers:
+            crawler.stop()
+
+    def run(self, rate=DEFAULT_RATE, concurrency=DEFAULT_SITE_CONCURRENCY, resume=False, export_on_finish=True,
+            **options):
+        """全サイトを取得し、合計とサイトごとの結果（sites）を辞書で返す
+
+        rate はサイトの設定に rate がない場合のアクセス上限。
+        resume=True の場合はチェックポイントのあるサイトだけを続きから再開する。
+        その他の引数は Crawler.run にそのまま渡す。
+        """
+        self.is_running = True
+        histories = [HistoryStore(HISTORY_DB, site.name) for site in self.sites]
+        store = Crawler(histories[0], log=self.log).open_store()
+        sink = JsonlSink(RECORDS_FILE)
+        save_lock = threading.Lock()
+        self.crawlers = [
+            Crawler(
+                history,
+                log=prefixed_logger(self.log, site.name),
+                progress=lambda current, total, site=site: self.progress(site.name, current, total),
+                item=lambda status, url, record, site=site: self.item(site.name, status, url, record),
+                site=site,
+                store=store,
+                sink=sink,
+                save_lock=save_lock
+            )
+            for site, history in zip(self.sites, histories)
+        ]
+
+        results = {}
+        try:
+            jobs = []
+            for crawler in self.crawlers:
+                checkpoint = load_checkpoint(crawler.site.file(CHECKPOINT_FILE)) if resume else None
+                if resume and checkpoint is None:
+                    self.log(f"[{crawler.site.name}] ⏭️ 再開できる実行がないためスキップします")
+                    results[crawler.site.name] = {'status': 'skipped'}
+                    continue
+                jobs.append((crawler, checkpoint))
+
+            self.log(f"🌐 {len(jobs)}サイトを取得します（同時に{min(concurrency, len(jobs) or 1)}サイト）")
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                futures = {
+                    executor.submit(
+                        self.run_site, crawler, crawler.site.rate or rate, checkpoint, options
+                    ): crawler.site.name
+                    for crawler, checkpoint in jobs
+                }
+                try:
+                    for future, name in futures.items():
+                        results[name] = future.result()
+                except BaseException:
+                    self.stop()  # 残りのサイトも止めてから抜ける
+                    raise
+
+            result = combine_results(results)
+            if export_on_finish and (result['new'] or result['updated']):
+                self.log("\n💾 データを出力中...")
+                count = export_csv(store.records(), CSV_FILE)
+                self.log(f"  ✓ CSV出力完了: {CSV_FILE}（{count}件）")
+                export_json(store.records(), JSON_FILE)
+                self.log(f"  ✓ JSON出力完了: {JSON_FILE}")
+            result['total'] = store.count()
+            return result
+        finally:
+            self.is_running = False
+            sink.close()
+            store.close()
+            for history in histories:
+                history.close()
+
+    def run_site(self, crawler, rate, checkpoint, options):
+        if not self.is_running:
+            return {'status': 'stopped', 'new': 0, 'updated': 0, 'skipped': 0, 'errors': 0, 'retries': 0}
+        return crawler.run(rate=rate, resume=checkpoint, export_on_finish=False, **options)
+
+
+def prefixed_logger(log, prefix):
+    """各行の先頭に [prefix] を付けて log へ出すロガー"""
+    def prefixed(message):
+        # 空行・区切り線の前の改行はそのまま、各行の先頭に付ける
+        lines = str(message).split('\n')
+        log('\n'.join(f"[{prefix}] {line}" if line else line for line in lines))
+    return prefixed
+
+
+def combine_results(results):
+    """サイトごとの結果を合計（1サイトでもエラー・停止があればその状態）"""
+    statuses = [result['status'] for result in results.values() if result['status'] != 'skipped']
+    if 'error' in statuses:
+        status = 'error'
+    elif 'stopped' in statuses:
+        status = 'stopped'
+    elif not statuses or all(status == 'no_urls' for status in statuses):
+        status = 'no_urls'
+    else:
+        status = 'completed'
+    result = {'status': status}
+    for key in RESULT_COUNTS:
+        result[key] = sum(site_result.get(key, 0) for site_result in results.values())
+    result['sites'] = results
+    return result
@@ -0,0 +1,160 @@
+"""物件データの正規化（価格・面積・築年月・建ぺい/容積率を数値・日付の列にする）
+
+    frame = load_frame(store.records())
+    frame, unparsed = normalize_frame(frame)
+
+元の文字列の列はそのまま残し、型付きの列（TYPED_COLUMNS）を追加する。
+全件をまとめて pandas の文字列操作（str.normalize / str.extract）で処理し、
+1件ずつ Python で解析し直さずに絞り込み・集計できるようにする。
+空でないのに読み取れなかった値は列ごとの件数と例で返す（unparsed）。
+
+pandas は必須ではない（GUI版の実行ファイルには含めない）ため、使うときに読み込む。
+"""
+import re
+
+# 型付きの列（元の列 → 追加する列）
+PRICE_COLUMN = '価格_円'
+BUILDING_AREA_COLUMN = '建物面積_㎡'
+LAND_AREA_COLUMN = '土地面積_㎡'
+BUILT_COLUMN = '築年月_日付'
+COVERAGE_COLUMN = '建ぺい率_%'
+FLOOR_RATIO_COLUMN = '容積率_%'
+TYPED_COLUMNS = {
+    '価格': [PRICE_COLUMN],
+    '建物面積': [BUILDING_AREA_COLUMN],
+    '土地面積': [LAND_AREA_COLUMN],
+    '築年月': [BUILT_COLUMN],
+    '建ぺい/容積率': [COVERAGE_COLUMN, FLOOR_RATIO_COLUMN],
+}
+
+UNPARSED_EXAMPLES = 5  # 読み取れなかった値の例を列ごとにこの数まで返す
+
+# 値は NFKC で正規化（全角数字・記号を半角に、㎡・m² を m2 に）し、桁区切りを除いてから照合する
+NUMBER = r'\d+(?:\.\d+)?'
+# 1億2000万円 / 1980万円 / 19800000円（範囲の場合は最初の値）
+PRICE_PATTERN = re.compile(rf'(?:(?P<oku>{NUMBER})億)?(?:(?P<man>{NUMBER})万)?(?P<yen>\d+)?円')
+# 98.54m2 / 98.54平米 / 29.80坪（併記されている場合は最初の値）
+AREA_PATTERN = re.compile(rf'(?P<value>{NUMBER})\s*(?P<unit>m2|平米|坪)')
+# 1998年3月 / 1998/03 / 平成10年3月 / H10.3 / 令和元年（月がない場合は1月）
+BUILT_PATTERN = re.compile(
+    r'(?P<year>(?:18|19|20)\d{2})\s*(?:年|/|\.|-)\s*(?:(?P<month>\d{1,2})\s*月?)?'
+    r'|(?P<era>明治|大正|昭和|平成|令和|[MTSHR])\s*(?P<era_year>\d{1,2}|元)\s*(?:年|\.)\s*(?:(?P<era_month>\d{1,2})\s*月?)?'
+)
+# 60%/200% / 建ぺい率60% 容積率200% / 60・200
+RATIO_PATTERN = re.compile(rf'(?P<coverage>{NUMBER})\s*%?\D{{1,8}}?(?P<floor>{NUMBER})\s*%?')
+
+SQUARE_METERS_PER_TSUBO = 400 / 121
+# 元号の元年の前年（西暦 = 元年の前年 + 元号の年）
+ERA_OFFSETS = {
+    '明治': 1867, 'M': 1867,
+    '大正': 1911, 'T': 1911,
+    '昭和': 1925, 'S': 1925,
+    '平成': 1988, 'H': 1988,
+    '令和': 2018, 'R': 2018,
+}
+
+
+def import_pandas():
+    try:
+        import pandas
+    except ImportError as ex:
+        raise RuntimeError('正規化には pandas が必要です（pip install pandas）') from ex
+    return pandas
+
+
+def load_frame(records):
+    """物件データ（辞書の並び）を DataFrame にする"""
+    pd = import_pandas()
+    return pd.DataFrame.from_records(list(records))
+
+
+def clean(series):
+    """照合する前の文字列（NFKC・桁区切りと空白を除く。欠損は空文字）"""
+    return (series.fillna('').astype(str).str.normalize('NFKC')
+            .str.replace(',', '', regex=False).str.strip())
+
+
+def parse_price(series):
+    """価格 → 円（Int64）"""
+    parts = clean(series).str.extract(PRICE_PATTERN).astype(float)
+    yen = parts['oku'].fillna(0) * 100_000_000 + parts['man'].fillna(0) * 10_000 + parts['yen'].fillna(0)
+    return yen.where(parts.notna().any(axis=1)).round().astype('Int64')
+
+
+def parse_area(series):
+    """面積（㎡・平米・坪） → ㎡（float）"""
+    parts = clean(series).str.extract(AREA_PATTERN)
+    value = parts['value'].astype(float)
+    return value.where(parts['unit'] != '坪', value * SQUARE_METERS_PER_TSUBO).round(2)
+
+
+def parse_built(series):
+    """築年月（西暦・和暦） → その月の1日（datetime64）"""
+    pd = import_pandas()
+    parts = clean(series).str.extract(BUILT_PATTERN)
+    era_year = parts['era_year'].replace('元', '1').astype(float)
+    year = parts['year'].astype(float).fillna(parts['era'].map(ERA_OFFSETS) + era_year)
+    month = parts['month'].fillna(parts['era_month']).astype(float).fillna(1)
+    valid = year.notna() & month.between(1, 12)
+    return pd.to_datetime(
+        pd.DataFrame({'year': year.where(valid), 'month': month.where(valid), 'day': 1}), errors='coerce'
+    )
+
+
+def parse_ratio(series):
+    """建ぺい/容積率 → (建ぺい率, 容積率)（%、float）"""
+    parts = clean(series).str.extract(RATIO_PATTERN).astype(float)
+    return parts['coverage'], parts['floor']
+
+
+def unparsed_values(raw, parsed):
+    """空でないのに読み取れなかった値の {'count': 件数, 'examples': [多い順の例]}"""
+    failed = raw[raw.fillna('').astype(str).str.strip().ne('') & parsed.isna()]
+    return {
+        'count': int(len(failed)),
+        'examples': failed.astype(str).value_counts().head(UNPARSED_EXAMPLES).index.tolist(),
+    }
+
+
+def normalize_frame(frame):
+    """型付きの列を追加した DataFrame と、読み取れなかった値 {元の列: unparsed_values} を返す
+
+    元の列がない場合は型付きの列を欠損値で追加する（出力の列をそろえるため）。
+    """
+    pd = import_pandas()
+    frame = frame.copy()
+    for column in TYPED_COLUMNS:
+        if column not in frame:
+            frame[column] = pd.Series(None, index=frame.index, dtype=object)
+
+    frame[PRICE_COLUMN] = parse_price(frame['価格'])
+    frame[BUILDING_AREA_COLUMN] = parse_area(frame['建物面積'])
+    frame[LAND_AREA_COLUMN] = parse_area(frame['土地面積'])
+    frame[BUILT_COLUMN] = parse_built(frame['築年月'])
+    frame[COVERAGE_COLUMN], frame[FLOOR_RATIO_COLUMN] = parse_ratio(frame['建ぺい/容積率'])
+
+    unparsed = {}
+    for column, typed in TYPED_COLUMNS.items():
+        result = unparsed_values(frame[column], frame[typed[0]])
+        if result['count']:
+            unparsed[column] = result
+    return frame, unparsed
+
+
+def typed_columns():
+    return [column for columns in TYPED_COLUMNS.values() for column in columns]
+
+
+def export_normalized(frame, path, columns):
+    """columns と型付きの列を拡張子に合わせて出力し、件数を返す（.csv / .json / .parquet）"""
+    frame = frame.reindex(columns=list(columns) + [column for column in typed_columns() if column not in columns])
+    extension = path.rsplit('.', 1)[-1].lower()
+    if extension == 'parquet':
+        frame.to_parquet(path, index=False)  # pyarrow または fastparquet が必要
+    elif extension == 'json':
+        frame = frame.assign(**{BUILT_COLUMN: frame[BUILT_COLUMN].dt.strftime('%Y-%m-%d')})
+        frame.to_json(path, orient='records', force_ascii=False, indent=2)
+    else:
+        # Excel対応のBOM付きUTF-8（export.csv と同じ）
+        frame.to_csv(path, index=False, encoding='utf-8-sig', date_format='%Y-%m-%d')
+    return len(frame)
@@ -0,0 +1,156 @@
+"""一覧・詳細ページのHTML解析（解析エンジンを選択可能）
+
+lxml / selectolax が使える場合はそちらを優先し、
+どちらもなければ BeautifulSoup (html.parser) を使う。
+いずれのエンジンでも、利用する要素（物件概要の表・物件番号・ギャラリー・
+preload画像・JSON-LD）だけを取り出す同じインターフェースを提供する。
+物件番号・ギャラリーのクラス名はサイトごとに selectors で変更できる。
+"""
+import importlib.util
+
+# 速い順（名前 → 判定に使うモジュール）
+PARSER_BACKENDS = {
+    'lxml': 'lxml.html',
+    'selectolax': 'selectolax.lexbor',
+    'bs4': 'bs4',
+}
+
+GALLERY_CLASS = 'mainContents_gallery-colorbox'
+ESTATE_ID_CLASS = 'estateID'
+
+# サイトごとに変更できるセレクタ（sites.json の "selectors"）
+DEFAULT_SELECTORS = {
+    'gallery_class': GALLERY_CLASS,  # 物件画像のリンク（a要素）のクラス
+    'estate_id_class': ESTATE_ID_CLASS,  # 物件番号のセル（td要素）のクラス
+    'preload_keyword': 'exterior',  # ギャラリーがない場合に使う preload 画像のURLに含まれる語
+}
+
+# BeautifulSoup で解析対象を絞り込むタグ
+PARSE_TAGS = ['table', 'td', 'a', 'link', 'script']
+
+
+def available_backends():
+    """インストール済みの解析エンジン"""
+    available = []
+    for name, module in PARSER_BACKENDS.items():
+        try:
+            if importlib.util.find_spec(module) is not None:
+                available.append(name)
+        except ImportError:
+            pass
+    return available
+
+
+def resolve_backend(name='auto'):
+    """'auto' の場合は利用可能な中で最も速いエンジンを選ぶ"""
+    available = available_backends()
+    if name == 'auto':
+        if not available:
+            raise RuntimeError('HTML解析エンジンがインストールされていません（beautifulsoup4 が必要です）')
+        return available[0]
+    if name not in available:
+        raise ValueError(f'解析エンジン {name} は利用できません（利用可能: {", ".join(available)}）')
+    return name
+
+
+def parse_page(html, backend='auto', selectors=None):
+    """HTMLを解析してページオブジェクトを返す（selectors は DEFAULT_SELECTORS の上書き）"""
+    backend = resolve_backend(backend)
+    selectors = {**DEFAULT_SELECTORS, **(selectors or {})}
+    if backend == 'lxml':
+        return LxmlPage(html, selectors)
+    if backend == 'selectolax':
+        return SelectolaxPage(html, selectors)
+    return SoupPage(html, selectors)
+
+
+class SoupPage:
+    """BeautifulSoup (html.parser) による解析"""
+
+    backend = 'bs4'
+
+    def __init__(self, html, selectors=DEFAULT_SELECTORS):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self.selectors = selectors
+        self.soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(PARSE_TAGS))
+
+    def estate_id(self):
+        elem = self.soup.find('td', class_=self.selectors['estate_id_class'])
+        return elem.text.strip() if elem else ''
+
+    def spec_cells(self):
+        """すべての表の th/td を文書順に (タグ名, テキスト) の並びで返す"""
+        return [(cell.name, cell.text.strip()) for cell in self.soup.find_all(['th', 'td'])
+                if cell.find_parent('table') is not None]
+
+    def gallery_hrefs(self):
+        return [tag.get('href') for tag in self.soup.select(f"a.{self.selectors['gallery_class']}")]
+
+    def preload_image_hrefs(self):
+        return [tag.get('href', '') for tag in self.soup.select('link[rel="preload"][as="image"]')]
+
+    def ld_json_texts(self):
+        return [script.text for script in self.soup.find_all('script', {'type': 'application/ld+json'})]
+
+
+class LxmlPage:
+    """lxml による解析"""
+
+    backend = 'lxml'
+
+    def __init__(self, html, selectors=DEFAULT_SELECTORS):
+        import lxml.html
+        self.selectors = selectors
+        self.root = lxml.html.fromstring(html) if html.strip() else lxml.html.fromstring('<html></html>')
+
+    def estate_id(self):
+        elems = self.root.xpath(f"//td[{class_xpath(self.selectors['estate_id_class'])}]")
+        return elems[0].text_content().strip() if elems else ''
+
+    def spec_cells(self):
+        return [(cell.tag, cell.text_content().strip()) for cell in self.root.xpath('//table//th | //table//td')]
+
+    def gallery_hrefs(self):
+        return [tag.get('href') for tag in self.root.xpath(f"//a[{class_xpath(self.selectors['gallery_class'])}]")]
+
+    def preload_image_hrefs(self):
+        return [tag.get('href', '') for tag in self.root.xpath('//link[@rel="preload"][@as="image"]')]
+
+    def ld_json_texts(self):
+        return [script.text_content() for script in self.root.xpath('//script[@type="application/ld+json"]')]
+
+
+class SelectolaxPage:
+    """selectolax (lexbor) による解析"""
+
+    backend = 'selectolax'
+
+    def __init__(self, html, selectors=DEFAULT_SELECTORS):
+        from selectolax.lexbor import LexborHTMLParser
+        self.selectors = selectors
+        self.tree = LexborHTMLParser(html)
+
+    def estate_id(self):
+        elem = self.tree.css_first(f"td.{self.selectors['estate_id_class']}")
+        return node_text(elem).strip() if elem else ''
+
+    def spec_cells(self):
+        return [(cell.tag, node_text(cell).strip()) for cell in self.tree.css('table th, table td')]
+
+    def gallery_hrefs(self):
+        return [tag.attributes.get('href') for tag in self.tree.css(f"a.{self.selectors['gallery_class']}")]
+
+    def preload_image_hrefs(self):
+        return [tag.attributes.get('href') or '' for tag in self.tree.css('link[rel="preload"][as="image"]')]
+
+    def ld_json_texts(self):
+        return [node_text(script) for script in self.tree.css('script[type="application/ld+json"]')]
+
+
+def class_xpath(class_name):
+    """class属性に指定のクラスを含む要素を選ぶXPath条件"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+def node_text(node):
+    return node.text(deep=True, separator='', strip=False)
@@ -0,0 +1,281 @@
+"""取得処理のプロファイル（遅い原因が通信・HTML解析・物件概要の抽出・出力のどれかを調べる）
+
+    with RunProfiler('cprofile', log=log):
+        crawler.run(...)
+
+mode:
+  cprofile  全スレッドの関数ごとの呼び出し回数・時間（.prof は pstats や snakeviz で開ける）
+  sample    一定間隔で全スレッドのスタックを記録する（オーバーヘッドが小さく、待機中の箇所も分かる）。
+            -stacks.txt は flamegraph.pl / speedscope で読める collapsed 形式
+tracemalloc=True の場合は開始時と終了時のメモリ割り当てのスナップショットを保存し、増えた箇所を出力する。
+ファイルは directory に {日時}-{label} の名前で保存し、上位 top 件の要約は .txt と実行ログに出す。
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc as tracemalloc_module
+from collections import Counter
+from datetime import datetime
+
+from .config import PROFILE_DIR
+
+PROFILE_MODES = ('cprofile', 'sample')
+DEFAULT_TOP = 30
+LOG_TOP = 10  # 実行ログに出す件数
+SAMPLE_INTERVAL = 0.005  # サンプリングの間隔（秒）
+TRACEMALLOC_FRAMES = 5  # 割り当てごとに記録するスタックの深さ
+
+
+def function_label(filename, lineno, name):
+    if filename == '~':  # 組み込み関数
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class ThreadProfiler:
+    """cProfile を全スレッドに適用する
+
+    Python 3.12 以降の cProfile は1つで全スレッドを計測する。
+    それより前はスレッドごとに計測するため、開始後に作られたスレッドにも
+    threading.setprofile で個別の cProfile を付け、終了時に合算する。
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.lock = threading.Lock()
+        self.per_thread = sys.version_info < (3, 12)
+
+    def start(self):
+        profile = cProfile.Profile()
+        self.profiles.append(profile)
+        if self.per_thread:
+            threading.setprofile(self.attach)
+        profile.enable()
+
+    def attach(self, frame, event, arg):
+        # 新しいスレッドの最初のイベントで呼ばれ、そのスレッドの計測を cProfile に切り替える
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        if self.per_thread:
+            threading.setprofile(None)
+        self.profiles[0].disable()
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = None
+        for profile in profiles:
+            profile.disable()
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+
+class StackSampler:
+    """全スレッドのスタックを interval 秒ごとに記録するサンプリングプロファイラ（別スレッドで動く）"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()  # (呼び出し元 … 実行中の関数) → 回数
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(function_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def hot_functions(self):
+        """関数ごとの (自身で実行中だった回数, 呼び出し中だった回数)"""
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        return {label: (own[label], inclusive[label]) for label in inclusive}
+
+
+class RunProfiler:
+    """実行をプロファイルし、終了時にファイルと上位の要約を保存する（with 文で使う）
+
+    mode は PROFILE_MODES のいずれかか None（tracemalloc だけの場合）。
+    保存したファイルは files に入る。
+    """
+
+    def __init__(self, mode='cprofile', directory=PROFILE_DIR, label='crawl', top=DEFAULT_TOP, tracemalloc=False,
+                 log=print):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"不明なプロファイルの方法です: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.label = label
+        self.top = top
+        self.tracemalloc = tracemalloc
+        self.log = log
+        self.files = []
+        self.profiler = None
+        self.start_snapshot = None
+        self.started = None
+        self.base = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.base = os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.label}")
+        if self.tracemalloc:
+            tracemalloc_module.start(TRACEMALLOC_FRAMES)
+            self.start_snapshot = tracemalloc_module.take_snapshot()
+        if self.mode == 'cprofile':
+            self.profiler = ThreadProfiler()
+        elif self.mode == 'sample':
+            self.profiler = StackSampler()
+        if self.profiler:
+            self.log(f"🔬 プロファイル: {self.mode}{' + tracemalloc' if self.tracemalloc else ''}")
+            self.profiler.start()
+        elif self.tracemalloc:
+            self.log("🔬 プロファイル: tracemalloc")
+        self.started = time.perf_counter()
+
+    def stop(self):
+        elapsed = time.perf_counter() - self.started
+        try:
+            if self.mode == 'cprofile':
+                self.save_cprofile(self.profiler.stop(), elapsed)
+            elif self.mode == 'sample':
+                self.profiler.stop()
+                self.save_samples(elapsed)
+            if self.tracemalloc:
+                self.save_tracemalloc()
+        except OSError as ex:
+            self.log(f"⚠️ プロファイルの保存に失敗しました: {ex}")
+        finally:
+            if self.tracemalloc and tracemalloc_module.is_tracing():
+                tracemalloc_module.stop()
+        if self.files:
+            self.log(f"🔬 プロファイルを保存しました: {', '.join(self.files)}")
+
+    def write_text(self, suffix, text):
+        path = f"{self.base}{suffix}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.files.append(path)
+
+    def log_top(self, title, rows):
+        self.log(f"🔬 {title}")
+        for row in rows[:LOG_TOP]:
+            self.log(f"  {row}")
+
+    def save_cprofile(self, stats, elapsed):
+        if stats is None:
+            return
+        path = f"{self.base}.prof"
+        stats.dump_stats(path)
+        self.files.append(path)
+
+        out = io.StringIO()
+        out.write(f"# {self.label}: {elapsed:.2f}秒（cProfile、全スレッドの合計）\n\n")
+        stats.stream = out
+        out.write("## 自身の時間（tottime）の上位\n")
+        stats.sort_stats('tottime').print_stats(self.top)
+        out.write("## 累計時間（cumtime）の上位\n")
+        stats.sort_stats('cumulative').print_stats(self.top)
+        self.write_text('.txt', out.getvalue())
+
+        # 実行ログには自身の時間の上位だけ出す
+        entries = sorted(stats.stats.items(), key=lambda entry: -entry[1][2])
+        total = sum(entry[2] for entry in stats.stats.values()) or 1
+        self.log_top('自身の時間の上位（全スレッドの合計）:', [
+            f"{tottime / total * 100:5.1f}% {tottime:8.3f}秒 {calls:>8}回  {function_label(*key)}"
+            for key, (_, calls, tottime, _, _) in entries
+        ])
+
+    def save_samples(self, elapsed):
+        sampler = self.profiler
+        hot = sampler.hot_functions()
+        total = sum(sampler.stacks.values()) or 1
+
+        def table(index):
+            rows = sorted(hot.items(), key=lambda item: -item[1][index])[:self.top]
+            return [f"{counts[index] / total * 100:5.1f}% {counts[index]:>8}  {label}" for label, counts in rows]
+
+        own = table(0)
+        lines = [
+            f"# {self.label}: {elapsed:.2f}秒（サンプリング {sampler.interval * 1000:.0f}ms 間隔 × {sampler.samples}回、"
+            f"全スレッドのスタック {total}件）",
+            '',
+            '## 実行中だった関数（自身）の上位',
+            *own,
+            '',
+            '## 呼び出し中だった関数（累計）の上位',
+            *table(1),
+        ]
+        self.write_text('.txt', '\n'.join(lines) + '\n')
+        self.write_text('-stacks.txt', ''.join(
+            f"{';'.join(stack)} {count}\n" for stack, count in sampler.stacks.most_common()
+        ))
+        self.log_top('実行中だった関数の上位（全スレッドのスタックに占める割合、待機中を含む）:', own)
+
+    def save_tracemalloc(self):
+        snapshot = tracemalloc_module.take_snapshot()
+        current, peak = tracemalloc_module.get_traced_memory()
+        ignore = (
+            tracemalloc_module.Filter(False, tracemalloc_module.__file__),
+            tracemalloc_module.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc_module.Filter(False, '<frozen importlib._bootstrap_external>'),
+        )
+        for name, data in (('start', self.start_snapshot), ('end', snapshot)):
+            path = f"{self.base}-{name}.tracemalloc"
+            data.dump(path)
+            self.files.append(path)
+
+        growth = snapshot.filter_traces(ignore).compare_to(self.start_snapshot.filter_traces(ignore), 'lineno')
+        rows = [
+            f"{stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+8}個  "
+            f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}"
+            for stat in growth[:self.top]
+        ]
+        lines = [
+            f"# {self.label}: 確保中 {current / 1024 / 1024:.1f} MB / 最大 {peak / 1024 / 1024:.1f} MB（tracemalloc）",
+            '',
+            '## 開始時から増えた割り当て（行ごと）',
+            *rows,
+        ]
+        self.write_text('-memory.txt', '\n'.join(lines) + '\n')
+        self.log_top(f"メモリ: 確保中 {current / 1024 / 1024:.1f} MB / 最大 {peak / 1024 / 1024:.1f} MB、"
+                     f"開始時から増えた割り当ての上位:", rows)
@@ -0,0 +1,544 @@
+"""永続ワークキューを使った複数プロセスでの取得
+
+一覧ページ・詳細ページ・画像をジョブとしてキュー（config.QUEUE_DB）に登録し、
+ワーカープロセスがそれぞれのスレッドでジョブを借りて処理する。
+ジョブを登録したプロセスは全プロセスの進捗をキューから集計する。
+"""
+import json
+import multiprocessing
+import multiprocessing.connection
+import signal
+import threading
+import time
+from datetime import datetime
+
+from .config import (
+    CSV_FILE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_FULL_SWEEP_DAYS, DEFAULT_KNOWN_PAGE_LIMIT, DEFAULT_MAX_ITEMS,
+    DEFAULT_RATE, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES, DEFAULT_WORKERS, HISTORY_DB, IMAGE_STATUS_FILE, IMG_FOLDER,
+    JSON_FILE, METRICS_FILE, QUEUE_DB, RECORDS_FILE, STORE_FILE,
+)
+from .crawler import Crawler
+from .history import HistoryStore, item_fingerprint
+from .images import ImageDownloader
+from .metrics import Metrics
+from .multisite import combine_results, prefixed_logger
+from .sink import JsonlSink, segment_path
+from .sites import site_from_dict
+from .store import PropertyStore, export_csv, export_json
+from .workqueue import LEASE_SECONDS, WorkQueue, empty_counts, worker_id
+
+# 借りられるジョブがないときに待つ秒数（他のプロセスの処理中のジョブから新しいジョブが増えることがある）
+POLL_INTERVAL = 0.5
+# 全プロセスの進捗を集計する間隔（秒）
+PROGRESS_INTERVAL = 1.0
+# 借りているジョブの期限の延長と計測値の記録の間隔（秒）
+HEARTBEAT_INTERVAL = 5.0
+
+
+class QueueWorker:
+    """1プロセス分のワーカー：キューのジョブを threads 個のスレッドで処理する
+
+    サイトの設定と実行時の設定はキューから読む。
+    アクセス上限はホストごとに rate_share 個のプロセスで分け合う（1プロセスあたり 上限 / rate_share）。
+    キューが空になるか stop() で止めるまで動き、停止時は処理中のジョブを終えてから
+    借りたままのジョブをキューへ戻す。
+    """
+
+    def __init__(self, path=QUEUE_DB, threads=DEFAULT_WORKERS, rate_share=1, log=print):
+        self.path = path
+        self.threads = threads
+        self.rate_share = rate_share
+        self.log = log
+        self.owner = worker_id()
+        self.is_running = False
+        self.finished = threading.Event()
+        self.queue = None
+        self.store = None
+        self.sink = None
+        self.save_lock = threading.Lock()
+        self.sites = {}  # サイト名 → (Crawler, 実行時の設定, ImageDownloader または None)
+        self.sites_lock = threading.Lock()
+
+    def stop(self):
+        self.is_running = False
+
+    def run(self):
+        self.is_running = True
+        self.finished.clear()
+        self.queue = WorkQueue(self.path)
+        self.store = PropertyStore(STORE_FILE)
+        # 記録ファイルはプロセスごとに分ける（反映位置をファイルごとに記録するため）
+        self.sink = JsonlSink(segment_path(RECORDS_FILE, self.owner))
+        heartbeat = threading.Thread(target=self.heartbeat, daemon=True)
+        heartbeat.start()
+        threads = [threading.Thread(target=self.work, daemon=True) for _ in range(self.threads)]
+        try:
+            for thread in threads:
+                thread.start()
+            # シグナルを受け取れるよう、待機は短い間隔で繰り返す
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(PROGRESS_INTERVAL)
+        finally:
+            self.is_running = False
+            self.finished.set()
+            self.queue.release(self.owner)
+            self.close()
+
+    def close(self):
+        self.save_metrics()
+        for name, (crawler, _, images) in self.sites.items():
+            crawler.report_http_stats()
+            self.queue.add_count(name, 'retries', crawler.http.stats['retries'])
+            crawler.report_unknown_label_counts()
+            if images:
+                images.close()
+            crawler.close()
+            crawler.history.close()
+        self.sites = {}
+        self.sink.close()
+        self.store.close()
+        self.queue.close()
+
+    def heartbeat(self):
+        """処理に時間がかかっても他のワーカーに引き継がれないよう借りているジョブの期限を延長し、計測値を記録"""
+        while not self.finished.wait(min(HEARTBEAT_INTERVAL, LEASE_SECONDS / 4)):
+            try:
+                self.queue.renew(self.owner)
+            except Exception as ex:
+                self.log(f"⚠️ ジョブの期限を延長できませんでした: {ex}")
+            self.save_metrics()
+
+    def save_metrics(self):
+        """サイトごとの計測値をキューに記録（全プロセスの合計は QueueCrawler が集計する）"""
+        with self.sites_lock:
+            crawlers = [(name, crawler) for name, (crawler, _, _) in self.sites.items()]
+        for name, crawler in crawlers:
+            try:
+                self.queue.save_metrics(self.owner, name, crawler.metrics.snapshot())
+            except Exception as ex:
+                self.log(f"⚠️ 計測値を記録できませんでした: {ex}")
+
+    def work(self):
+        while self.is_running:
+            jobs = self.queue.lease(self.owner)
+            if not jobs:
+                if not self.queue.unfinished():
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            job = jobs[0]
+            try:
+                result = self.handle(job)
+            except Exception as ex:
+                state = self.queue.retry(job['id'], self.owner, str(ex))
+                if state == 'failed' and job['kind'] == 'detail' and job['site'] in self.sites:
+                    self.sites[job['site']][0].metrics.count('items', status='error')
+                note = '再試行します' if state == 'pending' else '再試行の上限に達しました'
+                self.log(f"[{job['site']}] ❌ エラー: {job_label(job)} ({ex})（{note}）")
+            else:
+                self.queue.ack(job['id'], self.owner, result)
+
+    def site_context(self, name):
+        """サイトごとの Crawler を初回のジョブで用意（スレッド間で共有）"""
+        with self.sites_lock:
+            if name not in self.sites:
+                config, options = self.queue.sites()[name]
+                site = site_from_dict(config)
+                crawler = Crawler(
+                    HistoryStore(HISTORY_DB, name),
+                    log=prefixed_logger(self.log, name),
+                    site=site,
+                    store=self.store,
+                    sink=self.sink,
+                    save_lock=self.save_lock
+                )
+                # 画像はキューのジョブとして別に処理するため、詳細ページからはURLだけを取り出す
+                crawler.prepare(self.threads, (site.rate or options['rate']) / self.rate_share, options['use_cache'],
+                                options['parser'], False, tuple(options['timeout']), options['retries'],
+                                options['adaptive'])
+                crawler.is_running = True
+                images = None
+                if options['download_images']:
+                    images = ImageDownloader(crawler.http, site.folder(IMG_FOLDER), workers=0)
+                    images.start()
+                self.sites[name] = (crawler, options, images)
+            return self.sites[name]
+
+    def handle(self, job):
+        """ジョブを1件処理し、結果（キューに記録する辞書）を返す"""
+        crawler, options, images = self.site_context(job['site'])
+        if job['kind'] == 'list':
+            return self.handle_list(crawler, options, job['payload'])
+        if job['kind'] == 'detail':
+            return self.handle_detail(crawler, options, images, job['payload'])
+        result = images.download(job['payload'])
+        if result['status'] == 'error':
+            crawler.log(f"⚠️ 画像の取得に失敗しました: {result['url']} ({result['error']})")
+        return result
+
+    def handle_list(self, crawler, options, payload):
+        """一覧ページ1ページ分の物件URLを詳細ページのジョブとして登録し、続きのページを登録"""
+        page_num = payload['page']
+        crawler.log(f"📝 一覧ページ {page_num} を取得中...")
+        page = crawler.fetch_list_page(page_num)
+
+        # ページ内の重複を除き、指定件数を超える分は取得しない
+        unique = {}
+        for url, item in crawler.list_page_items(page):
+            unique.setdefault(url, item)
+        items = list(unique.items())[:options['max_items'] - payload['found']]
+        pairs = [(url, crawler.resolve_estate_id(url, item)) for url, item in items]
+        fingerprints = {url: item_fingerprint(item) for url, item in items}
+        crawler.history.mark_seen(pairs)
+
+        known = set()
+        if options['skip_scraped']:
+            crawler.list_fingerprints.update(fingerprints)  # 一覧ページのジョブはサイトごとに1件ずつ順に処理される
+            known = crawler.known_ids(pairs, options['refresh'])
+        name = crawler.site.name
+        # 前のページで登録済みのURLは数えない（ページ送りの途中で掲載順が変わった場合など）
+        added = self.queue.put('detail', name, [
+            (url, {'url': url, 'estate_id': estate_id, 'list_fingerprint': fingerprints[url]})
+            for url, estate_id in pairs if estate_id not in known
+        ])
+        skipped = self.queue.put('detail', name, [
+            (url, {'url': url, 'estate_id': estate_id}) for url, estate_id in pairs if estate_id in known
+        ], result={'status': 'known'})
+
+        # 終了はページの物件の有無で判定する（引き継いだジョブや前のページで登録済みのURLだけのページは続ける）
+        if not items:
+            crawler.log(f"  ✓ ページ {page_num} には物件がありませんでした（終了）")
+            # 打ち切らずに最終ページまで確認できた場合は全ページ確認済みとして記録
+            if not options['known_page_limit']:
+                crawler.history.set_meta('last_full_sweep', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            return {'status': 'end', 'found': 0}
+        queued = len(items) - added - skipped
+        crawler.log(f"  ✓ ページ {page_num} から {len(items)} 件取得"
+                    f"{f'（取得済み {skipped}件 はスキップ）' if skipped else ''}"
+                    f"{f'（登録済み {queued}件）' if queued else ''}")
+
+        found = payload['found'] + len(items)
+        known_streak = payload['known_streak']
+        if options['known_page_limit']:
+            # 差分モード: 取得済みのみのページが続いたら終了
+            known_streak = 0 if added else known_streak + 1
+            if known_streak >= options['known_page_limit']:
+                crawler.log(f"  ✓ 取得済みのみのページが{known_streak}ページ続いたため一覧取得を終了（差分モード）")
+                return {'status': 'listed', 'found': len(items)}
+        if found < options['max_items']:
+            self.queue.put('list', name, [
+                (page_num + 1, {'page': page_num + 1, 'found': found, 'known_streak': known_streak})
+            ])
+        return {'status': 'listed', 'found': len(items)}
+
+    def handle_detail(self, crawler, options, images, payload):
+        """詳細ページ1件を取得・保存し、画像をジョブとして登録"""
+        url = payload['url']
+        status, d = crawler.scrape_property(url, options['skip_scraped'], options['refresh'])
+        crawler.metrics.count('items', status=status)
+        if status == 'no_id':
+            crawler.log(f"⚠️ 物件番号が取得できませんでした: {url}")
+            return {'status': status, 'estate_id': ''}
+
+        previous = crawler.store.get(d['物件番号'], crawler.site.name) if status == 'updated' else None
+        crawler.record(status, url, d, payload.get('list_fingerprint'))
+        if status == 'skipped':
+            crawler.log(f"⏭️ スキップ: 物件番号 {d['物件番号']}（取得済み）")
+        elif status == 'unchanged':
+            crawler.log(f"⏭️ 変更なし: 物件番号 {d['物件番号']}")
+        elif status == 'updated':
+            change = ''
+            if previous and previous.get('価格') != d.get('価格'):
+                change = f"（価格: {previous.get('価格', '')} → {d.get('価格', '')}）"
+            crawler.log(f"🔄 更新: 物件番号 {d['物件番号']}{change}")
+        else:
+            crawler.log(f"✓ 物件番号 {d['物件番号']} - 画像{d['画像枚数']}枚取得")
+
+        if images and status in ('scraped', 'updated') and d['画像URL']:
+            # 内容が変わった物件の画像は取得済みでも条件付きリクエストで確認する
+            revalidate = status == 'updated'
+            self.queue.put('image', crawler.site.name, [
+                (f"{d['物件番号']}_{index} {img_url}",
+                 {'estate_id': d['物件番号'], 'index': index, 'url': img_url, 'revalidate': revalidate})
+                for index, img_url in enumerate(d['画像URL'].split(', '), 1)
+            ])
+        return {'status': status, 'estate_id': d['物件番号']}
+
+
+def job_label(job):
+    payload = job['payload']
+    if job['kind'] == 'list':
+        return f"一覧ページ {payload['page']}"
+    return payload['url']
+
+
+def run_worker(path, threads, rate_share, quiet, number, profile=None):
+    """ワーカープロセスの入口（multiprocessing から呼ぶ、profile は profiling.RunProfiler の引数）"""
+    from .cli import make_logger
+
+    log = prefixed_logger(make_logger(quiet), f"P{number}")
+    worker = QueueWorker(path, threads, rate_share, log)
+
+    def handler(signum, frame):
+        worker.stop()  # 処理中のジョブを終えてから終了
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+    if profile is None:
+        worker.run()
+        return
+    from .profiling import RunProfiler
+
+    with RunProfiler(label=f"worker{number}", log=log, **profile):
+        worker.run()
+
+
+class QueueCrawler:
+    """ジョブをキューに登録し、processes 個のワーカープロセスで処理する
+
+    経過は MultiSiteCrawler と同じ log / progress(site, current, total) で通知する
+    （progress はキューから集計した全プロセス合計の詳細ページの処理件数）。
+    1件ごとの item は通知しない。
+    計測値は各ワーカーがキューに記録した分をサイトごとに合計する（live_metrics / METRICS_FILE）。
+    """
+
+    def __init__(self, path=QUEUE_DB, log=print, progress=None, quiet=False, profile=None):
+        self.path = path
+        self.log = log
+        self.progress = progress or (lambda site, current, total: None)
+        self.quiet = quiet
+        self.profile = profile  # ワーカープロセスごとのプロファイル（profiling.RunProfiler の引数）
+        self.processes = []
+        self.reported = {}  # サイト名 → 最後に通知した (処理件数, 件数)
+        self.queue = None  # 実行中のキュー（live_metrics 用）
+        self.is_running = False
+
+    def stop(self):
+        """ワーカープロセスに停止を依頼（処理中のジョブを終えたところで終了し、続きはキューに残る）"""
+        self.is_running = False
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM（ワーカーは停止の依頼として扱う）
+
+    def run(self, sites=None, rate=DEFAULT_RATE, processes=1, resume=False, max_items=DEFAULT_MAX_ITEMS,
+            workers=DEFAULT_WORKERS, known_pages=DEFAULT_KNOWN_PAGE_LIMIT, full_sweep_days=DEFAULT_FULL_SWEEP_DAYS,
+            skip_scraped=True, refresh=False, incremental=True, use_cache=True, parser='auto', download_images=True,
+            export_on_finish=True, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), retries=DEFAULT_RETRIES,
+            adaptive=True, fresh=False):
+        """sites の取得をキューに登録して処理し、合計とサイトごとの結果（sites）を辞書で返す
+
+        resume=True の場合は登録せず、キューに残っているジョブの続きを処理する（sites は不要）。
+        resume=False でも前回の未処理のジョブが残っていれば続きを処理する（fresh=True の場合は破棄して登録する）。
+        rate はサイトの設定に rate がない場合のアクセス上限で、全プロセスの合計がこれを超えないよう分け合う。
+        workers は1プロセスあたりのスレッド数。
+        """
+        self.is_running = True
+        queue = self.queue = WorkQueue(self.path)
+        try:
+            remaining = queue.unfinished()
+            if not resume and remaining and not fresh:
+                # 異常終了した実行のジョブを黙って消さない
+                self.log(f"♻️ {self.path} に前回の未処理のジョブ {remaining}件 が残っているため、続きから再開します"
+                         f"（破棄して新しく始める場合は --fresh）")
+                resume = True
+            elif not resume and remaining:
+                self.log(f"🗑️ {self.path} に残っていた前回の未処理のジョブ {remaining}件 を破棄して新しく登録します")
+            if resume:
+                self.log(f"♻️ {self.path} に残っているジョブ {queue.unfinished()}件 の続きから再開")
+            else:
+                options = dict(
+                    max_items=max_items, skip_scraped=skip_scraped, refresh=skip_scraped and refresh, rate=rate,
+                    use_cache=use_cache, parser=parser, download_images=download_images, timeout=list(timeout),
+                    retries=retries, adaptive=adaptive
+                )
+                self.seed(queue, sites, options, skip_scraped and incremental, known_pages, full_sweep_days)
+            names = list(queue.sites())
+
+            # 前回中断した実行で記録ファイルにだけ書かれた物件の復元（ワーカーの起動前に1回だけ）
+            self.replay_records()
+
+            self.log(f"🚀 ワーカー {processes}プロセス × {workers}スレッドで取得します（{', '.join(names)}）")
+            context = multiprocessing.get_context('spawn')
+            self.processes = [
+                context.Process(target=run_worker,
+                                args=(self.path, workers, processes, self.quiet, number, self.profile),
+                                name=f"worker-{number}")
+                for number in range(1, processes + 1)
+            ]
+            if self.is_running:  # 起動前に停止を依頼された場合はジョブを残したまま終える
+                for process in self.processes:
+                    process.start()
+                self.watch(queue, names)
+
+            # 異常終了したワーカーの記録ファイルにだけ書かれた物件を取り込む
+            self.replay_records([process.pid for process in self.processes if process.pid is not None])
+            summary = queue.summary()
+            self.report_progress(summary, names)
+            results = {name: self.site_result(summary.get(name, {}), queue.counts(name)) for name in names}
+            result = combine_results(results)
+            if not self.is_running and result['status'] == 'completed':
+                result['status'] = 'stopped'
+            self.save_image_status(queue, names)
+            self.save_metrics(queue, results)
+
+            self.log("\n" + "=" * 60)
+            for name, site_result in results.items():
+                self.log(f"[{name}] {site_result['status']}: 新規 {site_result['new']}件 / 更新 {site_result['updated']}件 / "
+                         f"スキップ {site_result['skipped']}件 / エラー {site_result['errors']}件")
+            remaining = queue.unfinished()
+            if remaining:
+                self.log(f"💾 未処理のジョブ {remaining}件 は {self.path} に残っています（再開すると続きから取得できます）")
+            self.log("=" * 60)
+
+            store = PropertyStore(STORE_FILE)
+            try:
+                if export_on_finish and (result['new'] or result['updated']):
+                    self.log("\n💾 データを出力中...")
+                    count = export_csv(store.records(), CSV_FILE)
+                    self.log(f"  ✓ CSV出力完了: {CSV_FILE}（{count}件）")
+                    export_json(store.records(), JSON_FILE)
+                    self.log(f"  ✓ JSON出力完了: {JSON_FILE}")
+                result['total'] = store.count()
+            finally:
+                store.close()
+            return result
+        except BaseException:
+            # 2回目の停止依頼などで抜ける場合はワーカーを強制終了（借りていたジョブは期限切れで引き継がれる）
+            for process in self.processes:
+                if process.is_alive():
+                    process.kill()
+            raise
+        finally:
+            self.is_running = False
+            for process in self.processes:
+                if process.pid is not None:
+                    process.join()
+            self.processes = []
+            self.queue = None
+            queue.close()
+
+    def replay_records(self, exited_pids=()):
+        """記録ファイル（ワーカーごとのものを含む）の未反映の物件を物件データベース・取得履歴に取り込む
+
+        取り込み終えたワーカーごとの記録ファイルは、書き込み中でなければ削除する。
+        exited_pids は終了したワーカープロセス（その記録ファイルはロックを確認せずに空にできる）。
+        """
+        exited = [segment_path(RECORDS_FILE, worker_id(pid)) for pid in exited_pids]
+        history = HistoryStore(HISTORY_DB)
+        try:
+            store = Crawler(history, log=self.log).open_store(exited)
+            try:
+                store.remove_empty_logs(RECORDS_FILE, exited)
+            finally:
+                store.close()
+        finally:
+            history.close()
+
+    def seed(self, queue, sites, options, incremental, known_pages, full_sweep_days):
+        """前回のジョブ（完了済み、または fresh で破棄するもの）を消してサイトごとに一覧の1ページ目を登録"""
+        queue.reset()
+        for site in sites:
+            # 差分モードで一覧取得を打ち切るかどうかは登録時に決める（定期的に全ページ確認）
+            known_page_limit = 0
+            if incremental:
+                history = HistoryStore(HISTORY_DB, site.name)
+                try:
+                    if Crawler(history, site=site).full_sweep_due(full_sweep_days):
+                        self.log(f"[{site.name}] 🔄 差分モード: 定期確認のため今回は全ページを取得します")
+                    else:
+                        known_page_limit = known_pages
+                finally:
+                    history.close()
+            queue.set_site(site.to_dict(), dict(options, known_page_limit=known_page_limit))
+            queue.put('list', site.name, [(1, {'page': 1, 'found': 0, 'known_streak': 0})])
+        self.log(f"📋 {len(sites)}サイトの取得を {self.path} に登録しました")
+
+    def watch(self, queue, names):
+        """ワーカープロセスが終わるまで、全プロセスの進捗を集計して通知"""
+        while any(process.is_alive() for process in self.processes):
+            self.report_progress(queue.summary(), names)
+            multiprocessing.connection.wait([process.sentinel for process in self.processes], PROGRESS_INTERVAL)
+
+    def report_progress(self, summary, names):
+        """変化のあったサイトの進捗を通知"""
+        for name in names:
+            counts = summary.get(name, {}).get('detail', empty_counts())
+            known = counts['results'].get('known', 0)
+            total = counts['pending'] + counts['leased'] + counts['done'] + counts['failed'] - known
+            current = (counts['done'] + counts['failed'] - known, total)
+            if self.reported.get(name) != current:
+                self.reported[name] = current
+                self.progress(name, *current)
+
+    def site_result(self, summary, counts):
+        """キューの集計から1サイト分の結果（Crawler.run と同じ形式、retries は通信とジョブの再試行の合計）を作る"""
+        lists = summary.get('list', empty_counts())
+        details = summary.get('detail', empty_counts())
+        results = details['results']
+        unfinished = sum(counts['pending'] + counts['leased'] for counts in summary.values())
+        if lists['failed']:
+            status = 'error'
+        elif unfinished:
+            status = 'stopped'
+        elif not sum(details[state] for state in ('pending', 'leased', 'done', 'failed')):
+            status = 'no_urls'
+        else:
+            status = 'completed'
+        return {
+            'status': status,
+            'new': results.get('scraped', 0),
+            'updated': results.get('updated', 0),
+            'skipped': results.get('known', 0) + results.get('skipped', 0) + results.get('unchanged', 0),
+            'errors': details['failed'],
+            'retries': sum(kind['retries'] for kind in summary.values()) + counts.get('retries', 0),
+        }
+
+    def site_metrics(self, queue):
+        """サイト名 → 全プロセスの計測値の合計と、キューのジョブの状態ごとの件数（jobs）"""
+        merged = {}
+        for name, snapshots in queue.metrics().items():
+            metrics = merged[name] = Metrics()
+            for snapshot in snapshots:
+                metrics.merge(snapshot)
+        for name, kinds in queue.summary().items():
+            metrics = merged.setdefault(name, Metrics())
+            for kind, counts in kinds.items():
+                for state in ('pending', 'leased', 'done', 'failed'):
+                    metrics.gauge('jobs', counts[state], kind=kind, state=state)
+        return merged
+
+    def live_metrics(self):
+        """実行中の計測値（MetricsServer の sources）"""
+        queue = self.queue
+        if queue is None:
+            return []
+        return [({'site': name}, metrics) for name, metrics in self.site_metrics(queue).items()]
+
+    def save_metrics(self, queue, results):
+        """サイトごとの計測値の合計を結果と一緒に保存（1プロセスで取得した場合と同じ形式）"""
+        configs = queue.sites()
+        for name, metrics in self.site_metrics(queue).items():
+            if name not in configs:
+                continue
+            path = site_from_dict(configs[name][0]).file(METRICS_FILE)
+            try:
+                metrics.save(path, site=name, result=results.get(name))
+            except OSError as ex:
+                self.log(f"  ⚠️ 計測値の保存に失敗しました: {ex}")
+
+    def save_image_status(self, queue, names):
+        """サイトごとの画像の結果を保存（1プロセスで取得した場合と同じ形式）"""
+        for name in names:
+            config, _ = queue.sites()[name]
+            results = [result for _, result in queue.results('image', name)]
+            if not results:
+                continue
+            path = site_from_dict(config).file(IMAGE_STATUS_FILE)
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(sorted(results, key=lambda r: (r['estate_id'], r['index'])), f,
+                              ensure_ascii=False, indent=2)
+            except OSError as ex:
+                self.log(f"  ⚠️ 画像結果の保存に失敗しました: {ex}")
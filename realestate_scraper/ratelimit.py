@@ -0,0 +1,155 @@
+"""ホスト単位のアクセス間隔制御"""
+import threading
+import time
+import urllib.parse
+
+# 自動調整（AIMD）: 混雑時は半分に下げ、正常な応答ごとに上限の1/20ずつ戻す
+DECREASE_FACTOR = 0.5
+SLOW_FACTOR = 0.8  # 応答時間が伸びてきたときの下げ幅
+INCREASE_RATIO = 0.05
+MIN_RATE_RATIO = 0.05  # 下限（上限に対する比率）
+DECREASE_COOLDOWN = 1.0  # 同時に失敗した複数のリクエストで何度も下げないための間隔（秒）
+
+# 応答時間の移動平均がこれまでの最小値のこの倍数（かつ LATENCY_FLOOR 秒）を超えたら混雑とみなす
+LATENCY_ALPHA = 0.2
+LATENCY_FACTOR = 3.0
+LATENCY_FLOOR = 1.0
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（rate: 1秒あたりの補充数）"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得できるまで待機し、待機した秒数を返す"""
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def set_rate(self, rate):
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated:  # 一時停止中（updated が未来）は補充しない
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.rate = rate
+
+    def pause(self, seconds):
+        """seconds 秒間トークンを払い出さない（Retry-After への対応）"""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = max(self.updated, self.paused_until)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """サーバーの応答に合わせてレートを自動調整するトークンバケット
+
+    max_rate（指定したアクセス上限）から始め、429/503・タイムアウト・応答時間の悪化で
+    レートを掛け算で下げ、正常な応答が続けば足し算で上限まで戻す（AIMD）。
+    """
+
+    def __init__(self, max_rate, burst=1):
+        super().__init__(max_rate, burst)
+        self.max_rate = max_rate
+        self.min_rate = max_rate * MIN_RATE_RATIO
+        self.latency = None  # 応答時間の移動平均
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self.adjust_lock = threading.Lock()
+
+    def decrease(self, factor):
+        """レートを下げる（下げた場合は新しいレート、間隔内なら None を返す。adjust_lock 内で呼ぶ）"""
+        now = time.monotonic()
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return None
+        self.last_decrease = now
+        rate = max(self.min_rate, self.rate * factor)
+        self.set_rate(rate)
+        return rate
+
+    def on_success(self, elapsed):
+        """正常な応答（elapsed: 応答までの秒数）。混雑と判断して下げた場合は新しいレートを返す"""
+        with self.adjust_lock:
+            self.latency = elapsed if self.latency is None else (
+                LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+            )
+            if self.best_latency is None or self.latency < self.best_latency:
+                self.best_latency = self.latency
+            if self.latency > max(self.best_latency * LATENCY_FACTOR, LATENCY_FLOOR):
+                return self.decrease(SLOW_FACTOR)
+            if self.rate < self.max_rate:
+                self.set_rate(min(self.max_rate, self.rate + self.max_rate * INCREASE_RATIO))
+            return None
+
+    def on_overload(self, retry_after=None):
+        """429/503・タイムアウト。下げた場合は新しいレートを返す"""
+        if retry_after:
+            self.pause(retry_after)
+        with self.adjust_lock:
+            return self.decrease(DECREASE_FACTOR)
+
+
+class HostRateLimiter:
+    """ホストごとに独立したトークンバケットを割り当てる（adaptive=True で自動調整）"""
+
+    def __init__(self, rate, burst=1, adaptive=True):
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket_class = AdaptiveTokenBucket if self.adaptive else TokenBucket
+                bucket = bucket_class(self.rate, self.burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """URLのホストに対するトークンを取得（待機秒数を返す）"""
+        return self.bucket_for(url).acquire()
+
+    def success(self, url, elapsed):
+        bucket = self.bucket_for(url)
+        return bucket.on_success(elapsed) if self.adaptive else None
+
+    def overload(self, url, retry_after=None):
+        bucket = self.bucket_for(url)
+        if not self.adaptive:
+            if retry_after:
+                bucket.pause(retry_after)
+            return None
+        return bucket.on_overload(retry_after)
+
+    def rates(self):
+        """ホストごとの現在のレート"""
+        with self.lock:
+            return {host: bucket.rate for host, bucket in self.buckets.items()}
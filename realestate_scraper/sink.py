@@ -0,0 +1,109 @@
+"""取得した物件を1件ずつ追記するJSON Lines出力
+
+1つのプロセスの中では1つのファイルに追記し、複数のプロセスで取得する場合は
+書き手（ワーカープロセス）ごとのファイル（segment_path）に分ける。
+書き手は開いている間ファイルに共有ロックをかけ、反映済みのファイルを空にする側は
+排他ロックが取れたとき（書き込み中のプロセスがないとき）だけ空にする（store.PropertyStore.compact_log）。
+"""
+import glob
+import json
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows（ロックを使わず、書き手の終了が分かっているファイルだけを空にする）
+    fcntl = None
+
+# この件数ごとにディスクへの書き込みを確定（fsync）する
+DEFAULT_FSYNC_EVERY = 20
+
+
+class JsonlSink:
+    """追記専用のJSON Linesファイル
+
+    1行ずつ即座にファイルへ書き込み（行単位のバッファリング）、
+    fsync は fsync_every 件ごとにまとめて行う。
+    """
+
+    def __init__(self, path, fsync_every=DEFAULT_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.f = open_locked(path)
+        self.offset = self.f.seek(0, os.SEEK_END)
+        self.unsynced = 0
+
+    def write(self, record):
+        """1件追記し、書き込み後のファイル位置（バイト）を返す"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        self.f.write(line)
+        # 複数のプロセスが同じファイルへ追記する場合もあるため、実際の書き込み位置を使う
+        self.offset = self.f.tell()
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+        return self.offset
+
+    def sync(self):
+        if self.unsynced:
+            os.fsync(self.f.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        self.f.close()
+
+
+def open_locked(path):
+    """追記用に開いて共有ロックをかける（ロック待ちの間に空のファイルが削除された場合は作り直して開き直す）"""
+    while True:
+        f = open(path, 'ab', buffering=0)
+        if fcntl is None:
+            return f
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+def lock_exclusive(f):
+    """書き込み中のプロセスがなければ排他ロックを取って True（fcntl のない環境では常に False）"""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def segment_path(path, writer):
+    """書き手ごとの記録ファイル（records.jsonl → records.{writer}.jsonl）"""
+    base, ext = os.path.splitext(path)
+    writer = re.sub(r'[^\w.-]', '-', writer)  # ファイル名に使えない文字（ホスト名:プロセスID の : など）
+    return f"{base}.{writer}{ext}"
+
+
+def log_paths(path):
+    """path と書き手ごとの記録ファイルのうち存在するもの"""
+    base, ext = os.path.splitext(path)
+    segments = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"))
+    return ([path] if os.path.exists(path) else []) + segments
+
+
+def read_jsonl(path, offset=0):
+    """offset 以降のレコードを (レコード, 次の行の位置) で返す
+
+    書き込み途中で終わった最後の行（改行なし）は読み飛ばす。
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line), offset
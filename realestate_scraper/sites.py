@@ -0,0 +1,137 @@
+"""対象サイトの設定（URL・セレクタ・アクセスレート）
+
+同じテンプレートを使う複数のサイトを設定ファイル（JSON）で指定する。
+
+    {
+      "sites": [
+        {"name": "shiraoka-housedo", "base_url": "https://shiraoka-housedo.com"},
+        {
+          "name": "kuki-housedo",
+          "base_url": "https://kuki-housedo.com",
+          "list_url": "https://kuki-housedo.com/list/",
+          "list_page": "{list_url}?pageNum={page}",
+          "rate": 1.0,
+          "selectors": {"gallery_class": "mainContents_gallery-colorbox"},
+          "headers": {"Accept-Language": "ja"}
+        }
+      ]
+    }
+
+name 以外は省略可（list_url は base_url + "/list/"、rate は --rate の値）。
+既定のサイト（config.DEFAULT_SITE）は従来どおりのファイル・フォルダを使い、
+それ以外のサイトのチェックポイント・画像・HTTPキャッシュはサイト名付きの場所に分ける。
+"""
+import json
+import os
+import re
+
+from .config import BASE_URL, DEFAULT_SITE, HEADERS, LIST_URL
+from .parsers import DEFAULT_SELECTORS
+
+# 一覧の2ページ目以降のURL
+LIST_PAGE_PATTERN = '{list_url}?pageNum={page}'
+
+# サイト名はファイル名にも使うため英数字・ハイフン・下線のみ
+SITE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+SITE_KEYS = ('name', 'base_url', 'list_url', 'list_page', 'rate', 'selectors', 'headers')
+
+
+class Site:
+    """1サイト分の設定"""
+
+    def __init__(self, name, base_url, list_url=None, list_page=LIST_PAGE_PATTERN, rate=None, selectors=None,
+                 headers=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.list_url = list_url or f"{self.base_url}/list/"
+        self.list_page = list_page
+        self.rate = rate  # None の場合は実行時に指定したアクセス上限
+        self.selectors = {**DEFAULT_SELECTORS, **(selectors or {})}
+        self.headers = {**HEADERS, 'Referer': self.list_url, **(headers or {})}
+
+    def to_dict(self):
+        """設定ファイルと同じ形式の辞書（site_from_dict で元に戻せる）"""
+        return {
+            'name': self.name,
+            'base_url': self.base_url,
+            'list_url': self.list_url,
+            'list_page': self.list_page,
+            'rate': self.rate,
+            'selectors': self.selectors,
+            'headers': self.headers,
+        }
+
+    def list_page_url(self, page_num):
+        if page_num == 1:
+            return self.list_url
+        return self.list_page.format(list_url=self.list_url, page=page_num)
+
+    def file(self, path):
+        """サイトごとのファイル（例: crawl_checkpoint.json → crawl_checkpoint.{サイト名}.json）"""
+        if self.name == DEFAULT_SITE:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.name}{ext}"
+
+    def folder(self, path):
+        """サイトごとのフォルダ（例: images → images/{サイト名}）"""
+        if self.name == DEFAULT_SITE:
+            return path
+        return os.path.join(path, self.name)
+
+
+def default_site():
+    """sites.json を使わない場合の対象サイト"""
+    return Site(DEFAULT_SITE, BASE_URL, LIST_URL)
+
+
+def load_sites(path):
+    """設定ファイルからサイトの一覧を読み込む（内容に誤りがあれば ValueError）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.get('sites') if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f'{path}: "sites" にサイトを1件以上指定してください')
+
+    sites = []
+    names = set()
+    for index, entry in enumerate(entries, 1):
+        site = site_from_dict(entry, f'{path}: {index}件目')
+        if site.name in names:
+            raise ValueError(f'{path}: サイト名 {site.name} が重複しています')
+        names.add(site.name)
+        sites.append(site)
+    return sites
+
+
+def site_from_dict(entry, where='サイトの設定'):
+    """設定1件からサイトを作成（内容に誤りがあれば ValueError、where はエラーメッセージの位置）"""
+    if not isinstance(entry, dict):
+        raise ValueError(f'{where}がオブジェクトではありません')
+    unknown = sorted(set(entry) - set(SITE_KEYS))
+    if unknown:
+        raise ValueError(f'{where}に不明な項目があります: {", ".join(unknown)}')
+    name = entry.get('name', '')
+    if not SITE_NAME_PATTERN.match(str(name)):
+        raise ValueError(f'{where}の name は英数字・ハイフン・下線で指定してください')
+    if not entry.get('base_url'):
+        raise ValueError(f'{where}（{name}）の base_url がありません')
+    rate = entry.get('rate')
+    if rate is not None and (not isinstance(rate, (int, float)) or rate <= 0):
+        raise ValueError(f'{where}（{name}）の rate は正の数値で指定してください')
+    unknown = sorted(set(entry.get('selectors') or {}) - set(DEFAULT_SELECTORS))
+    if unknown:
+        raise ValueError(f'{where}（{name}）の selectors に不明な項目があります: {", ".join(unknown)}')
+    if '{page}' not in entry.get('list_page', LIST_PAGE_PATTERN):
+        raise ValueError(f'{where}（{name}）の list_page には {{page}} を含めてください')
+
+    return Site(
+        name,
+        entry['base_url'],
+        list_url=entry.get('list_url'),
+        list_page=entry.get('list_page', LIST_PAGE_PATTERN),
+        rate=rate,
+        selectors=entry.get('selectors'),
+        headers=entry.get('headers'),
+    )
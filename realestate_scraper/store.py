@@ -0,0 +1,209 @@
+"""物件データの保存先（SQLite）とCSV/JSON出力"""
+import csv
+import json
+import os
+import sqlite3
+import textwrap
+import threading
+from datetime import datetime
+
+from .config import DEFAULT_SITE, RECORDS_FILE
+from .fields import SUMMARY_COLUMNS
+from .sink import lock_exclusive, log_paths, read_jsonl
+
+# CSV/JSONに出力する列（画像情報は取得時に追加される）
+EXPORT_COLUMNS = SUMMARY_COLUMNS + ['画像URL', '画像枚数']
+
+
+class PropertyStore:
+    """(サイト, 物件番号) をキーに1件ずつ上書き保存する物件データベース（WALモード）
+
+    JSON Linesの記録ファイル（sink.JsonlSink）をどこまで反映したかを
+    記録ファイルごとの log_offset として同じトランザクションで記録する
+    （複数のプロセスは別々のファイルに書くため、ファイルごとの位置は単調に増える）。
+    サイトは各レコードの 'サイト'（なければ既定のサイト）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS properties (
+                site TEXT NOT NULL,
+                estate_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                scraped_at TEXT NOT NULL,
+                PRIMARY KEY (site, estate_id)
+            )
+        """)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.db.commit()
+
+    def upsert(self, record, scraped_at=None, log_offset=None, log_path=RECORDS_FILE):
+        """物件1件を保存（同じサイト・物件番号があれば最新の内容で置き換える）
+
+        log_offset は記録ファイル log_path のこのレコードの行末の位置。
+        """
+        scraped_at = scraped_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            self.db.execute(
+                """
+                INSERT INTO properties (site, estate_id, data, scraped_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(site, estate_id) DO UPDATE SET data = excluded.data, scraped_at = excluded.scraped_at
+                """,
+                (record.get('サイト') or DEFAULT_SITE, str(record['物件番号']),
+                 json.dumps(record, ensure_ascii=False), scraped_at)
+            )
+            if log_offset is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (log_key(log_path), str(log_offset))
+                )
+            self.db.commit()
+
+    def get(self, estate_id, site=DEFAULT_SITE):
+        """サイト・物件番号で1件取得（なければ None）"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT data FROM properties WHERE site = ? AND estate_id = ?", (site, str(estate_id))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def log_offset(self, path=RECORDS_FILE):
+        """記録ファイル path のどこまでを反映済みか（バイト位置）"""
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (log_key(path),)).fetchone()
+        return int(row[0]) if row else 0
+
+    def replay_logs(self, path=RECORDS_FILE, exited=()):
+        """path と書き手ごとの記録ファイルの未反映の部分を取り込み、取り込んだ物件を返す
+
+        exited は書き手のプロセスが終了したと分かっている記録ファイル（compact_log を参照）。
+        """
+        replayed = []
+        for log_path in log_paths(path):
+            replayed.extend(self.replay_log(log_path, log_path in exited))
+        return replayed
+
+    def replay_log(self, path, writer_exited=False):
+        """記録ファイルのうち未反映の部分を取り込み、取り込んだ物件を返す
+
+        最後まで反映済みになった記録ファイルは、書き込み中のプロセスがなければ空にする（compact_log）。
+        """
+        if not os.path.exists(path):
+            return []
+        offset = self.log_offset(path)
+        if os.path.getsize(path) < offset:
+            # 記録ファイルが作り直された場合は先頭から取り込み直す（上書きなので重複しない）
+            offset = 0
+
+        replayed = []
+        for record, end_offset in read_jsonl(path, offset):
+            self.upsert(record, log_offset=end_offset, log_path=path)
+            replayed.append(record)
+            offset = end_offset
+        self.compact_log(path, offset, writer_exited)
+        return replayed
+
+    def compact_log(self, path, offset, writer_exited=False):
+        """offset が path の末尾なら（取り込み後に追記されていなければ）空にして True を返す
+
+        書き手（sink.JsonlSink）は開いている間共有ロックをかけるため、排他ロックが取れたとき、
+        または writer_exited（書き手の終了が分かっている）のときだけ空にし、それ以外は取り込むだけにする。
+        反映位置を先に0に戻してから空にするので、途中で落ちても次回は先頭から取り込み直すだけで済む。
+        """
+        with open(path, 'r+b') as f:
+            if not (lock_exclusive(f) or writer_exited):
+                return False
+            if not offset or os.fstat(f.fileno()).st_size != offset:
+                return False
+            with self.lock:
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '0')", (log_key(path),))
+                self.db.commit()
+            f.truncate(0)
+        return True
+
+    def remove_empty_logs(self, path=RECORDS_FILE, exited=()):
+        """空になった書き手ごとの記録ファイルと反映位置を削除（書き込み中のファイルは残す）"""
+        for log_path in log_paths(path):
+            if log_path == path:
+                continue
+            with open(log_path, 'rb') as f:
+                locked = lock_exclusive(f)
+                if not (locked or log_path in exited) or os.fstat(f.fileno()).st_size:
+                    continue
+                with self.lock:
+                    self.db.execute("DELETE FROM meta WHERE key = ?", (log_key(log_path),))
+                    self.db.commit()
+                if locked:
+                    # ロックを持ったまま削除する（ロック待ちの書き手は削除に気づいて作り直す）
+                    os.remove(log_path)
+            if not locked:
+                os.remove(log_path)  # Windows では開いたままのファイルを削除できないため閉じてから
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def records(self):
+        """保存済みの物件を登録順に1件ずつ返す
+
+        全件をメモリに載せないよう、読み取り専用の接続のカーソルから順に読み出す
+        （WALモードのため読み出し中も他のスレッド・プロセスは保存を続けられる）。
+        """
+        db = sqlite3.connect(self.path)
+        try:
+            for site, data in db.execute("SELECT site, data FROM properties ORDER BY rowid"):
+                # 従来の export.csv から取り込んだレコードにはサイトがないため、保存先の列から補う（列順の先頭に置く）
+                yield {'サイト': site, **json.loads(data)}
+        finally:
+            db.close()
+
+    def import_csv(self, path):
+        """従来の export.csv を取り込む（取り込んだ件数を返す）"""
+        count = 0
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                if not row.get('物件番号'):
+                    continue
+                if str(row.get('画像枚数', '')).isdigit():
+                    row['画像枚数'] = int(row['画像枚数'])
+                self.upsert(row, scraped_at='')
+                count += 1
+        return count
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def log_key(path):
+    """記録ファイルごとの反映位置を保存する meta のキー"""
+    return f"log_offset:{os.path.basename(path)}"
+
+
+def export_csv(records, path, columns=EXPORT_COLUMNS):
+    """物件データをCSV（Excel対応のBOM付きUTF-8）で出力し、件数を返す"""
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval='', extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    return count
+
+
+def export_json(records, path):
+    """物件データをJSON配列で出力し、件数を返す（全件をメモリに載せずに書き出す）"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in records:
+            f.write(',\n' if count else '\n')
+            f.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=2), '  '))
+            count += 1
+        f.write('\n]' if count else ']')
+    return count
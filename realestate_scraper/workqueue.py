@@ -0,0 +1,280 @@
+"""複数プロセスで共有する永続ワークキュー（SQLite）
+
+一覧ページ・詳細ページ・画像を1件ずつのジョブとして登録し、
+ワーカーは lease で一定時間ジョブを借り、処理が終われば ack で完了にする。
+借りたまま落ちたワーカーのジョブは期限切れで別のワーカーが引き継ぐ（最低1回は処理される）。
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# ジョブを借りる期間（秒）。処理中は worker_id ごとに renew で延長する
+LEASE_SECONDS = 60
+# 例外で終わったジョブを再試行する上限（期限切れも1回と数える）
+DEFAULT_MAX_ATTEMPTS = 3
+# 再試行までの待機（秒、回数ごとに倍）
+RETRY_DELAY = 5.0
+
+# 同時に取り出せる場合の優先順（一覧を先に進め、取得済みの物件の画像を次の詳細ページより先に片付ける）
+KIND_PRIORITY = {'list': 0, 'image': 1, 'detail': 2}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        site TEXT NOT NULL,
+        key TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL DEFAULT 0,
+        owner TEXT,
+        lease_until REAL,
+        result TEXT,
+        error TEXT,
+        updated_at REAL NOT NULL,
+        UNIQUE (kind, site, key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority, id)",
+    "CREATE TABLE IF NOT EXISTS sites (name TEXT PRIMARY KEY, config TEXT NOT NULL, options TEXT NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS counters (
+        site TEXT NOT NULL, name TEXT NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (site, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS metrics (
+        owner TEXT NOT NULL, site TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (owner, site)
+    )
+    """,
+]
+
+
+def worker_id(pid=None):
+    """ジョブを借りる側の識別子（ホスト名:プロセスID、pid を省略すると現在のプロセス）"""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def empty_counts():
+    return {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0, 'retries': 0, 'results': {}}
+
+
+class WorkQueue:
+    """lease / ack 方式のジョブキュー
+
+    状態は pending（待ち）→ leased（処理中）→ done（完了）/ failed（再試行の上限）。
+    同じ (種類, サイト, キー) のジョブは一度しか登録されないため、
+    引き継いだジョブを処理し直して同じジョブを登録しても重複しない。
+    """
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        # 他のプロセスが書き込み中なら待つ。トランザクションは BEGIN IMMEDIATE で明示する
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+
+    def transaction(self, statements):
+        """(SQL, 引数) の並びを1つの書き込みトランザクションで実行し、変更した行数を返す"""
+        with self.lock:
+            changes = self.db.total_changes
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self.db.execute(sql, params)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            return self.db.total_changes - changes
+
+    def reset(self):
+        """登録済みのジョブとサイトをすべて削除（新しい実行の開始時）"""
+        self.transaction([
+            ("DELETE FROM jobs", ()), ("DELETE FROM sites", ()), ("DELETE FROM counters", ()), ("DELETE FROM metrics", ())
+        ])
+
+    def set_site(self, config, options):
+        """サイトの設定（sites.Site.to_dict）と実行時の設定を登録（ワーカーはここから読む）"""
+        self.transaction([(
+            "INSERT OR REPLACE INTO sites (name, config, options) VALUES (?, ?, ?)",
+            (config['name'], json.dumps(config, ensure_ascii=False), json.dumps(options, ensure_ascii=False))
+        )])
+
+    def sites(self):
+        """サイト名 → (サイトの設定, 実行時の設定)"""
+        with self.lock:
+            rows = self.db.execute("SELECT name, config, options FROM sites ORDER BY rowid").fetchall()
+        return {name: (json.loads(config), json.loads(options)) for name, config, options in rows}
+
+    def put(self, kind, site, items, result=None):
+        """(キー, 内容) の並びをジョブとして登録し、新しく登録した数を返す（登録済みのキーは無視）
+
+        result を指定すると処理不要のジョブとして完了の状態で登録する（重複の判定と集計のため）。
+        """
+        now = time.time()
+        state = 'pending' if result is None else 'done'
+        result = None if result is None else json.dumps(result, ensure_ascii=False)
+        return self.transaction([
+            ("INSERT OR IGNORE INTO jobs (kind, site, key, payload, priority, state, result, updated_at) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+             (kind, site, str(key), json.dumps(payload, ensure_ascii=False), KIND_PRIORITY[kind], state, result, now))
+            for key, payload in items
+        ])
+
+    def lease(self, owner, limit=1):
+        """処理できるジョブを最大 limit 件借りる
+
+        期限切れのジョブも対象（上限回数に達していれば failed にする）。
+        返すジョブは id / kind / site / payload / attempts の辞書。
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute(
+                    "UPDATE jobs SET state = 'failed', owner = NULL, error = 'lease expired', updated_at = ? "
+                    "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                rows = self.db.execute(
+                    """
+                    SELECT id, kind, site, payload, attempts FROM jobs
+                    WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_until < ?)
+                    ORDER BY priority, id LIMIT ?
+                    """,
+                    (now, now, limit)
+                ).fetchall()
+                self.db.executemany(
+                    "UPDATE jobs SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    [(owner, now + self.lease_seconds, now, row[0]) for row in rows]
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return [
+            {'id': job_id, 'kind': kind, 'site': site, 'payload': json.loads(payload), 'attempts': attempts + 1}
+            for job_id, kind, site, payload, attempts in rows
+        ]
+
+    def renew(self, owner):
+        """owner が借りているジョブの期限を延長"""
+        now = time.time()
+        self.transaction([(
+            "UPDATE jobs SET lease_until = ? WHERE state = 'leased' AND owner = ?", (now + self.lease_seconds, owner)
+        )])
+
+    def ack(self, job_id, owner, result=None):
+        """ジョブを完了にする（期限切れで他のワーカーに引き継がれていた場合は何もしない）"""
+        self.transaction([(
+            "UPDATE jobs SET state = 'done', owner = NULL, result = ?, error = NULL, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, owner)
+        )])
+
+    def retry(self, job_id, owner, error):
+        """失敗したジョブを待機後に再試行させる（上限回数に達していれば failed）。新しい状態を返す"""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        attempts = row[0] if row else self.max_attempts
+        state = 'failed' if attempts >= self.max_attempts else 'pending'
+        self.transaction([(
+            "UPDATE jobs SET state = ?, owner = NULL, error = ?, available_at = ?, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (state, error, now + RETRY_DELAY * 2 ** (attempts - 1), now, job_id, owner)
+        )])
+        return state
+
+    def release(self, owner):
+        """owner が借りているジョブを未処理に戻す（停止時、試行回数は数えない）"""
+        self.transaction([(
+            "UPDATE jobs SET state = 'pending', owner = NULL, attempts = MAX(0, attempts - 1), updated_at = ? "
+            "WHERE state = 'leased' AND owner = ?", (time.time(), owner)
+        )])
+
+    def add_count(self, site, name, value):
+        """プロセスごとの集計値（通信の再試行回数など）を合計に加える"""
+        if value:
+            self.transaction([(
+                "INSERT INTO counters (site, name, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(site, name) DO UPDATE SET value = value + excluded.value", (site, name, value)
+            )])
+
+    def counts(self, site):
+        """add_count で加えた集計値（名前 → 合計）"""
+        with self.lock:
+            rows = self.db.execute("SELECT name, value FROM counters WHERE site = ?", (site,)).fetchall()
+        return dict(rows)
+
+    def save_metrics(self, owner, site, snapshot):
+        """プロセスごとの計測値（metrics.Metrics.snapshot）を記録（同じプロセス・サイトの分は置き換える）"""
+        self.transaction([(
+            "INSERT OR REPLACE INTO metrics (owner, site, data) VALUES (?, ?, ?)",
+            (owner, site, json.dumps(snapshot, ensure_ascii=False))
+        )])
+
+    def metrics(self):
+        """サイト名 → 全プロセスの計測値の並び"""
+        with self.lock:
+            rows = self.db.execute("SELECT site, data FROM metrics ORDER BY rowid").fetchall()
+        snapshots = {}
+        for site, data in rows:
+            snapshots.setdefault(site, []).append(json.loads(data))
+        return snapshots
+
+    def unfinished(self):
+        """待ち・処理中のジョブの数（0 ならキューは空）"""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def summary(self):
+        """サイトごと・種類ごとの集計（全プロセスの進捗）
+
+        {サイト: {種類: {'pending': n, 'leased': n, 'done': n, 'failed': n, 'retries': n,
+                          'results': {完了したジョブの結果の status: n}}}}
+        """
+        with self.lock:
+            states = self.db.execute(
+                "SELECT site, kind, state, COUNT(*), SUM(MAX(attempts - 1, 0)) FROM jobs GROUP BY site, kind, state"
+            ).fetchall()
+            results = self.db.execute(
+                "SELECT site, kind, json_extract(result, '$.status') AS status, COUNT(*) FROM jobs "
+                "WHERE state = 'done' AND status IS NOT NULL GROUP BY site, kind, status"
+            ).fetchall()
+
+        summary = {}
+        for site, kind, state, count, retries in states:
+            counts = summary.setdefault(site, {}).setdefault(kind, empty_counts())
+            counts[state] = count
+            counts['retries'] += retries or 0
+        for site, kind, status, count in results:
+            summary[site][kind]['results'][status] = count
+        return summary
+
+    def results(self, kind, site):
+        """完了したジョブの内容と結果を登録順に返す"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT payload, result FROM jobs WHERE kind = ? AND site = ? AND state = 'done' ORDER BY id",
+                (kind, site)
+            ).fetchall()
+        for payload, result in rows:
+            yield json.loads(payload), json.loads(result) if result else None
+
+    def close(self):
+        with self.lock:
+            self.db.close()
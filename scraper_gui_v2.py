@@ -1,30 +1,34 @@
+import contextlib
 import os
+import queue
 import sys
-import requests
-import json
-import pandas as pd
-from bs4 import BeautifulSoup
-import time
-import urllib.parse
 import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from datetime import datetime
 
-LIST_URL = 'https://shiraoka-housedo.com/list/'
-BASE_URL = 'https://shiraoka-housedo.com'
-IMG_FOLDER = 'images'
-CSV_FILE = 'export.csv'
-JSON_FILE = 'export.json'
-HISTORY_FILE = 'scraping_history.json'  # 取得履歴ファイル
+# 起動時は設定と取得履歴だけを読み込み、通信・解析まわり（requests など）は
+# 実行・出力を始めるときに読み込む（ウィンドウを早く表示するため）
+from realestate_scraper.checkpoint import load_checkpoint
+from realestate_scraper.config import (
+    CHECKPOINT_FILE, CSV_FILE, DEFAULT_FULL_SWEEP_DAYS, DEFAULT_KNOWN_PAGE_LIMIT, DEFAULT_MAX_ITEMS,
+    DEFAULT_RATE, DEFAULT_WORKERS, HISTORY_DB, HISTORY_FILE, JSON_FILE, LIST_URL, LOG_FILE, PROFILE_DIR,
+)
+from realestate_scraper.history import HistoryStore, migrate_history
+from realestate_scraper.parsers import available_backends
 
-# ユーザーエージェント付き共通ヘッダ
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/106.0.0.0 Safari/537.36",
-    "Accept-Language": "ja,en-US;q=0.9",
-    "Referer": "https://shiraoka-housedo.com/list/"
-}
+# 設定するとウィンドウ表示後に "window-ready" を出力して終了する（起動時間の計測用）
+STARTUP_PROBE_ENV = 'SCRAPER_STARTUP_PROBE'
+# 実行のプロファイル（画面には出さない。Ctrl+Shift+P で cprofile → sample → OFF、Ctrl+Shift+M で tracemalloc）
+# 環境変数 SCRAPER_PROFILE=cprofile / sample で起動時から有効にできる
+PROFILE_ENV = 'SCRAPER_PROFILE'
+PROFILE_CYCLE = (None, 'cprofile', 'sample')
+
+# ログ・進捗は取得スレッドからキューに積み、画面側でこの間隔ごとにまとめて反映する
+EVENT_PUMP_MS = 50  # 約20フレーム/秒
+EVENT_BATCH = 1000  # 1フレームで処理するイベントの上限（残りは次のフレームへ）
+LOG_VIEW_LINES = 2000  # 画面に残すログの行数（全件は LOG_FILE へ）
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024  # 起動時にこれを超えていたら .1 に退避する
 
 class ScraperGUI:
     def __init__(self, root):
@@ -34,31 +38,40 @@ class ScraperGUI:
         self.root.resizable(True, True)
         
         self.is_running = False
-        self.scraped_ids = self.load_history()  # 取得済み物件番号
+        self.crawler = None  # 実行中の取得処理
+        self.history = None  # 取得履歴（ウィンドウ表示後に開く）
+        self.events = queue.Queue()  # 取得スレッド → 画面（ログ・進捗・画面操作）
+        self.log_file = None  # 実行ログの保存先（ウィンドウ表示後に開く）
+        self.profile_mode = os.environ.get(PROFILE_ENV) if os.environ.get(PROFILE_ENV) in PROFILE_CYCLE else None
+        self.profile_memory = False  # tracemalloc
+        
         self.create_widgets()
+        self.root.bind('<Control-P>', self.toggle_profile)
+        self.root.bind('<Control-M>', self.toggle_profile_memory)
+        self.root.after_idle(self.open_history)
+        self.root.after(EVENT_PUMP_MS, self.pump_events)
+        
+    def open_history(self):
+        """取得履歴とログファイルを開き、履歴が必要な操作を有効にする"""
+        self.open_log_file()
+        self.history = HistoryStore(HISTORY_DB)  # 物件番号ごとに随時更新
+        migrated = migrate_history(self.history, HISTORY_FILE, self.log)
+        if migrated is not None:
+            self.log(f"📥 {HISTORY_FILE} から {migrated}件 の取得履歴を {HISTORY_DB} に移行しました")
+        self.scraped_count_label.config(text=f"（取得済み: {self.history.count()}件）")
+        self.start_button.config(state=tk.NORMAL)
+        self.resume_button.config(state=tk.NORMAL if os.path.exists(CHECKPOINT_FILE) else tk.DISABLED)
+        self.export_button.config(state=tk.NORMAL)
+        self.clear_history_button.config(state=tk.NORMAL)
         
-    def load_history(self):
-        """取得履歴を読み込む"""
-        if os.path.exists(HISTORY_FILE):
-            try:
-                with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return set(data.get('scraped_ids', []))
-            except Exception:
-                return set()
-        return set()
-    
-    def save_history(self):
-        """取得履歴を保存"""
+    def open_log_file(self):
+        """実行ログの保存先を開く（大きくなっていたら前回までの分を .1 に退避）"""
         try:
-            data = {
-                'scraped_ids': list(self.scraped_ids),
-                'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as ex:
-            print(f'履歴保存エラー: {ex}')
+            if os.path.exists(LOG_FILE) and os.path.getsize(LOG_FILE) > LOG_FILE_MAX_BYTES:
+                os.replace(LOG_FILE, LOG_FILE + '.1')
+            self.log_file = open(LOG_FILE, 'a', encoding='utf-8')
+        except OSError as ex:
+            self.log(f"⚠️ ログファイルを開けませんでした: {ex}")
         
     def create_widgets(self):
         # タイトル
@@ -85,12 +98,30 @@ class ScraperGUI:
         
         tk.Label(items_frame, text="取得件数:", font=("Arial", 10)).pack(side=tk.LEFT)
         
-        self.max_items_var = tk.StringVar(value="15")
+        self.max_items_var = tk.StringVar(value=str(DEFAULT_MAX_ITEMS))
         self.max_items_entry = tk.Entry(items_frame, textvariable=self.max_items_var, width=10, font=("Arial", 10))
         self.max_items_entry.pack(side=tk.LEFT, padx=10)
         
         tk.Label(items_frame, text="件（全件取得する場合は大きな数値を入力）", font=("Arial", 9), fg="gray").pack(side=tk.LEFT)
         
+        # 並列数・アクセスレート
+        speed_frame = tk.Frame(settings_frame)
+        speed_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(speed_frame, text="並列数:", font=("Arial", 10)).pack(side=tk.LEFT)
+        
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        self.workers_entry = tk.Entry(speed_frame, textvariable=self.workers_var, width=5, font=("Arial", 10))
+        self.workers_entry.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(speed_frame, text="アクセス上限:", font=("Arial", 10)).pack(side=tk.LEFT)
+        
+        self.rate_var = tk.StringVar(value=str(DEFAULT_RATE))
+        self.rate_entry = tk.Entry(speed_frame, textvariable=self.rate_var, width=5, font=("Arial", 10))
+        self.rate_entry.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(speed_frame, text="回/秒（サーバー負荷を抑えるための上限）", font=("Arial", 9), fg="gray").pack(side=tk.LEFT)
+        
         # スキップ設定
         skip_frame = tk.Frame(settings_frame)
         skip_frame.pack(fill=tk.X, pady=5)
@@ -104,10 +135,20 @@ class ScraperGUI:
         )
         self.skip_checkbox.pack(side=tk.LEFT)
         
+        # 更新確認（取得済みでも内容が変わった物件は再取得）
+        self.refresh_var = tk.BooleanVar(value=False)
+        self.refresh_checkbox = tk.Checkbutton(
+            skip_frame,
+            text="変更があれば再取得",
+            variable=self.refresh_var,
+            font=("Arial", 10)
+        )
+        self.refresh_checkbox.pack(side=tk.LEFT, padx=(10, 0))
+        
         # 取得済み件数表示
         self.scraped_count_label = tk.Label(
             skip_frame,
-            text=f"（取得済み: {len(self.scraped_ids)}件）",
+            text="（取得済み: -件）",
             font=("Arial", 9),
             fg="gray"
         )
@@ -118,6 +159,7 @@ class ScraperGUI:
             skip_frame,
             text="履歴クリア",
             command=self.clear_history,
+            state=tk.DISABLED,
             font=("Arial", 9),
             bg="#e67e22",
             fg="white",
@@ -125,6 +167,69 @@ class ScraperGUI:
         )
         self.clear_history_button.pack(side=tk.LEFT, padx=5)
         
+        # 差分モード設定
+        incremental_frame = tk.Frame(settings_frame)
+        incremental_frame.pack(fill=tk.X, pady=5)
+        
+        self.incremental_var = tk.BooleanVar(value=True)
+        self.incremental_checkbox = tk.Checkbutton(
+            incremental_frame,
+            text="差分モード: 取得済みのみのページが",
+            variable=self.incremental_var,
+            font=("Arial", 10)
+        )
+        self.incremental_checkbox.pack(side=tk.LEFT)
+        
+        self.known_pages_var = tk.StringVar(value=str(DEFAULT_KNOWN_PAGE_LIMIT))
+        self.known_pages_entry = tk.Entry(incremental_frame, textvariable=self.known_pages_var, width=4, font=("Arial", 10))
+        self.known_pages_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(incremental_frame, text="ページ続いたら一覧取得を終了 /", font=("Arial", 10)).pack(side=tk.LEFT)
+        
+        self.full_sweep_days_var = tk.StringVar(value=str(DEFAULT_FULL_SWEEP_DAYS))
+        self.full_sweep_days_entry = tk.Entry(incremental_frame, textvariable=self.full_sweep_days_var, width=4, font=("Arial", 10))
+        self.full_sweep_days_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(incremental_frame, text="日ごとに全ページ確認（0: しない）", font=("Arial", 9), fg="gray").pack(side=tk.LEFT)
+        
+        # HTTPキャッシュ設定
+        cache_frame = tk.Frame(settings_frame)
+        cache_frame.pack(fill=tk.X, pady=5)
+        
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.cache_checkbox = tk.Checkbutton(
+            cache_frame,
+            text="HTTPキャッシュを使う（変更のないページ・画像は再ダウンロードしない）",
+            variable=self.use_cache_var,
+            font=("Arial", 10)
+        )
+        self.cache_checkbox.pack(side=tk.LEFT)
+        
+        tk.Label(cache_frame, text="解析エンジン:", font=("Arial", 10)).pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.parser_var = tk.StringVar(value='auto')
+        self.parser_combo = ttk.Combobox(
+            cache_frame,
+            textvariable=self.parser_var,
+            values=['auto'] + available_backends(),
+            state='readonly',
+            width=10
+        )
+        self.parser_combo.pack(side=tk.LEFT, padx=10)
+        
+        # 出力設定
+        output_frame = tk.Frame(settings_frame)
+        output_frame.pack(fill=tk.X, pady=5)
+        
+        self.export_on_finish_var = tk.BooleanVar(value=True)
+        self.export_checkbox = tk.Checkbutton(
+            output_frame,
+            text="完了時にCSV/JSONを出力する（データは取得ごとに properties.db へ保存）",
+            variable=self.export_on_finish_var,
+            font=("Arial", 10)
+        )
+        self.export_checkbox.pack(side=tk.LEFT)
+        
         # URL表示
         url_frame = tk.Frame(settings_frame)
         url_frame.pack(fill=tk.X, pady=5)
@@ -140,6 +245,7 @@ class ScraperGUI:
             button_frame,
             text="スクレイピング開始",
             command=self.start_scraping,
+            state=tk.DISABLED,
             bg="#27ae60",
             fg="white",
             font=("Arial", 11, "bold"),
@@ -149,6 +255,20 @@ class ScraperGUI:
         )
         self.start_button.pack(side=tk.LEFT, padx=5)
         
+        self.resume_button = tk.Button(
+            button_frame,
+            text="前回の続きから再開",
+            command=self.resume_scraping,
+            bg="#16a085",
+            fg="white",
+            font=("Arial", 11, "bold"),
+            width=18,
+            height=2,
+            state=tk.DISABLED,
+            cursor="hand2"
+        )
+        self.resume_button.pack(side=tk.LEFT, padx=5)
+        
         self.stop_button = tk.Button(
             button_frame,
             text="停止",
@@ -163,6 +283,20 @@ class ScraperGUI:
         )
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
+        self.export_button = tk.Button(
+            button_frame,
+            text="CSV/JSON出力",
+            command=self.export_now,
+            state=tk.DISABLED,
+            bg="#2980b9",
+            fg="white",
+            font=("Arial", 11, "bold"),
+            width=15,
+            height=2,
+            cursor="hand2"
+        )
+        self.export_button.pack(side=tk.LEFT, padx=5)
+        
         # 進捗バー
         progress_frame = tk.Frame(self.root)
         progress_frame.pack(fill=tk.X, padx=20, pady=5)
@@ -210,32 +344,87 @@ class ScraperGUI:
         )
         self.status_label.pack(fill=tk.X, padx=10, pady=5)
     
+    def toggle_profile(self, event=None):
+        """次の実行からのプロファイルの方法を切り替える（隠し操作）"""
+        self.profile_mode = PROFILE_CYCLE[(PROFILE_CYCLE.index(self.profile_mode) + 1) % len(PROFILE_CYCLE)]
+        self.log(f"🔬 プロファイル: {self.profile_mode}（次の実行から {PROFILE_DIR}/ に保存）" if self.profile_mode
+                 else "🔬 プロファイル: OFF")
+        
+    def toggle_profile_memory(self, event=None):
+        """次の実行からの tracemalloc を切り替える（隠し操作）"""
+        self.profile_memory = not self.profile_memory
+        self.log(f"🔬 tracemalloc: ON（次の実行から {PROFILE_DIR}/ に保存）" if self.profile_memory
+                 else "🔬 tracemalloc: OFF")
+        
     def clear_history(self):
         """取得履歴をクリア"""
         if messagebox.askyesno("確認", "取得履歴をクリアしますか？\n次回実行時、すべての物件を再取得します。"):
-            self.scraped_ids.clear()
-            self.save_history()
+            self.history.clear()
             self.scraped_count_label.config(text=f"（取得済み: 0件）")
             self.log("✓ 取得履歴をクリアしました")
             messagebox.showinfo("完了", "取得履歴をクリアしました")
         
     def log(self, message):
-        """ログを表示"""
+        """ログを表示（どのスレッドからでも呼べる。画面への反映は pump_events）"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.events.put(('log', f"[{timestamp}] {message}\n"))
         
     def update_progress(self, current, total):
-        """進捗バーを更新"""
-        if total > 0:
-            progress = (current / total) * 100
-            self.progress_var.set(progress)
-            self.progress_label.config(text=f"{current}/{total} 件処理中... ({progress:.1f}%)")
-        self.root.update_idletasks()
-        
-    def start_scraping(self):
-        """スクレイピング開始"""
+        """進捗バーを更新（どのスレッドからでも呼べる。1フレーム内は最新の値だけ反映）"""
+        self.events.put(('progress', (current, total)))
+        
+    def call_in_ui(self, func, *args):
+        """画面の操作を取得スレッドから依頼する（pump_events で実行）"""
+        self.events.put(('call', (func, args)))
+        
+    def pump_events(self):
+        """キューに溜まったログ・進捗をまとめて画面に反映する（EVENT_PUMP_MS ごと）"""
+        try:
+            self.drain_events()
+        finally:
+            self.root.after(EVENT_PUMP_MS, self.pump_events)
+        
+    def drain_events(self):
+        lines = []
+        progress = None
+        calls = []
+        for _ in range(EVENT_BATCH):
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                lines.append(payload)
+            elif kind == 'progress':
+                progress = payload
+            else:
+                calls.append(payload)
+        
+        if lines:
+            text = ''.join(lines)
+            if self.log_file:
+                self.log_file.write(text)
+                self.log_file.flush()
+            self.log_text.insert(tk.END, text)
+            # 画面には直近 LOG_VIEW_LINES 行だけ残す
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - LOG_VIEW_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_text.see(tk.END)
+        
+        if progress is not None:
+            current, total = progress
+            if total > 0:
+                percent = (current / total) * 100
+                self.progress_var.set(percent)
+                self.progress_label.config(text=f"{current}/{total} 件処理中... ({percent:.1f}%)")
+        
+        # 終了処理などはログを反映した後に行う（メッセージボックスの前にログを出し切る）
+        for func, args in calls:
+            func(*args)
+        
+    def start_scraping(self, resume=None):
+        """スクレイピング開始（resume は前回のチェックポイント）"""
         try:
             max_items = int(self.max_items_var.get())
             if max_items <= 0:
@@ -245,163 +434,154 @@ class ScraperGUI:
             messagebox.showerror("エラー", "取得件数は数値で入力してください")
             return
         
+        try:
+            workers = int(self.workers_var.get())
+            rate = float(self.rate_var.get())
+            if workers <= 0 or rate <= 0:
+                messagebox.showerror("エラー", "並列数とアクセス上限は正の数値を入力してください")
+                return
+        except ValueError:
+            messagebox.showerror("エラー", "並列数とアクセス上限は数値で入力してください")
+            return
+        
+        try:
+            known_pages = int(self.known_pages_var.get())
+            full_sweep_days = int(self.full_sweep_days_var.get())
+            if known_pages <= 0 or full_sweep_days < 0:
+                messagebox.showerror("エラー", "差分モードのページ数は1以上、日数は0以上を入力してください")
+                return
+        except ValueError:
+            messagebox.showerror("エラー", "差分モードのページ数と日数は数値で入力してください")
+            return
+        
         self.is_running = True
         self.start_button.config(state=tk.DISABLED)
+        self.resume_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.max_items_entry.config(state=tk.DISABLED)
+        self.workers_entry.config(state=tk.DISABLED)
+        self.rate_entry.config(state=tk.DISABLED)
         self.skip_checkbox.config(state=tk.DISABLED)
+        self.refresh_checkbox.config(state=tk.DISABLED)
+        self.incremental_checkbox.config(state=tk.DISABLED)
+        self.known_pages_entry.config(state=tk.DISABLED)
+        self.full_sweep_days_entry.config(state=tk.DISABLED)
+        self.cache_checkbox.config(state=tk.DISABLED)
+        self.parser_combo.config(state=tk.DISABLED)
+        self.export_checkbox.config(state=tk.DISABLED)
+        self.export_button.config(state=tk.DISABLED)
         self.clear_history_button.config(state=tk.DISABLED)
         self.log_text.delete(1.0, tk.END)
         self.progress_var.set(0)
         self.status_label.config(text="実行中...")
         
         # 別スレッドで実行
-        thread = threading.Thread(target=self.run_scraping, args=(max_items,))
+        thread = threading.Thread(target=self.run_scraping, args=(max_items, workers, rate, known_pages, full_sweep_days, resume))
         thread.daemon = True
         thread.start()
         
+    def resume_scraping(self):
+        """前回中断した実行を、取得予定だったURLの残りから再開"""
+        checkpoint = load_checkpoint(CHECKPOINT_FILE)
+        if checkpoint is None:
+            messagebox.showinfo("情報", "再開できる実行がありません")
+            self.resume_button.config(state=tk.DISABLED)
+            return
+        self.start_scraping(resume=checkpoint)
+        
     def stop_scraping(self):
         """スクレイピング停止"""
         self.is_running = False
+        if self.crawler:
+            self.crawler.stop()
         self.log("⚠️ 停止リクエストを受信しました...")
         self.status_label.config(text="停止中...")
         
-    def run_scraping(self, max_items):
-        """スクレイピング実行"""
+    def run_scraping(self, max_items, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                     known_pages=DEFAULT_KNOWN_PAGE_LIMIT, full_sweep_days=DEFAULT_FULL_SWEEP_DAYS, resume=None):
+        """スクレイピング実行（resume にチェックポイントを渡すと前回の続きから）"""
+        status = 'error'
         try:
-            skip_scraped = self.skip_scraped_var.get()
-            
-            self.log("=" * 60)
-            self.log("🚀 不動産スクレイピング開始")
-            if skip_scraped:
-                self.log(f"📋 取得済みスキップモード: ON（{len(self.scraped_ids)}件スキップ）")
-            else:
-                self.log("📋 取得済みスキップモード: OFF（すべて取得）")
-            self.log("=" * 60)
-            
-            # 一覧ページから物件URLを取得（複数ページ対応）
-            detail_urls = self.get_detail_urls(max_items)
-            
-            if not detail_urls:
-                self.log("❌ エラー: 物件URLが取得できませんでした")
-                self.finish_scraping(False)
-                return
-            
-            self.log(f"✓ {len(detail_urls)}件の物件URLを取得しました\n")
-            
-            rows = []
-            skipped_count = 0
-            new_count = 0
-            
-            for idx, url in enumerate(detail_urls, 1):
-                if not self.is_running:
-                    self.log("⚠️ ユーザーによって停止されました")
-                    break
-                
-                self.log(f"[{idx}/{len(detail_urls)}] 処理中: {url}")
-                self.update_progress(idx - 1, len(detail_urls))
-                
-                try:
-                    # 詳細ページを取得
-                    soup = self.fetch_detail_page(url)
-                    
-                    # 物件情報を抽出
-                    d = self.extract_detail(soup, url)
-                    
-                    # 物件番号が取得できなかった場合はスキップ
-                    if not d['物件番号']:
-                        self.log(f"  ⚠️ 物件番号が取得できませんでした")
-                        continue
-                    
-                    # スキップチェック（HTMLから物件番号を取得した後）
-                    if skip_scraped and d['物件番号'] in self.scraped_ids:
-                        self.log(f"  ⏭️ スキップ: 物件番号 {d['物件番号']}（取得済み）")
-                        skipped_count += 1
-                        self.update_progress(idx, len(detail_urls))
-                        continue
-                    
-                    # 画像を取得
-                    img_urls = self.extract_images(soup, d['物件番号'])
-                    d['画像URL'] = ', '.join(img_urls) if img_urls else ''
-                    d['画像枚数'] = len(img_urls)
-                    
-                    # 取得済みリストに追加
-                    self.scraped_ids.add(d['物件番号'])
-                    new_count += 1
-                    
-                    rows.append(d)
-                    self.log(f"  ✓ 物件番号 {d['物件番号']} - 画像{d['画像枚数']}枚取得")
-                    
-                    # アクセス間隔を空ける
-                    if idx < len(detail_urls):
-                        time.sleep(1)
-                    
-                except Exception as ex:
-                    self.log(f"  ❌ エラー: {ex}")
-                    continue
-            
-            self.update_progress(len(detail_urls), len(detail_urls))
-            
-            # 履歴を保存
-            self.save_history()
-            self.scraped_count_label.config(text=f"（取得済み: {len(self.scraped_ids)}件）")
-            
-            if not rows:
-                self.log("\n⚠️ 新規データがありませんでした")
-                self.log(f"  スキップ: {skipped_count}件")
-                self.finish_scraping(True)
-                return
-            
-            # CSV/JSON出力
-            self.log("\n💾 データを出力中...")
-            
-            # 既存データと結合
-            if os.path.exists(CSV_FILE):
-                existing_df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
-                new_df = pd.DataFrame(rows)
-                df = pd.concat([existing_df, new_df], ignore_index=True)
-                # 物件番号で重複削除（最新を保持）
-                df = df.drop_duplicates(subset=['物件番号'], keep='last')
-            else:
-                df = pd.DataFrame(rows)
-            
-            df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
-            self.log(f"  ✓ CSV出力完了: {CSV_FILE}")
-            
-            # JSON出力
-            all_data = df.to_dict('records')
-            with open(JSON_FILE, 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, ensure_ascii=False, indent=2)
-            self.log(f"  ✓ JSON出力完了: {JSON_FILE}")
-            
-            # 画像フォルダの確認
-            if os.path.exists(IMG_FOLDER):
-                img_files = os.listdir(IMG_FOLDER)
-                self.log(f"  ✓ 画像保存完了: {IMG_FOLDER}/ ({len(img_files)}ファイル)")
-            
-            self.log("\n" + "=" * 60)
-            self.log(f"🎉 完了:")
-            self.log(f"  新規取得: {new_count}件")
-            self.log(f"  スキップ: {skipped_count}件")
-            self.log(f"  合計: {len(df)}件（CSV/JSON）")
-            self.log("=" * 60)
-            
-            self.finish_scraping(True)
-            
+            from realestate_scraper.crawler import Crawler
+
+            self.crawler = Crawler(self.history, log=self.log, progress=self.update_progress)
+            profiler = contextlib.nullcontext()
+            if self.profile_mode or self.profile_memory:
+                from realestate_scraper.profiling import RunProfiler
+                profiler = RunProfiler(self.profile_mode, PROFILE_DIR, tracemalloc=self.profile_memory, log=self.log)
+            with profiler:
+                result = self.crawler.run(
+                    max_items, workers, rate, known_pages, full_sweep_days,
+                    skip_scraped=self.skip_scraped_var.get(),
+                    refresh=self.refresh_var.get(),
+                    incremental=self.incremental_var.get(),
+                    use_cache=self.use_cache_var.get(),
+                    parser=self.parser_var.get(),
+                    export_on_finish=self.export_on_finish_var.get(),
+                    resume=resume
+                )
+            status = result['status']
+        except Exception as ex:
+            self.log(f"❌ 実行エラー: {ex}")
+        finally:
+            # 失敗しても画面を実行中のままにしない
+            self.crawler = None
+            self.call_in_ui(self.finish_scraping, status)
+    
+    def export_now(self):
+        """CSV/JSON出力ボタン（全件の書き出しは別スレッドで実行）"""
+        self.export_button.config(state=tk.DISABLED)
+        thread = threading.Thread(target=self.run_export)
+        thread.daemon = True
+        thread.start()
+
+    def run_export(self):
+        """CSV/JSON出力（結果は画面のスレッドで表示）"""
+        try:
+            from realestate_scraper.crawler import Crawler
+
+            count = Crawler(self.history, log=self.log).export()
+            self.call_in_ui(self.finish_export, count, None)
         except Exception as ex:
-            self.log(f"\n❌ エラーが発生しました: {ex}")
-            self.finish_scraping(False)
+            self.log(f"❌ 出力エラー: {ex}")
+            self.call_in_ui(self.finish_export, 0, ex)
+
+    def finish_export(self, count, error):
+        """CSV/JSON出力の終了処理（画面のスレッドで実行）"""
+        if not self.is_running:
+            self.export_button.config(state=tk.NORMAL)
+        if error is None:
+            messagebox.showinfo("完了", f"{count}件を出力しました\n\n出力ファイル:\n- {CSV_FILE}\n- {JSON_FILE}")
+        else:
+            messagebox.showerror("エラー", f"出力できませんでした: {error}")
     
-    def finish_scraping(self, success):
-        """スクレイピング終了処理"""
+    def finish_scraping(self, status):
+        """スクレイピング終了処理（画面のスレッドで実行、status は Crawler.run の結果の状態）"""
         self.is_running = False
+        self.scraped_count_label.config(text=f"（取得済み: {self.history.count()}件）")
         self.start_button.config(state=tk.NORMAL)
+        self.resume_button.config(state=tk.NORMAL if os.path.exists(CHECKPOINT_FILE) else tk.DISABLED)
         self.stop_button.config(state=tk.DISABLED)
         self.max_items_entry.config(state=tk.NORMAL)
+        self.workers_entry.config(state=tk.NORMAL)
+        self.rate_entry.config(state=tk.NORMAL)
         self.skip_checkbox.config(state=tk.NORMAL)
+        self.refresh_checkbox.config(state=tk.NORMAL)
+        self.incremental_checkbox.config(state=tk.NORMAL)
+        self.known_pages_entry.config(state=tk.NORMAL)
+        self.full_sweep_days_entry.config(state=tk.NORMAL)
+        self.cache_checkbox.config(state=tk.NORMAL)
+        self.parser_combo.config(state='readonly')
+        self.export_checkbox.config(state=tk.NORMAL)
+        self.export_button.config(state=tk.NORMAL)
         self.clear_history_button.config(state=tk.NORMAL)
         
-        if success:
+        if status == 'stopped':
+            # 途中で止めた場合はチェックポイントから再開できる
+            self.resume_button.config(state=tk.NORMAL)
+            self.status_label.config(text="停止しました（再開できます）")
+            messagebox.showinfo("停止", "停止しました（再開できます）\n\n「前回の続きから再開」で残りの物件から取得を続けられます。")
+        elif status == 'completed':
             self.status_label.config(text="完了")
             messagebox.showinfo("完了", "スクレイピングが完了しました！\n\n出力ファイル:\n- export.csv\n- export.json\n- images/")
             
@@ -422,181 +602,17 @@ class ScraperGUI:
                 os.system(f'xdg-open "{os.getcwd()}"')
         except Exception as ex:
             self.log(f"フォルダを開けませんでした: {ex}")
-    
-    # 以下、スクレイピング関連のメソッド
-    
-    def fetch_list_page(self, page_num=1):
-        url = LIST_URL if page_num == 1 else f"{LIST_URL}?pageNum={page_num}"
-        res = requests.get(url, headers=HEADERS)
-        return BeautifulSoup(res.text, 'html.parser')
-    
-    def get_detail_urls(self, max_items):
-        """複数ページから物件URLを取得"""
-        all_urls = []
-        page_num = 1
-        
-        while len(all_urls) < max_items:
-            self.log(f"📝 一覧ページ {page_num} を取得中...")
-            soup = self.fetch_list_page(page_num)
-            
-            # 現在のページからURLを抽出
-            page_urls = []
-            scripts = soup.find_all('script', {'type':'application/ld+json'})
-            for script in scripts:
-                if 'ItemList' in script.text:
-                    try:
-                        data = json.loads(script.text)
-                        for item in data.get('itemListElement', []):
-                            url = item.get('item')
-                            if url and url not in all_urls:
-                                page_urls.append(url)
-                    except Exception:
-                        pass
-            
-            # ページにURLがなければ終了
-            if not page_urls:
-                self.log(f"  ✓ ページ {page_num} には物件がありませんでした（終了）")
-                break
-            
-            self.log(f"  ✓ ページ {page_num} から {len(page_urls)} 件取得")
-            all_urls.extend(page_urls)
-            
-            # 指定件数に達したら終了
-            if len(all_urls) >= max_items:
-                all_urls = all_urls[:max_items]
-                break
-            
-            page_num += 1
-            time.sleep(0.5)  # ページ間のアクセス間隔
-        
-        return all_urls
-    
-    def fetch_detail_page(self, url):
-        detail_headers = HEADERS.copy()
-        detail_headers["Referer"] = LIST_URL
-        res = requests.get(url, headers=detail_headers)
-        return BeautifulSoup(res.text, 'html.parser')
-    
-    def extract_images(self, soup, estate_id):
-        img_urls = []
-        
-        # ギャラリータグから取得
-        img_tags = soup.select('a.mainContents_gallery-colorbox')
-        
-        # preloadタグから取得
-        preload_tags = soup.select('link[rel="preload"][as="image"]')
-        
-        if img_tags:
-            for tag in img_tags:
-                href = tag.get('href')
-                if href:
-                    img_urls.append(href)
-        elif estate_id and preload_tags:
-            for tag in preload_tags:
-                href = tag.get('href', '')
-                if estate_id in href and 'exterior' in href.lower():
-                    img_urls.append(href)
-        
-        for idx, img_url in enumerate(img_urls):
-            img_url = urllib.parse.urljoin(BASE_URL, img_url)
-            
-            try:
-                res = requests.get(img_url, headers=HEADERS, timeout=10)
-                
-                if res.status_code == 200:
-                    img_ext = img_url.split('.')[-1].split('?')[0]
-                    if img_ext not in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                        img_ext = 'jpg'
-                    
-                    img_name = f"{estate_id}_{idx+1}.{img_ext}"
-                    img_dir = IMG_FOLDER
-                    os.makedirs(img_dir, exist_ok=True)
-                    
-                    img_path = os.path.join(img_dir, img_name)
-                    with open(img_path, 'wb') as f:
-                        f.write(res.content)
-            except Exception:
-                pass
-            
-            time.sleep(0.5)
-        
-        return [urllib.parse.urljoin(BASE_URL, url) for url in img_urls]
-    
-    def extract_detail(self, soup, url):
-        estate_elem = soup.find('td', class_='estateID')
-        estate_id = estate_elem.text.strip() if estate_elem else ''
-        
-        table = soup.find('table')
-        data = {}
-        
-        if table:
-            all_cells = table.find_all(['th', 'td'])
-            
-            i = 0
-            while i < len(all_cells):
-                cell = all_cells[i]
-                
-                if cell.name == 'th':
-                    key = cell.text.strip()
-                    j = i + 1
-                    while j < len(all_cells):
-                        next_cell = all_cells[j]
-                        if next_cell.name == 'td':
-                            value = next_cell.text.strip()
-                            data[key] = value
-                            i = j
-                            break
-                        elif next_cell.name == 'th':
-                            break
-                        j += 1
-                
-                i += 1
-        
-        summary = {
-            '物件番号': estate_id,
-            '価格': data.get('価格', ''),
-            '間取り': data.get('間取り', ''),
-            '物件種別': data.get('物件種別', ''),
-            '所在地': data.get('所在地', ''),
-            'アクセス': data.get('アクセス', ''),
-            '建物面積': data.get('建物面積', ''),
-            '駐車場': data.get('駐車場', ''),
-            '築年月': data.get('築年月', ''),
-            '建物構造': data.get('建物構造', ''),
-            '工法': data.get('工法', ''),
-            '主要採光': data.get('主要採光', ''),
-            'バルコニー': data.get('バルコニー', ''),
-            '保証・評価': data.get('保証・評価', ''),
-            'リフォーム': data.get('リフォーム', ''),
-            '土地面積': data.get('土地面積', ''),
-            '接道': data.get('接道', ''),
-            'セットバック': data.get('セットバック', ''),
-            '私道': data.get('私道', ''),
-            '地目': data.get('地目', ''),
-            '地勢': data.get('地勢', ''),
-            '権利': data.get('権利', ''),
-            '都市計画': data.get('都市計画', ''),
-            '用途地域': data.get('用途地域', ''),
-            '建ぺい/容積率': data.get('建ぺい/容積率', ''),
-            '土地国土法': data.get('土地国土法', ''),
-            '許可番号': data.get('許可番号', ''),
-            '建築基準法': data.get('建築基準法', ''),
-            '法令制限': data.get('法令制限', ''),
-            '小学区': data.get('小学区', ''),
-            '中学区': data.get('中学区', ''),
-            '現況': data.get('現況', ''),
-            '引渡': data.get('引渡', ''),
-            'その他費用': data.get('その他費用', ''),
-            '備考': data.get('備考', ''),
-            '取引態様': data.get('取引態様', ''),
-            '詳細ページ': url
-        }
-        return summary
 
 
 def main():
     root = tk.Tk()
     app = ScraperGUI(root)
+    if os.environ.get(STARTUP_PROBE_ENV):
+        def probe():
+            print('window-ready', flush=True)
+            root.destroy()
+        # ウィンドウの表示と取得履歴の読み込み（after_idle）が終わった後に実行される
+        root.after_idle(probe)
     root.mainloop()
 
 